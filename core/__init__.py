@@ -6,26 +6,38 @@ This module contains core functionality for the pipeline:
 - config: Configuration settings for the entire pipeline
 - transcriber: Speech-to-text transcription functionality
 - synthesizer: Text-to-speech synthesis functionality
+- phrase_cache: On-disk cache of synthesized phrases
+- synthesis_workers: Process pool for parallel sentence-level synthesis
+- voice_pool: Shared pool of loaded Piper voices with LRU eviction
 - log_utils: Logging utilities
+- tracing: Per-request stage tracing in Chrome trace format
+- metrics: In-process metrics registry with Prometheus text exposition
+- onnx_threads: Thread count control for onnxruntime sessions
 """
 
 from .config import (
-    Config, LoggingConfig, AudioConfig, TranscriptionConfig, LLMConfig, SynthesisConfig
+    Config, LoggingConfig, AudioConfig, TranscriptionConfig, LLMConfig, SynthesisConfig, PipelineConfig,
+    ServerConfig, MetricsConfig
 )
 from .transcriber import Transcriber, get_stats as get_transcription_stats
 from .synthesizer import Synthesizer, get_stats as get_synthesis_stats
+from .phrase_cache import PhraseCache
+from .voice_pool import VoicePool
 from .log_utils import setup_logging
+from .tracing import Tracer, get_tracer
+from .metrics import MetricsRegistry, get_registry, start_exporter
 
 __all__ = [
     # Config class exports
     'Config', 'LoggingConfig', 'AudioConfig', 'TranscriptionConfig', 'LLMConfig', 'SynthesisConfig',
+    'PipelineConfig', 'ServerConfig', 'MetricsConfig',
 
     # Class exports
-    'Transcriber', 'Synthesizer',
+    'Transcriber', 'Synthesizer', 'PhraseCache', 'VoicePool',
 
     # Function exports
     'get_transcription_stats', 'get_synthesis_stats',
 
     # Logging utilities
-    'setup_logging'
+    'setup_logging', 'Tracer', 'get_tracer', 'MetricsRegistry', 'get_registry', 'start_exporter'
 ]
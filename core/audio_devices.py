@@ -0,0 +1,249 @@
+"""Audio input and output devices.
+
+By default audio goes through sounddevice. For headless machines and
+deterministic benchmarks, the input can instead replay a WAV file, paced in
+real time or as fast as possible, and the output can discard audio or record
+it to a WAV file. Devices expose the subset of the sounddevice API used by the
+pipeline: InputStream, OutputStream, play, wait, stop and get_stream.
+"""
+import threading
+import time
+import wave
+
+import numpy as np
+
+from .config import Config
+
+def read_wav_float(wav_path: str, sampling_rate: int) -> np.ndarray:
+	"""Read a 16-bit mono WAV file as float32 samples, resampled to sampling_rate if needed."""
+	with wave.open(wav_path, "rb") as wav_file:
+		frame_rate = wav_file.getframerate()
+		audio = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+	if frame_rate != sampling_rate:
+		duration = len(audio) / frame_rate
+		target_times = np.arange(int(duration * sampling_rate)) / sampling_rate
+		audio = np.interp(target_times, np.arange(len(audio)) / frame_rate, audio).astype(np.float32)
+	return audio
+
+class ReplayInputStream:
+	"""Input stream calling its callback with the blocks of a recording, followed by silence."""
+
+	def __init__(self, audio: np.ndarray, samplerate: int, blocksize: int, callback, realtime: bool = True,
+			trailing_silence_secs: float = 2.0):
+		self.audio = audio
+		self.samplerate = samplerate
+		self.blocksize = blocksize
+		self.callback = callback
+		self.realtime = realtime
+		self.trailing_silence_secs = trailing_silence_secs
+		self.block_times = []
+		self._stop_event = threading.Event()
+		self._thread = None
+
+	@property
+	def active(self) -> bool:
+		return self._thread is not None and self._thread.is_alive()
+
+	def _blocks(self):
+		silence = np.zeros(self.blocksize, dtype=np.float32)
+		padded = np.pad(self.audio, (0, -len(self.audio) % self.blocksize))
+		for start in range(0, len(padded), self.blocksize):
+			yield padded[start:start + self.blocksize]
+		for _ in range(int(self.trailing_silence_secs * self.samplerate / self.blocksize)):
+			yield silence
+		# Like a microphone in a quiet room, keep delivering silence, but never faster than real time
+		self.realtime = True
+		while True:
+			yield silence
+
+	def _run(self):
+		start_time = time.time()
+		for idx, block in enumerate(self._blocks()):
+			if self._stop_event.is_set():
+				break
+			if self.realtime:
+				delay = start_time + (idx + 1) * self.blocksize / self.samplerate - time.time()
+				if delay > 0 and self._stop_event.wait(delay):
+					break
+			else:
+				start_time = time.time() - (idx + 1) * self.blocksize / self.samplerate
+			self.block_times.append(time.time())
+			self.callback(block[:, np.newaxis].copy(), self.blocksize, None, None)
+
+	def start(self):
+		self._stop_event.clear()
+		self._thread = threading.Thread(target=self._run, name="replay-input", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self._stop_event.set()
+		if self._thread is not None:
+			self._thread.join()
+
+	abort = stop
+
+	def close(self):
+		self.stop()
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+class ReplayInputDevice:
+	"""Input device replaying a WAV file instead of recording from the microphone."""
+
+	def __init__(self, wav_path: str, realtime: bool = True):
+		self.wav_path = wav_path
+		self.realtime = realtime
+		self.last_stream = None
+
+	def InputStream(self, samplerate, blocksize, callback, **kwargs):
+		audio = read_wav_float(self.wav_path, samplerate)
+		self.last_stream = ReplayInputStream(audio, samplerate, blocksize, callback, self.realtime)
+		return self.last_stream
+
+class NullOutputStream:
+	"""Output stream handing written blocks to a NullOutputDevice."""
+
+	def __init__(self, device, samplerate: int):
+		self.device = device
+		self.samplerate = samplerate
+		self.closed = False
+
+	@property
+	def active(self) -> bool:
+		return not self.closed
+
+	def start(self):
+		pass
+
+	def write(self, data):
+		self.device._record(np.asarray(data).flatten(), self.samplerate)
+		if self.device.realtime:
+			time.sleep(len(data) / self.samplerate)
+
+	def stop(self):
+		pass
+
+	def abort(self):
+		pass
+
+	def close(self):
+		if not self.closed:
+			self.closed = True
+			self.device.save()
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+class NullOutputDevice:
+	"""
+	Output device discarding audio, or recording it to a WAV file if record_path is given.
+	With realtime, playback takes as long as the audio lasts, as on a real device.
+	"""
+
+	def __init__(self, record_path: str = None, realtime: bool = False):
+		self.record_path = record_path
+		self.realtime = realtime
+		self.first_audio_time = None
+		self.samples_played = 0
+		self._chunks = []
+		self._sample_rate = None
+		self._play_until = 0.0
+		self._lock = threading.Lock()
+
+	def _record(self, audio: np.ndarray, samplerate: int):
+		with self._lock:
+			if self.first_audio_time is None and len(audio):
+				self.first_audio_time = time.time()
+			self.samples_played += len(audio)
+			self._sample_rate = samplerate
+			if self.record_path:
+				self._chunks.append(np.asarray(audio, dtype=np.int16))
+
+	def save(self):
+		"""Write all audio played so far to record_path."""
+		if not self.record_path or self._sample_rate is None:
+			return
+		with self._lock:
+			audio = np.concatenate(self._chunks) if self._chunks else np.empty(0, dtype=np.int16)
+		with wave.open(self.record_path, "wb") as wav_file:
+			wav_file.setnchannels(1)
+			wav_file.setsampwidth(2)
+			wav_file.setframerate(self._sample_rate)
+			wav_file.writeframes(audio.tobytes())
+
+	def OutputStream(self, samplerate, **kwargs):
+		return NullOutputStream(self, samplerate)
+
+	def play(self, data, samplerate):
+		self._record(np.asarray(data).flatten(), samplerate)
+		self.save()
+		self._play_until = time.time() + len(data) / samplerate if self.realtime else 0.0
+
+	def wait(self):
+		delay = self._play_until - time.time()
+		if delay > 0:
+			time.sleep(delay)
+
+	def stop(self):
+		self._play_until = 0.0
+
+	def get_stream(self):
+		return self
+
+	@property
+	def active(self) -> bool:
+		return time.time() < self._play_until
+
+_input_device = None
+_output_device = None
+
+def get_input_device():
+	"""Return the input device selected by AUDIO.INPUT_DEVICE: sounddevice, or a WAV file to replay."""
+	global _input_device
+	if _input_device is None:
+		if Config.AUDIO.INPUT_DEVICE:
+			_input_device = ReplayInputDevice(Config.AUDIO.INPUT_DEVICE, Config.AUDIO.INPUT_REPLAY_REALTIME)
+		else:
+			import sounddevice
+			_input_device = sounddevice
+	return _input_device
+
+def get_output_device():
+	"""Return the output device selected by AUDIO.OUTPUT_DEVICE: sounddevice, "null", or a WAV file to record to."""
+	global _output_device
+	if _output_device is None:
+		if Config.AUDIO.OUTPUT_DEVICE == "null":
+			_output_device = NullOutputDevice(realtime=True)
+		elif Config.AUDIO.OUTPUT_DEVICE:
+			_output_device = NullOutputDevice(Config.AUDIO.OUTPUT_DEVICE, realtime=True)
+		else:
+			import sounddevice
+			_output_device = sounddevice
+	return _output_device
+
+def set_input_device(device):
+	"""
+	Use a device object instead of the configured input device. None restores the configured one.
+	:return: The device used until now, to be restored later.
+	"""
+	global _input_device
+	previous_device, _input_device = _input_device, device
+	return previous_device
+
+def set_output_device(device):
+	"""
+	Use a device object instead of the configured output device. None restores the configured one.
+	:return: The device used until now, to be restored later.
+	"""
+	global _output_device
+	previous_device, _output_device = _output_device, device
+	return previous_device
@@ -13,6 +13,12 @@ class LoggingConfig:
     LEVEL: str = "INFO"
     """Logging level. Possible values: "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"."""
 
+    TRACE_ENABLED: bool = False
+    """Whether to record per-request stage spans and save them as Chrome trace JSON."""
+
+    TRACE_DIR: str = "traces"
+    """Directory where trace files are saved. Open them in chrome://tracing or https://ui.perfetto.dev."""
+
 
 @dataclass
 class AudioConfig:
@@ -32,6 +38,26 @@ class AudioConfig:
     VAD_MIN_SILENCE_MS: int = 500
     """Minimum silence duration (in ms) to consider speech as ended."""
 
+    BARGE_IN: bool = False
+    """Whether to keep listening while the response is played and interrupt it when the user speaks.
+    The interrupting utterance becomes the next request. Without a headset or echo cancellation, the microphone can pick up
+    the pipeline's own voice, so keep BARGE_IN_VAD_THRESHOLD high."""
+
+    BARGE_IN_VAD_THRESHOLD: float = 0.8
+    """VAD threshold used to detect user speech during playback."""
+
+    PLAYBACK_BLOCK_FRAMES: int = 1024
+    """Number of frames written to the output device at a time. Bounds how long a cancelled playback keeps going."""
+
+    INPUT_DEVICE: str = ""
+    """Path of a WAV file replayed instead of recording from the microphone. Empty uses the microphone."""
+
+    INPUT_REPLAY_REALTIME: bool = True
+    """Whether a replayed input file is delivered in real time, as a microphone would, or as fast as possible."""
+
+    OUTPUT_DEVICE: str = ""
+    """"null" to discard played audio, or the path of a WAV file to record it to. Empty uses the speakers."""
+
     # Default WAV paths are now managed by the UseCaseManager
     DEFAULT_WAV_DIR: str = "use_cases"
     """Directory containing use case-specific resources."""
@@ -75,6 +101,89 @@ class SynthesisConfig:
     OUTPUT_DIR: str = "wav_outputs"
     """Directory to save output audio files."""
 
+    VOICE_POOL_MAX_MB: int = 512
+    """Memory budget in MB for the shared pool of loaded Piper voices. Voices are loaded on demand
+    and the least recently used ones are evicted when the budget is exceeded. 0 disables the pool
+    and only PIPER_MODEL_PATH can be used. With PARALLEL_WORKERS > 1, each worker process has its own
+    pool with this budget, so the total can reach (PARALLEL_WORKERS + 1) times this value."""
+
+    PARALLEL_WORKERS: int = 1
+    """Number of worker processes synthesizing sentences in parallel. 1 synthesizes serially in-process.
+    Each worker loads its own copy of the Piper model, so RAM usage grows with this value. Unless
+    PIPELINE.ONNX_THREADS is set, each worker uses an equal share of the cores."""
+
+    CACHE_ENABLED: bool = False
+    """Whether to cache synthesized phrases on disk and replay them without running Piper. Useful when
+    the same responses are spoken again and again, as with canned prompts."""
+
+    CACHE_DIR: str = "synthesis_cache"
+    """Directory where cached phrases are stored as raw PCM."""
+
+    CACHE_MAX_MB: int = 64
+    """Maximum size of the phrase cache in MB. Least recently used phrases are evicted first."""
+
+
+@dataclass
+class PipelineConfig:
+    """Pipeline execution configuration settings."""
+    STAGED_EXECUTION: bool = False
+    """Whether to run capture, transcription, LLM generation, synthesis and playback as concurrent
+    stages connected by queues. Speech is then played sentence by sentence while the LLM is still
+    generating, instead of after the whole response. Batch runs always execute their stages in turn."""
+
+    STAGE_QUEUE_SIZE: int = 8
+    """Maximum number of items waiting between two stages of the staged pipeline."""
+
+    ONNX_THREADS: int = 0
+    """Number of intra-op threads of the onnxruntime sessions of Moonshine and Piper.
+    0 lets onnxruntime use one thread per core. The VAD always runs on a single thread."""
+
+
+@dataclass
+class ServerConfig:
+    """Server mode configuration settings."""
+    HOST: str = "127.0.0.1"
+    """Address the server listens on. Use "0.0.0.0" to accept clients from other machines."""
+
+    PORT: int = 8765
+    """Port the server listens on."""
+
+    MAX_PENDING_REQUESTS: int = 16
+    """Maximum number of requests being processed or waiting. Further requests are rejected with HTTP 503."""
+
+    TRANSCRIPTION_WORKERS: int = 2
+    """Number of transcriptions that can run concurrently."""
+
+    LLM_WORKERS: int = 1
+    """Number of concurrent LLM requests. Should match OLLAMA_NUM_PARALLEL on the ollama service."""
+
+    SYNTHESIS_WORKERS: int = 1
+    """Number of concurrent in-process syntheses. Piper's phonemizer is not thread-safe, so use
+    SYNTHESIS.PARALLEL_WORKERS to scale synthesis across processes instead of raising this."""
+
+    VAD_POOL_SIZE: int = 4
+    """Number of VAD models kept loaded for streaming WebSocket clients."""
+
+
+@dataclass
+class MetricsConfig:
+    """Metrics exposition configuration settings."""
+    ENABLED: bool = False
+    """Whether to expose per-stage counters, gauges and latency histograms in Prometheus text format."""
+
+    HOST: str = "127.0.0.1"
+    """Address the metrics endpoint listens on."""
+
+    PORT: int = 9464
+    """Port of the HTTP metrics endpoint. Set to 0 to disable the endpoint."""
+
+    TEXTFILE_PATH: str = ""
+    """File the metrics are periodically written to, for the node exporter textfile collector
+    (e.g. "/var/lib/node_exporter/textfile_collector/pipeline.prom"). Empty to disable."""
+
+    TEXTFILE_INTERVAL_SECS: float = 15
+    """Interval in seconds between two writes of the metrics file."""
+
 
 @dataclass
 class UseCaseConfig:
@@ -98,6 +207,9 @@ class Config:
     TRANSCRIPTION: ClassVar[TranscriptionConfig] = TranscriptionConfig()
     LLM: ClassVar[LLMConfig] = LLMConfig()
     SYNTHESIS: ClassVar[SynthesisConfig] = SynthesisConfig()
+    PIPELINE: ClassVar[PipelineConfig] = PipelineConfig()
+    SERVER: ClassVar[ServerConfig] = ServerConfig()
+    METRICS: ClassVar[MetricsConfig] = MetricsConfig()
     USE_CASE: ClassVar[UseCaseConfig] = UseCaseConfig()
 
 
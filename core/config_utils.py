@@ -3,7 +3,7 @@
 This module provides helper functions for working with the configuration system.
 """
 
-from .config import Config, LoggingConfig, AudioConfig, TranscriptionConfig, LLMConfig, SynthesisConfig
+from .config import Config, LoggingConfig, AudioConfig, TranscriptionConfig, LLMConfig, SynthesisConfig, PipelineConfig, ServerConfig, MetricsConfig
 
 def get_config_as_dict():
     """
@@ -17,9 +17,47 @@ def get_config_as_dict():
         "audio": {k: v for k, v in vars(Config.AUDIO).items() if not k.startswith("__")},
         "transcription": {k: v for k, v in vars(Config.TRANSCRIPTION).items() if not k.startswith("__")},
         "llm": {k: v for k, v in vars(Config.LLM).items() if not k.startswith("__")},
-        "synthesis": {k: v for k, v in vars(Config.SYNTHESIS).items() if not k.startswith("__")}
+        "synthesis": {k: v for k, v in vars(Config.SYNTHESIS).items() if not k.startswith("__")},
+        "pipeline": {k: v for k, v in vars(Config.PIPELINE).items() if not k.startswith("__")},
+        "server": {k: v for k, v in vars(Config.SERVER).items() if not k.startswith("__")},
+        "metrics": {k: v for k, v in vars(Config.METRICS).items() if not k.startswith("__")}
     }
 
+def apply_override(assignment):
+    """
+    Override a configuration value in place from a "SECTION.PARAM=VALUE" string.
+    The value is converted to the declared type of the parameter.
+
+    Raises:
+        KeyError: If the section or parameter does not exist.
+        ValueError: If the assignment is malformed or the value cannot be converted.
+    """
+    name, separator, raw_value = assignment.partition("=")
+    parts = name.strip().split(".")
+    if not separator or len(parts) != 2:
+        raise ValueError(f"Invalid override '{assignment}', expected SECTION.PARAM=VALUE")
+    section_name, param = parts
+    section = getattr(Config, section_name, None)
+    if section is None or not hasattr(section, param):
+        raise KeyError(f"Parameter '{name}' not found")
+
+    param_type = type(section).__annotations__.get(param, type(getattr(section, param)))
+    if param_type is bool:
+        if raw_value.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"Invalid boolean '{raw_value}' for {name}")
+        value = raw_value.lower() in ("true", "1")
+    elif param_type is int:
+        try:
+            value = int(raw_value)
+        except ValueError:
+            raise ValueError(f"Invalid integer '{raw_value}' for {name}")
+    elif param_type is float:
+        value = float(raw_value)
+    else:
+        value = raw_value
+    setattr(section, param, value)
+    return value
+
 def print_config():
     """
     Print all configuration values in a human-readable format.
@@ -0,0 +1,221 @@
+"""In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms are kept in memory and rendered in the
+Prometheus text format, either on a local HTTP port or in a file that the
+node exporter textfile collector can scrape.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import Config
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+TOKEN_RATE_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+
+def _label_key(labels: dict) -> tuple:
+	return tuple(sorted(labels.items()))
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+	items = list(key) + list((extra or {}).items())
+	if not items:
+		return ""
+	escaped = [
+		f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+		for name, value in items
+	]
+	return "{" + ",".join(escaped) + "}"
+
+def _format_value(value: float) -> str:
+	if value == float("inf"):
+		return "+Inf"
+	return repr(float(value))
+
+class _Metric(ABC):
+	type_name = ""
+
+	def __init__(self, name: str, documentation: str):
+		self.name = name
+		self.documentation = documentation
+		self._lock = threading.Lock()
+
+	def render(self) -> list:
+		lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+		return lines + self._render_samples()
+
+	@abstractmethod
+	def _render_samples(self) -> list:
+		pass
+
+class Counter(_Metric):
+	type_name = "counter"
+
+	def __init__(self, name: str, documentation: str):
+		super().__init__(name, documentation)
+		self._values = {}
+
+	def inc(self, amount: float = 1.0, **labels):
+		key = _label_key(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def _render_samples(self) -> list:
+		with self._lock:
+			return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+class Gauge(_Metric):
+	type_name = "gauge"
+
+	def __init__(self, name: str, documentation: str):
+		super().__init__(name, documentation)
+		self._values = {}
+		self._functions = {}
+
+	def set(self, value: float, **labels):
+		with self._lock:
+			self._values[_label_key(labels)] = value
+
+	def set_function(self, function, **labels):
+		"""Compute the gauge value by calling function each time the metrics are rendered."""
+		with self._lock:
+			self._functions[_label_key(labels)] = function
+
+	def remove_function(self, **labels):
+		with self._lock:
+			self._functions.pop(_label_key(labels), None)
+
+	def _render_samples(self) -> list:
+		with self._lock:
+			values = dict(self._values)
+			functions = dict(self._functions)
+		for key, function in functions.items():
+			try:
+				values[key] = function()
+			except Exception:
+				continue
+		return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values.items()]
+
+class Histogram(_Metric):
+	type_name = "histogram"
+
+	def __init__(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS):
+		super().__init__(name, documentation)
+		self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+		self._series = {}
+
+	def observe(self, value: float, **labels):
+		key = _label_key(labels)
+		with self._lock:
+			series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+			for idx, bound in enumerate(self.buckets):
+				if value <= bound:
+					series["counts"][idx] += 1
+			series["sum"] += value
+			series["count"] += 1
+
+	def _render_samples(self) -> list:
+		lines = []
+		with self._lock:
+			for key, series in self._series.items():
+				for bound, count in zip(self.buckets, series["counts"]):
+					lines.append(f"{self.name}_bucket{_format_labels(key, {'le': _format_value(bound)})} {count}")
+				lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+				lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+		return lines
+
+class MetricsRegistry:
+	def __init__(self):
+		self._metrics = {}
+		self._lock = threading.Lock()
+
+	def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+		with self._lock:
+			metric = self._metrics.get(name)
+			if metric is None:
+				metric = cls(name, documentation, **kwargs)
+				self._metrics[name] = metric
+			elif not isinstance(metric, cls):
+				raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+			return metric
+
+	def counter(self, name: str, documentation: str) -> Counter:
+		return self._get_or_create(Counter, name, documentation)
+
+	def gauge(self, name: str, documentation: str) -> Gauge:
+		return self._get_or_create(Gauge, name, documentation)
+
+	def histogram(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+		return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+	def render(self) -> str:
+		"""Render all metrics in the Prometheus text exposition format."""
+		with self._lock:
+			metrics = list(self._metrics.values())
+		lines = []
+		for metric in metrics:
+			lines.extend(metric.render())
+		return "\n".join(lines) + "\n"
+
+	def write_textfile(self, path: str):
+		"""Atomically write all metrics to a file for the node exporter textfile collector."""
+		os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+		tmp_path = f"{path}.{os.getpid()}.tmp"
+		with open(tmp_path, "w") as f:
+			f.write(self.render())
+		os.replace(tmp_path, path)
+
+_registry = MetricsRegistry()
+_exporter_started = False
+# Set by flush_textfile, so that the periodic writer does not overwrite the final metrics file
+_textfile_stopped = threading.Event()
+
+def get_registry() -> MetricsRegistry:
+	"""Return the process-wide metrics registry."""
+	return _registry
+
+def start_exporter(logger=None):
+	"""
+	Start exposing the registry as configured in Config.METRICS.
+	Metrics are served over HTTP on METRICS.PORT and/or periodically written to METRICS.TEXTFILE_PATH.
+	"""
+	global _exporter_started
+	if _exporter_started or not Config.METRICS.ENABLED:
+		return
+	_exporter_started = True
+
+	if Config.METRICS.PORT:
+		class _MetricsHandler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = _registry.render().encode("utf-8")
+				self.send_response(200)
+				self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				pass
+
+		server = ThreadingHTTPServer((Config.METRICS.HOST, Config.METRICS.PORT), _MetricsHandler)
+		threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+		if logger:
+			logger.info(f"Serving metrics on http://{Config.METRICS.HOST}:{Config.METRICS.PORT}/metrics")
+
+	if Config.METRICS.TEXTFILE_PATH:
+		def _write_periodically():
+			while not _textfile_stopped.wait(Config.METRICS.TEXTFILE_INTERVAL_SECS):
+				try:
+					_registry.write_textfile(Config.METRICS.TEXTFILE_PATH)
+				except OSError as e:
+					if logger:
+						logger.warning(f"Failed to write metrics file: {e}")
+
+		threading.Thread(target=_write_periodically, name="metrics-textfile", daemon=True).start()
+
+def flush_textfile():
+	"""Write the metrics file one last time and stop the periodic writes, typically at shutdown."""
+	_textfile_stopped.set()
+	if Config.METRICS.ENABLED and Config.METRICS.TEXTFILE_PATH:
+		_registry.write_textfile(Config.METRICS.TEXTFILE_PATH)
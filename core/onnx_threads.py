@@ -0,0 +1,39 @@
+"""Thread count control for onnxruntime sessions.
+
+Moonshine and Piper create their onnxruntime sessions without session
+options, so onnxruntime picks one intra-op thread per core. Once installed,
+sessions created without an explicit thread count use
+Config.PIPELINE.ONNX_THREADS instead, read when each session is created.
+Silero VAD already asks for a single thread and is left as is.
+
+Installing patches onnxruntime.InferenceSession for the whole process, so
+only the entry points call install_session_defaults(), after applying their
+configuration overrides.
+"""
+from .config import Config
+
+_installed = False
+
+def install_session_defaults():
+	"""Make onnxruntime sessions use Config.PIPELINE.ONNX_THREADS intra-op threads when it is above 0."""
+	global _installed
+	if _installed:
+		return
+	try:
+		import onnxruntime
+	except ImportError:
+		return
+
+	original_init = onnxruntime.InferenceSession.__init__
+
+	def __init__(self, path_or_bytes, sess_options=None, *args, **kwargs):
+		threads = Config.PIPELINE.ONNX_THREADS
+		if threads > 0:
+			if sess_options is None:
+				sess_options = onnxruntime.SessionOptions()
+			if sess_options.intra_op_num_threads == 0:
+				sess_options.intra_op_num_threads = threads
+		original_init(self, path_or_bytes, sess_options, *args, **kwargs)
+
+	onnxruntime.InferenceSession.__init__ = __init__
+	_installed = True
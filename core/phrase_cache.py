@@ -0,0 +1,130 @@
+"""Persistent on-disk cache of synthesized phrases.
+
+Entries are raw 16-bit mono PCM files named after a hash of the normalized
+text, the voice model and the synthesis parameters. Reads go through a
+memory map, so a hit costs no synthesis and no copy. The least recently used
+entries are evicted once the cache grows past its size budget.
+"""
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+class PhraseCache:
+	def __init__(self, cache_dir: str, max_size_mb: float, logger=None):
+		self.cache_dir = cache_dir
+		self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+		self.logger = logger
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._entries = OrderedDict()
+		self._size_bytes = 0
+		self._lock = threading.Lock()
+		os.makedirs(cache_dir, exist_ok=True)
+		self._load_index()
+
+	def _load_index(self):
+		"""Rebuild the LRU order from the files already on disk, oldest first."""
+		entries = []
+		for name in os.listdir(self.cache_dir):
+			if not name.endswith(".pcm"):
+				continue
+			stat = os.stat(os.path.join(self.cache_dir, name))
+			entries.append((stat.st_mtime, name[:-4], stat.st_size))
+		for _, key, size in sorted(entries):
+			self._entries[key] = size
+			self._size_bytes += size
+
+	@staticmethod
+	def normalize_text(text: str) -> str:
+		"""Normalize unicode and whitespace so trivially different strings share an entry."""
+		return " ".join(unicodedata.normalize("NFC", text).split())
+
+	def make_key(self, text: str, model_path: str, params: dict = None) -> str:
+		"""Build the cache key for a text, voice model and synthesis parameters."""
+		payload = json.dumps({
+			"text": self.normalize_text(text),
+			"model": os.path.abspath(model_path),
+			"params": params or {}
+		}, sort_keys=True)
+		return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.cache_dir, f"{key}.pcm")
+
+	def get(self, key: str):
+		"""
+		Look up a cached phrase.
+		:param key: Key built with make_key.
+		:return: Memory-mapped int16 PCM array, or None on a miss.
+		"""
+		with self._lock:
+			if key not in self._entries:
+				self.misses += 1
+				return None
+			self._entries.move_to_end(key)
+			self.hits += 1
+		path = self._path(key)
+		try:
+			os.utime(path)
+			if os.path.getsize(path) == 0:
+				return np.empty(0, dtype=np.int16)
+			return np.memmap(path, dtype=np.int16, mode="r")
+		except OSError as e:
+			if self.logger:
+				self.logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+			with self._lock:
+				self._size_bytes -= self._entries.pop(key, 0)
+				self.hits -= 1
+				self.misses += 1
+			return None
+
+	def put(self, key: str, audio: np.ndarray):
+		"""Store int16 PCM for a key and evict old entries if over budget."""
+		data = np.asarray(audio, dtype=np.int16).tobytes()
+		if len(data) > self.max_size_bytes:
+			return
+		path = self._path(key)
+		tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		try:
+			with open(tmp_path, "wb") as f:
+				f.write(data)
+			os.replace(tmp_path, path)
+		except OSError as e:
+			if self.logger:
+				self.logger.warning(f"Failed to write cache entry {key}: {e}")
+			return
+
+		with self._lock:
+			self._size_bytes -= self._entries.pop(key, 0)
+			self._entries[key] = len(data)
+			self._size_bytes += len(data)
+			self._evict_if_needed()
+
+	def _evict_if_needed(self):
+		while self._size_bytes > self.max_size_bytes and self._entries:
+			key, size = self._entries.popitem(last=False)
+			self._size_bytes -= size
+			self.evictions += 1
+			try:
+				os.remove(self._path(key))
+			except OSError:
+				pass
+
+	def get_stats(self) -> dict:
+		"""Return hit/miss counters and current cache occupancy."""
+		with self._lock:
+			lookups = self.hits + self.misses
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+				"evictions": self.evictions,
+				"entries": len(self._entries),
+				"size_mb": round(self._size_bytes / (1024 * 1024), 2)
+			}
@@ -0,0 +1,196 @@
+"""Process pool for parallel Piper synthesis.
+
+Each worker process loads its PiperVoice once and keeps it for its lifetime.
+Other voices are loaded on demand into a VoicePool of the worker, so the memory
+budget applies to each worker process as it does to the main process.
+Unless PIPELINE.ONNX_THREADS is set, the cores are split between the workers,
+so that their onnxruntime sessions do not each start one thread per core.
+Text is split into sentences, the sentences are synthesized concurrently and
+the resulting PCM is handed back in the original order.
+"""
+import json
+import os
+import re
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .config import Config
+
+SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+_worker_voices = {}
+_worker_voice_pool = None
+
+def split_sentences(text: str) -> list:
+	"""Split text into sentences on terminal punctuation followed by whitespace."""
+	return [s.strip() for s in SENTENCE_END.split(text.strip()) if s.strip()]
+
+def _get_worker_voice(model_path: str):
+	if _worker_voice_pool is not None:
+		return _worker_voice_pool.get(model_path)
+	voice = _worker_voices.get(model_path)
+	if voice is None:
+		from piper.voice import PiperVoice
+		voice = PiperVoice.load(model_path)
+		_worker_voices[model_path] = voice
+	return voice
+
+def _init_worker(model_path: str, voice_pool_max_mb: float = 0, onnx_threads: int = 0):
+	global _worker_voice_pool
+	from .onnx_threads import install_session_defaults
+	Config.PIPELINE.ONNX_THREADS = onnx_threads
+	install_session_defaults()
+	if voice_pool_max_mb > 0:
+		from .voice_pool import VoicePool
+		_worker_voice_pool = VoicePool(voice_pool_max_mb)
+	_get_worker_voice(model_path)
+
+def _synthesize_sentence(model_path: str, text: str, synthesis_params: dict) -> bytes:
+	voice = _get_worker_voice(model_path)
+	return b''.join(voice.synthesize_stream_raw(text, **synthesis_params))
+
+def _synthesize_to_file(model_path: str, text: str, output_file: str, synthesis_params: dict) -> dict:
+	voice = _get_worker_voice(model_path)
+	os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+	start_time = time.time()
+	with wave.open(output_file, "wb") as wav_file:
+		voice.synthesize(text, wav_file, **synthesis_params)
+	synthesis_time = time.time() - start_time
+	with wave.open(output_file, "rb") as wav_file:
+		audio_duration = wav_file.getnframes() / wav_file.getframerate()
+	return {
+		"output_file": output_file,
+		"audio_duration": round(audio_duration, 3),
+		"synthesis_time": round(synthesis_time, 3),
+		"real_time_factor": round(synthesis_time / audio_duration, 3) if audio_duration > 0 else None
+	}
+
+def load_manifest(manifest_path: str, output_dir: str) -> list:
+	"""
+	Read a batch manifest.
+	A .jsonl manifest has one {"text": ..., "output_file": ...} object per line, where
+	output_file is optional. Any other file is read as plain text, one phrase per line.
+	:return: List of (text, output_file, error) tuples. error describes an invalid manifest line, so that
+	         it is reported as a failed item instead of aborting the batch, and is None for valid lines.
+	"""
+	items = []
+	with open(manifest_path, "r") as f:
+		lines = [line.strip() for line in f if line.strip()]
+	for idx, line in enumerate(lines, start=1):
+		default_output = os.path.join(output_dir, f"item_{idx:05d}.wav")
+		if not manifest_path.endswith(".jsonl"):
+			items.append((line, default_output, None))
+			continue
+		try:
+			entry = json.loads(line)
+		except json.JSONDecodeError as e:
+			items.append((None, default_output, f"Manifest item {idx} is not valid JSON: {e}"))
+			continue
+		if not isinstance(entry, dict) or not isinstance(entry.get("text"), str):
+			items.append((None, default_output, f"Manifest item {idx} is not an object with a 'text' string"))
+			continue
+		items.append((entry["text"], entry.get("output_file") or default_output, None))
+	return items
+
+class SynthesisWorkerPool:
+	def __init__(self, model_path: str, workers: int = None, synthesis_params: dict = None, voice_pool_max_mb: float = 0):
+		"""
+		:param voice_pool_max_mb: Memory budget of the voices loaded by each worker process. 0 keeps every
+		                          loaded voice.
+		"""
+		self.model_path = model_path
+		self.workers = workers or os.cpu_count() or 1
+		self.synthesis_params = synthesis_params or {}
+		self.voice_pool_max_mb = voice_pool_max_mb
+		self.onnx_threads = Config.PIPELINE.ONNX_THREADS or max(1, (os.cpu_count() or 1) // self.workers)
+		self._executor = None
+
+	def _get_executor(self) -> ProcessPoolExecutor:
+		if self._executor is None:
+			self._executor = ProcessPoolExecutor(
+				max_workers=self.workers,
+				initializer=_init_worker,
+				initargs=(self.model_path, self.voice_pool_max_mb, self.onnx_threads)
+			)
+		return self._executor
+
+	def iter_pcm(self, text: str, model_path: str = None):
+		"""
+		Synthesize text sentence by sentence on the pool.
+		:param text: Text to synthesize.
+		:param model_path: Voice to use instead of the pool's default one.
+		:return: Generator of int16 PCM arrays, one per sentence, in text order.
+		"""
+		sentences = split_sentences(text)
+		if not sentences:
+			return
+		model_path = model_path or self.model_path
+		executor = self._get_executor()
+		futures = [
+			executor.submit(_synthesize_sentence, model_path, sentence, self.synthesis_params)
+			for sentence in sentences
+		]
+		for future in futures:
+			yield np.frombuffer(future.result(), dtype=np.int16)
+
+	def synthesize(self, text: str, model_path: str = None) -> np.ndarray:
+		"""Synthesize text on the pool and return the reassembled int16 PCM."""
+		chunks = list(self.iter_pcm(text, model_path))
+		return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int16)
+
+	def synthesize_files(self, items: list):
+		"""
+		Synthesize many texts to WAV files in parallel.
+		:param items: List of (text, output_file) tuples.
+		:return: Generator of per-item result dicts, in input order.
+		"""
+		executor = self._get_executor()
+		futures = [
+			executor.submit(_synthesize_to_file, self.model_path, text, output_file, self.synthesis_params)
+			for text, output_file in items
+		]
+		for future in futures:
+			try:
+				yield future.result()
+			except Exception as e:
+				yield {"error": str(e)}
+
+	def close(self):
+		"""Shut down the worker processes."""
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+def run_batch(manifest_path: str, output_dir: str, model_path: str, workers: int = None) -> dict:
+	"""
+	Synthesize every entry of a manifest and measure throughput.
+	:return: Dictionary with per-item results and aggregate throughput figures.
+	"""
+	items = load_manifest(manifest_path, output_dir)
+	pool = SynthesisWorkerPool(model_path, workers)
+	try:
+		start_time = time.time()
+		results = []
+		synthesized = pool.synthesize_files([(text, output_file) for text, output_file, error in items if error is None])
+		for text, output_file, error in items:
+			result = {"error": error} if error is not None else next(synthesized)
+			result.setdefault("output_file", output_file)
+			results.append(result)
+		wall_time = time.time() - start_time
+	finally:
+		pool.close()
+
+	succeeded = [r for r in results if "error" not in r]
+	audio_seconds = sum(r["audio_duration"] for r in succeeded)
+	return {
+		"items": results,
+		"workers": pool.workers,
+		"succeeded": len(succeeded),
+		"failed": len(results) - len(succeeded),
+		"wall_time": round(wall_time, 3),
+		"audio_seconds": round(audio_seconds, 3),
+		"audio_seconds_per_second": round(audio_seconds / wall_time, 3) if wall_time > 0 else None
+	}
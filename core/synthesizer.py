@@ -2,19 +2,39 @@ import wave
 import os
 import json
 import numpy as np
-import sounddevice as sd
 import psutil
 import argparse
 import time
 from .config import Config
+from .audio_devices import get_output_device
+from .metrics import get_registry, RTF_BUCKETS
+from .onnx_threads import install_session_defaults
+
+PLAYBACK_POLL_SECS = 0.02
 
 class Synthesizer:
-	def __init__(self, model_path: str):
+	def __init__(self, model_path: str, cache=None, synthesis_params: dict = None, workers: int = 1, voice_pool=None):
 		self.model_path = model_path
 		self.voice = None
 		self.sample_rate = 16000  # Default sample rate
+		self.cache = cache
+		self.synthesis_params = synthesis_params or {}
+		self.workers = workers
+		self.worker_pool = None
+		self.voice_pool = voice_pool
+		self._sample_rates = {}
 		self._initialized = False
 
+	def _get_worker_pool(self):
+		"""Return the sentence-level worker pool, or None when running serially."""
+		if self.workers <= 1:
+			return None
+		if self.worker_pool is None:
+			from .synthesis_workers import SynthesisWorkerPool
+			voice_pool_max_mb = self.voice_pool.max_memory_mb if self.voice_pool is not None else 0
+			self.worker_pool = SynthesisWorkerPool(self.model_path, self.workers, self.synthesis_params, voice_pool_max_mb)
+		return self.worker_pool
+
 	def _initialize_if_needed(self):
 		"""Initialize the PiperVoice model if it hasn't been initialized yet."""
 		if self._initialized:
@@ -24,9 +44,7 @@ class Synthesizer:
 			# Only import Piper when we need it
 			from piper.voice import PiperVoice
 			self.voice = PiperVoice.load(self.model_path)
-			with open(f"{self.model_path}.json", "r") as model_config_file:
-				piper_config = json.load(model_config_file)
-				self.sample_rate = piper_config["audio"]["sample_rate"]
+			self.sample_rate = self.get_sample_rate(self.model_path)
 			self._initialized = True
 			return True
 		except Exception as e:
@@ -34,9 +52,88 @@ class Synthesizer:
 				self.logger.error(f"Error initializing Piper: {e}")
 			return False
 
-	def save_output(self, text: str, filename: str):
-		if not self._initialize_if_needed():
-			return {"error": "Failed to initialize Piper", "output_file": filename}
+	def _get_voice(self, model_path: str):
+		"""
+		Return a loaded PiperVoice for a model.
+		Voices other than the default one are only available through the voice pool.
+		:return: PiperVoice instance, or None if it could not be loaded.
+		"""
+		if self.voice_pool is not None:
+			try:
+				return self.voice_pool.get(model_path)
+			except Exception as e:
+				if hasattr(self, 'logger') and self.logger:
+					self.logger.error(f"Error loading voice {model_path}: {e}")
+				return None
+
+		if model_path != self.model_path:
+			if hasattr(self, 'logger') and self.logger:
+				self.logger.error(f"Voice {model_path} requested but no voice pool is configured")
+			return None
+		return self.voice if self._initialize_if_needed() else None
+
+	def load(self, model_path: str = None) -> bool:
+		"""
+		Load the in-process voice ahead of the first synthesis, so that its load time is not paid on first use.
+		Worker processes load their own voice when they receive their first sentence.
+		:return: True if the voice is ready.
+		"""
+		return self._get_voice(model_path or self.model_path) is not None
+
+	def get_sample_rate(self, model_path: str = None) -> int:
+		"""Return the output sample rate of a voice, reading it from the model config once."""
+		model_path = model_path or self.model_path
+		if model_path not in self._sample_rates:
+			self._sample_rates[model_path] = read_sample_rate(model_path)
+		sample_rate = self._sample_rates[model_path]
+		if model_path == self.model_path:
+			self.sample_rate = sample_rate
+		return sample_rate
+
+	def synthesize_pcm(self, text: str, model_path: str = None):
+		"""
+		Synthesize text to int16 PCM, going through the phrase cache when one is configured.
+		:return: Tuple of (PCM array, whether it was a cache hit), or (None, False) on failure.
+		"""
+		model_path = model_path or self.model_path
+		key = None
+		if self.cache is not None:
+			key = self.cache.make_key(text, model_path, self.synthesis_params)
+			audio = self.cache.get(key)
+			if audio is not None:
+				if hasattr(self, 'logger') and self.logger:
+					self.logger.debug("Phrase cache hit.")
+				return audio, True
+
+		start_time = time.time()
+		worker_pool = self._get_worker_pool()
+		if worker_pool is not None:
+			audio = worker_pool.synthesize(text, model_path)
+		else:
+			voice = self._get_voice(model_path)
+			if voice is None:
+				return None, False
+			raw_audio = b''.join(voice.synthesize_stream_raw(text, **self.synthesis_params))
+			audio = np.frombuffer(raw_audio, dtype=np.int16)
+		elapsed = time.time() - start_time
+		registry = get_registry()
+		registry.histogram("pipeline_synthesis_seconds", "Time spent synthesizing phrases not in the cache.").observe(elapsed)
+		if len(audio) > 0:
+			registry.histogram("pipeline_synthesis_rtf", "Real time factor of synthesis.",
+				RTF_BUCKETS).observe(elapsed / (len(audio) / self.get_sample_rate(model_path)))
+
+		if key is not None:
+			self.cache.put(key, audio)
+		return audio, False
+
+	def save_output(self, text: str, filename: str, voice: str = None):
+		model_path = voice or self.model_path
+		serial_file_output = self.cache is None and self.workers <= 1
+		piper_voice = None
+		if serial_file_output:
+			piper_voice = self._get_voice(model_path)
+			if piper_voice is None:
+				return {"error": "Failed to initialize Piper", "output_file": filename}
 
 		try:
 			os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -46,8 +143,15 @@ class Synthesizer:
 
 			start_time = time.time()
 
-			with wave.open(filename, "w") as wav_file:
-				self.voice.synthesize(text, wav_file)
+			if serial_file_output:
+				cache_hit = False
+				with wave.open(filename, "w") as wav_file:
+					piper_voice.synthesize(text, wav_file, **self.synthesis_params)
+			else:
+				audio, cache_hit = self.synthesize_pcm(text, model_path)
+				if audio is None:
+					return {"error": "Failed to initialize Piper", "output_file": filename}
+				self.write_wav(filename, audio, self.get_sample_rate(model_path))
 
 			end_time = time.time()
 
@@ -60,64 +164,169 @@ class Synthesizer:
 
 			return {
 				"ram_usage_mb": round(ram_usage, 2),
-				"real_time_factor": round(rtf, 3)
+				"real_time_factor": round(rtf, 3),
+				"cache_hit": cache_hit
 			}
 		except Exception as e:
 			if hasattr(self, 'logger') and self.logger:
 				self.logger.error("Synthesis failed: %s", e)
 			raise
 
-	def play_output(self, filename: str):
+	def _wait_for_playback(self, cancel_event=None) -> bool:
+		"""
+		Wait for the current play call of the output device to finish.
+		:param cancel_event: Optional event that stops playback as soon as it is set.
+		:return: False if playback was cancelled, True otherwise.
+		"""
+		output_device = get_output_device()
+		if cancel_event is None:
+			output_device.wait()
+			return True
+		stream = output_device.get_stream()
+		while stream.active:
+			if cancel_event.wait(PLAYBACK_POLL_SECS):
+				output_device.stop()
+				return False
+		return True
+
+	def play_output(self, filename: str, cancel_event=None):
 		try:
 			with wave.open(filename, "rb") as wav_file:
 				audio_data = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
-				sd.play(audio_data, samplerate=wav_file.getframerate())
-				sd.wait()
+				get_output_device().play(audio_data, samplerate=wav_file.getframerate())
+				self._wait_for_playback(cancel_event)
 		except Exception as e:
 			if hasattr(self, 'logger') and self.logger:
 				self.logger.error(f"Error playing audio: {e}")
 
-	def play_raw_output(self, text: str):
-		if not self._initialize_if_needed():
+	def play_raw_output(self, text: str, voice: str = None, cancel_event=None):
+		model_path = voice or self.model_path
+		if self.workers > 1:
+			return self._play_parallel_output(text, model_path, cancel_event)
+
+		try:
+			audio, _ = self.synthesize_pcm(text, model_path)
+			if audio is None:
+				if hasattr(self, 'logger') and self.logger:
+					self.logger.error("Failed to initialize Piper")
+				return False
+			get_output_device().play(audio, samplerate=self.get_sample_rate(model_path))
+			self._wait_for_playback(cancel_event)
+			return True
+		except Exception as e:
 			if hasattr(self, 'logger') and self.logger:
-				self.logger.error("Failed to initialize Piper")
+				self.logger.error(f"Error in raw audio playback: {e}")
 			return False
 
+	def _play_parallel_output(self, text: str, model_path: str, cancel_event=None):
+		"""Play sentences as soon as they come back from the worker pool, in text order."""
 		try:
-			raw_audio = b''.join(self.voice.synthesize_stream_raw(text))
-			audio = np.frombuffer(raw_audio, dtype=np.int16)
-			sd.play(audio, samplerate=self.sample_rate)
-			sd.wait()
+			sample_rate = self.get_sample_rate(model_path)
+			if self.cache is not None:
+				key = self.cache.make_key(text, model_path, self.synthesis_params)
+				audio = self.cache.get(key)
+				if audio is not None:
+					get_output_device().play(audio, samplerate=sample_rate)
+					self._wait_for_playback(cancel_event)
+					return True
+
+			chunks = []
+			worker_pool = self._get_worker_pool()
+			with get_output_device().OutputStream(samplerate=sample_rate, channels=1, dtype="int16") as stream:
+				for chunk in worker_pool.iter_pcm(text, model_path):
+					if not write_cancellable(stream, chunk, cancel_event):
+						return True
+					chunks.append(chunk)
+
+			if self.cache is not None and chunks:
+				self.cache.put(key, np.concatenate(chunks))
 			return True
 		except Exception as e:
 			if hasattr(self, 'logger') and self.logger:
-				self.logger.error(f"Error in raw audio playback: {e}")
+				self.logger.error(f"Error in parallel audio playback: {e}")
 			return False
 
+	def close(self):
+		"""Release the worker pool, if one was started."""
+		if self.worker_pool is not None:
+			self.worker_pool.close()
+			self.worker_pool = None
+
+	def write_wav(self, filename: str, audio: np.ndarray, sample_rate: int = None):
+		"""Write int16 mono PCM to a WAV file, by default at the default voice sample rate."""
+		with wave.open(filename, "wb") as wav_file:
+			wav_file.setnchannels(1)
+			wav_file.setsampwidth(2)
+			wav_file.setframerate(sample_rate or self.sample_rate)
+			wav_file.writeframes(np.asarray(audio, dtype=np.int16).tobytes())
+
+	def get_cache_stats(self) -> dict:
+		"""Return phrase cache statistics, or an empty dict if caching is disabled."""
+		return self.cache.get_stats() if self.cache is not None else {}
+
+	def get_voice_stats(self) -> dict:
+		"""Return voice pool statistics, or an empty dict if no voice pool is configured."""
+		return self.voice_pool.get_stats() if self.voice_pool is not None else {}
+
 	def calculate_audio_duration(self, file_path: str) -> float:
 		with wave.open(file_path, "rb") as wav_file:
 			return wav_file.getnframes() / wav_file.getframerate()
 
-def get_stats(text: str, output_file: str) -> dict:
+def write_cancellable(stream, audio: np.ndarray, cancel_event=None) -> bool:
+	"""
+	Write int16 PCM to an output stream in small blocks, aborting as soon as cancel_event is set.
+	:return: False if the write was cancelled, True otherwise.
+	"""
+	block = Config.AUDIO.PLAYBACK_BLOCK_FRAMES
+	audio = np.asarray(audio, dtype=np.int16)
+	for idx in range(0, len(audio), block):
+		if cancel_event is not None and cancel_event.is_set():
+			stream.abort()
+			return False
+		stream.write(audio[idx:idx + block])
+	return True
+
+def read_sample_rate(model_path: str) -> int:
+	"""Read the output sample rate from a Piper model's JSON config."""
+	with open(f"{model_path}.json", "r") as model_config_file:
+		piper_config = json.load(model_config_file)
+		return piper_config["audio"]["sample_rate"]
+
+def get_stats(text: str, output_file: str, synthesizer: Synthesizer = None) -> dict:
 	"""
 	Measure RAM usage while synthesizing speech from text.
 	:param text: Text to synthesize.
 	:param output_file: Path to save the synthesized audio file.
+	:param synthesizer: Already loaded synthesizer to reuse. A new one is built if omitted.
 	:return: Dictionary with output file path and RAM usage in MB.
 	"""
 	try:
-		synthesizer = Synthesizer(Config.SYNTHESIS.PIPER_MODEL_PATH)
+		synthesizer = synthesizer or Synthesizer(Config.SYNTHESIS.PIPER_MODEL_PATH)
 		stats = synthesizer.save_output(text, output_file)
-		stats["output_file"] = output_file,
+		stats["output_file"] = output_file
 		return stats
 	except Exception as e:
 		return {"error": str(e), "output_file": output_file}
 
 if __name__ == "__main__":
 	parser = argparse.ArgumentParser(description="Synthesize speech from text using PiperVoice.")
-	parser.add_argument("text", type=str, help="Text to synthesize.")
+	parser.add_argument("text", type=str, nargs="?", help="Text to synthesize.")
 	parser.add_argument("-o", "--output_file", type=str, help="Path to save the synthesized audio file.", default=None)
+	parser.add_argument("-b", "--batch", type=str, default=None,
+		help="Manifest to synthesize in batch: .jsonl with {\"text\", \"output_file\"} objects, or plain text with one phrase per line.")
+	parser.add_argument("-d", "--output_dir", type=str, default=Config.SYNTHESIS.OUTPUT_DIR,
+		help="Directory for batch outputs that do not specify an output_file.")
+	parser.add_argument("-w", "--workers", type=int, default=None,
+		help="Number of batch worker processes, each loading the voice once. Defaults to the CPU count.")
 	args = parser.parse_args()
 
-	stats = get_stats(args.text, args.output_file)
-	print(json.dumps(stats, indent=4))
+	install_session_defaults()
+	if args.batch:
+		from .synthesis_workers import run_batch
+		report = run_batch(args.batch, args.output_dir, Config.SYNTHESIS.PIPER_MODEL_PATH, args.workers)
+		print(json.dumps(report, indent=4))
+	elif args.text:
+		stats = get_stats(args.text, args.output_file)
+		print(json.dumps(stats, indent=4))
+	else:
+		parser.error("either text or --batch is required")
@@ -0,0 +1,110 @@
+"""Lightweight per-request tracing.
+
+Spans are collected in memory and written as Chrome trace event JSON, which
+can be opened in chrome://tracing or https://ui.perfetto.dev. Every span
+carries the ID of the request it belongs to, so overlapping stages of one
+interaction can be told apart.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import Config
+
+class Tracer:
+	def __init__(self, enabled: bool = True):
+		self.enabled = enabled
+		self.pid = os.getpid()
+		self._events = []
+		self._thread_names = {}
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def new_request_id() -> str:
+		"""Return a short random ID identifying one request across all its spans."""
+		return uuid.uuid4().hex[:8]
+
+	def _record(self, event: dict):
+		thread = threading.current_thread()
+		event.setdefault("pid", self.pid)
+		event.setdefault("tid", thread.ident)
+		with self._lock:
+			self._thread_names.setdefault(thread.ident, thread.name)
+			self._events.append(event)
+
+	def add_span(self, name: str, start: float, end: float, request_id: str = None, **args):
+		"""
+		Record a span whose start and end times are already known.
+		:param start: Start time as returned by time.time().
+		:param end: End time as returned by time.time().
+		"""
+		if not self.enabled:
+			return
+		self._record({
+			"name": name,
+			"cat": "pipeline",
+			"ph": "X",
+			"ts": start * 1e6,
+			"dur": max(end - start, 0) * 1e6,
+			"args": dict(args, request_id=request_id)
+		})
+
+	def instant(self, name: str, request_id: str = None, **args):
+		"""Record a point-in-time event, such as the first generated token."""
+		if not self.enabled:
+			return
+		self._record({
+			"name": name,
+			"cat": "pipeline",
+			"ph": "i",
+			"s": "t",
+			"ts": time.time() * 1e6,
+			"args": dict(args, request_id=request_id)
+		})
+
+	@contextmanager
+	def span(self, name: str, request_id: str = None, **args):
+		"""Context manager recording a span around the enclosed block."""
+		start = time.time()
+		try:
+			yield
+		finally:
+			self.add_span(name, start, time.time(), request_id, **args)
+
+	def save(self, trace_file: str = None) -> str:
+		"""
+		Write collected events to a Chrome trace JSON file and clear them.
+		:param trace_file: Output path. Defaults to a timestamped file in LOGGING.TRACE_DIR.
+		:return: Path of the written file, or None if there was nothing to write.
+		"""
+		with self._lock:
+			events, self._events = self._events, []
+			thread_names = dict(self._thread_names)
+		if not self.enabled or not events:
+			return None
+
+		if trace_file is None:
+			timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+			trace_file = os.path.join(Config.LOGGING.TRACE_DIR, f"trace_{timestamp}.json")
+		os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+
+		metadata = [
+			{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+			for tid, name in thread_names.items()
+		]
+		with open(trace_file, "w") as f:
+			json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+		return trace_file
+
+_tracer = None
+
+def get_tracer() -> Tracer:
+	"""Return the process-wide tracer, enabled according to LOGGING.TRACE_ENABLED."""
+	global _tracer
+	if _tracer is None:
+		_tracer = Tracer(Config.LOGGING.TRACE_ENABLED)
+	return _tracer
@@ -62,13 +62,14 @@ class Transcriber:
 				self.logger.error("Failed to read audio file for transcription: %s", e)
 			return "[file read error]"
 
-def get_stats(file_path: str) -> dict:
+def get_stats(file_path: str, transcriber: Transcriber = None) -> dict:
 	"""
 	Measure RAM usage and real-time factor while transcribing an audio file.
 	:param file_path: Path to the audio file to transcribe.
+	:param transcriber: Already loaded transcriber created with return_stats=True to reuse. A new one is built if omitted.
 	:return: Dictionary with transcription, RAM usage in MB, and real-time factor.
 	"""
-	transcriber = Transcriber(return_stats=True)
+	transcriber = transcriber or Transcriber(return_stats=True)
 	transcription, ram, rtf = transcriber.transcribe_from_file(file_path)
 	return {
 		"transcription": transcription,
@@ -0,0 +1,90 @@
+"""Shared pool of loaded Piper voices.
+
+Voices are loaded on first use and shared by every request that asks for the
+same model. When loading another voice would exceed the memory budget, the
+least recently used voices are evicted first.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import psutil
+
+class VoicePool:
+	def __init__(self, max_memory_mb: float, logger=None):
+		self.max_memory_mb = max_memory_mb
+		self.logger = logger
+		self._voices = OrderedDict()
+		self._memory_mb = {}
+		self._counters = {}
+		self._lock = threading.Lock()
+
+	def _counters_for(self, model_path: str) -> dict:
+		return self._counters.setdefault(model_path, {"loads": 0, "hits": 0, "evictions": 0})
+
+	def _estimate_memory_mb(self, model_path: str) -> float:
+		"""Estimate the RAM a voice will need before it is loaded, from its model file size."""
+		try:
+			return os.path.getsize(model_path) / (1024 * 1024)
+		except OSError:
+			return 0.0
+
+	def _used_memory_mb(self) -> float:
+		return sum(self._memory_mb.values())
+
+	def _evict_for(self, needed_mb: float):
+		while self._voices and self._used_memory_mb() + needed_mb > self.max_memory_mb:
+			model_path, _ = self._voices.popitem(last=False)
+			self._memory_mb.pop(model_path, None)
+			self._counters_for(model_path)["evictions"] += 1
+			if self.logger:
+				self.logger.debug(f"Evicted voice {model_path} from the voice pool.")
+
+	def get(self, model_path: str):
+		"""
+		Return the PiperVoice for a model, loading it if it is not resident.
+		:param model_path: Path to the Piper ONNX model.
+		:return: Loaded PiperVoice instance.
+		"""
+		with self._lock:
+			counters = self._counters_for(model_path)
+			voice = self._voices.get(model_path)
+			if voice is not None:
+				self._voices.move_to_end(model_path)
+				counters["hits"] += 1
+				return voice
+
+			self._evict_for(self._estimate_memory_mb(model_path))
+
+			from piper.voice import PiperVoice
+			process = psutil.Process()
+			before_ram = process.memory_info().rss / (1024 * 1024)
+			voice = PiperVoice.load(model_path)
+			after_ram = process.memory_info().rss / (1024 * 1024)
+
+			memory_mb = after_ram - before_ram
+			if memory_mb <= 0:
+				memory_mb = self._estimate_memory_mb(model_path)
+
+			self._voices[model_path] = voice
+			self._memory_mb[model_path] = memory_mb
+			counters["loads"] += 1
+			if self.logger:
+				self.logger.debug(f"Loaded voice {model_path} into the voice pool ({memory_mb:.1f} MB).")
+			return voice
+
+	def get_stats(self) -> dict:
+		"""Return per-voice load, hit and eviction counters and the pool's memory usage."""
+		with self._lock:
+			return {
+				"memory_mb": round(self._used_memory_mb(), 2),
+				"max_memory_mb": self.max_memory_mb,
+				"voices": {
+					model_path: dict(
+						counters,
+						loaded=model_path in self._voices,
+						memory_mb=round(self._memory_mb.get(model_path, 0.0), 2)
+					)
+					for model_path, counters in self._counters.items()
+				}
+			}
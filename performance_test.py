@@ -1,5 +1,78 @@
 import argparse
+import json
+import shlex
+import sys
+from core.config_utils import apply_override
+from core.onnx_threads import install_session_defaults
 from performance_tests.run import run_performance_tests
+from performance_tests.cold_start import run_cold_start, format_cold_start_results
+from performance_tests.load_test import run_load_test, format_load_results, save_load_results
+from performance_tests.sweep import load_grid, run_sweep, format_pareto_summary
+from performance_tests.results import (
+    load_results, compare_results, format_comparison, import_text_logs, save_benchmark_json
+)
+
+COMPONENT_TESTS = {
+    "transcription": "transcription",
+    "synthesis": "synthesis",
+    "llm": "llm_inference",
+    "end_to_end": "end_to_end",
+    "audio_path": "audio_path"
+}
+
+# The end-to-end benchmark runs one recording per use case, so it needs more repetitions by default
+DEFAULT_COUNTS = {
+    "end_to_end": {"repeat": 5, "warmup": 1}
+}
+
+def parse_count(value):
+    """Parse a count given as N for all components or as COMPONENT=N for a single one"""
+    if "=" not in value:
+        return None, int(value)
+    component, count = value.split("=", 1)
+    if component not in COMPONENT_TESTS:
+        raise argparse.ArgumentTypeError(f"Unknown component '{component}'. Choose from: {', '.join(COMPONENT_TESTS)}")
+    return COMPONENT_TESTS[component], int(count)
+
+def resolve_counts(values, kind):
+    """Combine repeated --repeat/--warmup options into a count per test"""
+    counts = {test_name: DEFAULT_COUNTS.get(test_name, {}).get(kind, 1) for test_name in COMPONENT_TESTS.values()}
+    for test_name, count in values or []:
+        if test_name is None:
+            counts = {name: count for name in counts}
+        else:
+            counts[test_name] = count
+    return counts
+
+def resolve_use_cases(use_cases):
+    """Expand an empty --end-to-end option to all configured use cases"""
+    if use_cases is None:
+        return None
+    if not use_cases:
+        from core.config import Config
+        return list(Config.USE_CASE.AVAILABLE_USE_CASES)
+    return use_cases
+
+def parse_threshold(value):
+    """Parse a regression threshold given as PCT for all metrics or as METRIC=PCT"""
+    if "=" not in value:
+        return "default", float(value)
+    metric, pct = value.split("=", 1)
+    return metric, float(pct)
+
+def add_threshold_argument(parser, default=None):
+    parser.add_argument("--threshold", type=parse_threshold, action="append", metavar="[METRIC=]PCT", default=default,
+                        help="Change in percent past which a metric is flagged as a regression, for all "
+                             "metrics or for one metric name of the results, e.g. rtf, wer, ttft, eval_rate, "
+                             "total_latency, ram_usage (default: 5). Can be repeated")
+
+def add_ignore_throttled_argument(parser, default=False):
+    parser.add_argument("--ignore-throttled", action="store_true", default=default,
+                        help="Do not fail on regressions of tests flagged as throttled in either run")
+
+def has_regressions(comparison, ignore_throttled):
+    """Whether a comparison has regressions that should fail the run"""
+    return any(c["regression"] and not (ignore_throttled and c.get("throttled")) for c in comparison)
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Run performance tests for pipeline components.")
@@ -11,13 +84,141 @@ def parse_arguments():
                         help="Skip LLM inference performance tests")
     parser.add_argument("--save", action="store_true",
                         help="Save performance results to a file")
+    parser.add_argument("--repeat", type=parse_count, action="append", metavar="[COMPONENT=]N",
+                        help="Measured runs per text, for all components or for one of transcription, "
+                             "synthesis, llm, end_to_end, audio_path (default: 1, 5 for end_to_end). Can be repeated")
+    parser.add_argument("--warmup", type=parse_count, action="append", metavar="[COMPONENT=]N",
+                        help="Unmeasured warm-up runs, for all components or for one of "
+                             "transcription, synthesis, llm, end_to_end, audio_path (default: 1). Can be repeated")
+    parser.add_argument("--end-to-end", nargs="*", metavar="USE_CASE",
+                        help="Also measure the latency from end of speech to first synthesized audio on the "
+                             "input recording of the given use cases (default: all use cases)")
+    parser.add_argument("--audio-path", nargs="?", const="realtime", choices=["realtime", "fast"],
+                        help="Also measure VAD cost per chunk, input callback to capture loop latency and end of "
+                             "speech detection delay on the evaluation recordings, replayed in real time (default) "
+                             "or as fast as possible instead of recorded from the microphone")
+    parser.add_argument("--compare-to", metavar="BASELINE",
+                        help="Compare the results against a results file, a host log directory or 'latest'")
+    add_threshold_argument(parser)
+    add_ignore_throttled_argument(parser)
+    parser.add_argument("--set", action="append", metavar="SECTION.PARAM=VALUE", default=[],
+                        help="Override a value of core/config.py for this run, e.g. AUDIO.CHUNK_SIZE=1024. Can be repeated")
+    parser.add_argument("--results-json", metavar="PATH",
+                        help="Also write the results document to this JSON file")
+
+    subparsers = parser.add_subparsers(dest="command")
+    compare_parser = subparsers.add_parser("compare", help="Compare saved results without running tests")
+    compare_parser.add_argument("current", help="Results file or host log directory to check")
+    compare_parser.add_argument("baseline", nargs="?", default="latest",
+                                help="Results file, host log directory or 'latest' (default)")
+    compare_parser.add_argument("--json", action="store_true", help="Print the comparison as JSON")
+    # Without SUPPRESS, the subparser defaults would overwrite options given before "compare"
+    add_threshold_argument(compare_parser, default=argparse.SUPPRESS)
+    add_ignore_throttled_argument(compare_parser, default=argparse.SUPPRESS)
+
+    load_parser = subparsers.add_parser("load", help="Find the throughput saturation of each component "
+                                                     "with increasing numbers of concurrent clients")
+    load_parser.add_argument("--components", nargs="+", choices=["transcription", "synthesis", "llm"],
+                             default=["transcription", "synthesis", "llm"], help="Components to load (default: all)")
+    load_parser.add_argument("--levels", nargs="+", type=int, metavar="N",
+                             help="Numbers of concurrent clients to step through (default: 1 2 4 8 16)")
+    load_parser.add_argument("--requests-per-client", type=int, default=3,
+                             help="Requests sent by each client at every level (default: 3)")
+    load_parser.add_argument("--save", action="store_true", help="Save load test results to a file")
+
+    cold_start_parser = subparsers.add_parser("cold-start", help="Measure interpreter startup, import, model load, "
+                                                                 "first and steady-state inference times in fresh processes")
+    cold_start_parser.add_argument("--components", nargs="+", choices=["transcription", "synthesis", "llm"],
+                                   default=["transcription", "synthesis", "llm"], help="Components to measure (default: all)")
+    cold_start_parser.add_argument("--runs", type=int, default=3, help="Fresh processes per component (default: 3)")
+    cold_start_parser.add_argument("--steady-runs", type=int, default=3,
+                                   help="Inferences after the first one, reusing the loaded model (default: 3)")
+    cold_start_parser.add_argument("--save", action="store_true", help="Save cold-start results to a file")
+
+    sweep_parser = subparsers.add_parser("sweep", help="Run the tests for every point of a grid of config "
+                                                       "overrides, each in a fresh process")
+    sweep_parser.add_argument("--grid", metavar="FILE",
+                              help='JSON file mapping "SECTION.PARAM" to a list of values')
+    sweep_parser.add_argument("--param", action="append", metavar="SECTION.PARAM=V1,V2,...",
+                              help="Values of one parameter, e.g. TRANSCRIPTION.MOONSHINE_MODEL=moonshine/tiny,"
+                                   "moonshine/base. Can be repeated")
+    sweep_parser.add_argument("--suite-args", default="",
+                              help='Arguments for every run, e.g. "--no-llm --repeat 3"')
+    sweep_parser.add_argument("--latency-metric", metavar="TEST.METRIC",
+                              help="Metric used as latency in the Pareto summary (default: end-to-end latency "
+                                   "if measured, else transcription RTF)")
+    sweep_parser.add_argument("--timeout", type=float, help="Maximum duration of one point in seconds")
+
+    import_parser = subparsers.add_parser("import", help="Convert text logs of a host directory to JSON baselines")
+    import_parser.add_argument("directories", nargs="+", help="Host log directories, e.g. performance_logs/raspberrypi5")
     return parser.parse_args()
 
+def run_compare(args):
+    comparison = compare_results(load_results(args.current), load_results(args.baseline), dict(args.threshold or []))
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print(format_comparison(comparison))
+    return 1 if has_regressions(comparison, args.ignore_throttled) else 0
+
+def run_load(args):
+    component_results = [
+        run_load_test(component, sorted(args.levels) if args.levels else None, args.requests_per_client)
+        for component in args.components
+    ]
+    print(format_load_results(component_results))
+    if args.save:
+        print(f"Results saved to: {save_load_results(component_results)}")
+    return 0
+
+def run_cold_start_benchmark(args):
+    results = run_cold_start(args.components, args.runs, args.steady_runs, overrides=args.set)
+    print(format_cold_start_results(results))
+    if args.save:
+        print(f"Results saved to: {save_benchmark_json('cold_start', 'cold_start_results', results)}")
+    return 0
+
+def run_grid_sweep(args):
+    summary = run_sweep(load_grid(args.grid, args.param), shlex.split(args.suite_args),
+                        args.latency_metric, timeout=args.timeout)
+    print(format_pareto_summary(summary))
+    return 0
+
+def run_import(args):
+    for directory in args.directories:
+        written = import_text_logs(directory)
+        print(f"{directory}: imported {len(written)} text logs")
+    return 0
+
 if __name__ == "__main__":
     args = parse_arguments()
-    run_performance_tests(
+    for assignment in args.set:
+        apply_override(assignment)
+    install_session_defaults()
+    if args.command == "cold-start":
+        sys.exit(run_cold_start_benchmark(args))
+    if args.command == "sweep":
+        sys.exit(run_grid_sweep(args))
+    if args.command == "compare":
+        sys.exit(run_compare(args))
+    if args.command == "load":
+        sys.exit(run_load(args))
+    if args.command == "import":
+        sys.exit(run_import(args))
+    document = run_performance_tests(
         run_transcription=not args.no_transcription,
         run_synthesis=not args.no_synthesis,
         run_llm=not args.no_llm,
-        should_save_results=args.save
+        should_save_results=args.save,
+        repetitions=resolve_counts(args.repeat, "repeat"),
+        warmups=resolve_counts(args.warmup, "warmup"),
+        compare_to=args.compare_to,
+        thresholds=dict(args.threshold or []),
+        end_to_end_use_cases=resolve_use_cases(args.end_to_end),
+        audio_path_replay=args.audio_path
     )
+    if document and args.results_json:
+        with open(args.results_json, "w") as f:
+            json.dump(document, f, indent=2, default=str)
+    if document and has_regressions(document.get("comparison", []), args.ignore_throttled):
+        sys.exit(1)
@@ -3,7 +3,13 @@ from .base_test import PerformanceTest
 from .transcription_test import TranscriptionTest
 from .synthesis_test import SynthesisTest
 from .llm_inference_test import LLMInferenceTest
-from .utils import calculate_stats, format_results, save_results
+from .end_to_end_test import EndToEndTest
+from .audio_path_test import AudioPathTest
+from .utils import calculate_stats, word_error_rate, format_results, save_results
+from .results import load_results, compare_results, import_text_logs
+from .load_test import run_load_test
+from .sweep import run_sweep
+from .cold_start import run_cold_start
 from .run import run_performance_tests
 from .evaluation_texts import texts
 from .ollama_test_utils import get_stats as get_ollama_stats
@@ -13,10 +19,19 @@ __all__ = [
     'TranscriptionTest',
     'SynthesisTest',
     'LLMInferenceTest',
+    'EndToEndTest',
+    'AudioPathTest',
     'calculate_stats',
+    'word_error_rate',
     'format_results',
     'save_results',
+    'load_results',
+    'compare_results',
+    'import_text_logs',
     'run_performance_tests',
+    'run_load_test',
+    'run_sweep',
+    'run_cold_start',
     'texts',
     'get_ollama_stats'
 ]
@@ -0,0 +1,110 @@
+import logging
+import time
+from queue import Queue
+
+import numpy as np
+import psutil
+
+from .base_test import PerformanceTest
+
+# Amplitude below which samples of a recording count as silence
+SILENCE_LEVEL = 0.02
+
+class TimedQueue(Queue):
+    """Queue recording how long each item waited between put and get"""
+
+    def __init__(self):
+        super().__init__()
+        self.put_times = []
+        self.wait_times = []
+
+    def _put(self, item):
+        self.put_times.append(time.time())
+        super()._put(item)
+
+    def _get(self):
+        self.wait_times.append(time.time() - self.put_times[len(self.wait_times)])
+        return super()._get()
+
+class TimedVAD:
+    """VAD iterator wrapper recording the duration of every call"""
+
+    def __init__(self, vad):
+        self.vad = vad
+        self.call_times = []
+
+    def __call__(self, chunk, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = self.vad(chunk, *args, **kwargs)
+        self.call_times.append(time.perf_counter() - start_time)
+        return result
+
+    def reset_states(self):
+        self.vad.reset_states()
+
+def end_of_speech_delay(stream, consumed_chunks, detected_at=None):
+    """
+    Return the delay between the last voiced sample before detection and the detection of the end of speech.
+    Without detected_at, as for replay as fast as possible, the delay is measured in audio time: how much
+    audio the VAD had to consume past the end of speech. With detected_at, the wall time of the detection,
+    it also includes the processing lag behind the real-time input.
+    """
+    consumed_samples = consumed_chunks * stream.blocksize
+    voiced = np.nonzero(np.abs(stream.audio[:consumed_samples]) > SILENCE_LEVEL)[0]
+    speech_end = int(voiced[-1]) + 1 if len(voiced) else min(consumed_samples, len(stream.audio))
+    if detected_at is None:
+        return (consumed_samples - speech_end) / stream.samplerate
+    block_idx = (speech_end - 1) // stream.blocksize
+    block_end = (block_idx + 1) * stream.blocksize
+    return detected_at - stream.block_times[block_idx] + (block_end - speech_end) / stream.samplerate
+
+class AudioPathTest(PerformanceTest):
+    """
+    Measures the audio input path with a recording replayed by the fake input device instead of the
+    microphone, so that every run sees exactly the same audio: VAD cost per chunk, latency from the input
+    callback to the capture loop taking the chunk from the queue, and delay of end of speech detection.
+    The callback to queue latency is only meaningful in real time, since a replay as fast as possible
+    queues chunks faster than they are consumed.
+    """
+
+    def __init__(self, realtime=True):
+        super().__init__("audio_path", f"Audio input path ({'real time' if realtime else 'fast'} replay)")
+        self.realtime = realtime
+        self.audio_handler = None
+        self.vad = None
+        for metric_name in ("vad_chunk_ms_values", "callback_to_queue_ms_values", "end_of_speech_delay_values"):
+            self.metrics[metric_name] = []
+
+    def run_test(self, wav_file, collect_metrics=True):
+        from core.audio_devices import ReplayInputDevice, set_input_device
+        from pipeline_components.audio_handler import AudioHandler
+
+        if self.audio_handler is None:
+            self.audio_handler = AudioHandler(logging.getLogger(__name__))
+            self.vad = self.audio_handler.create_vad()
+        self.vad.reset_states()
+        vad = TimedVAD(self.vad)
+        q = TimedQueue()
+
+        device = ReplayInputDevice(wav_file, self.realtime)
+        previous_device = set_input_device(device)
+        try:
+            with self.audio_handler.open_input_stream(q):
+                speech_segment = self.audio_handler.capture_utterance(q, vad)
+                detected_at = time.time()
+        finally:
+            set_input_device(previous_device)
+        if speech_segment is None:
+            return {"error": f"No speech detected in {wav_file}"}
+
+        delay = end_of_speech_delay(device.last_stream, len(q.wait_times), detected_at if self.realtime else None)
+
+        self.add_metric("ram_usages", psutil.Process().memory_info().rss / (1024 * 1024), collect_metrics)
+        for call_time in vad.call_times:
+            self.add_metric("vad_chunk_ms_values", call_time * 1000, collect_metrics)
+        if self.realtime:
+            for wait_time in q.wait_times:
+                self.add_metric("callback_to_queue_ms_values", wait_time * 1000, collect_metrics)
+        self.add_metric("end_of_speech_delay_values", delay, collect_metrics)
+
+        return {"chunks": len(vad.call_times), "end_of_speech_delay": delay}
@@ -34,8 +34,21 @@ class PerformanceTest(ABC):
         """Calculate statistics for the collected metrics"""
         precision_map = {
             "rtf": 3,
+            "wer": 3,
             "ram_usage": 2,
-            "eval_rate": 2
+            "eval_rate": 2,
+            "ttft": 3,
+            "prompt_eval_rate": 2,
+            "load_duration": 3,
+            "total_latency": 3,
+            "vad_end_delay": 3,
+            "transcription_time": 3,
+            "llm_ttft": 3,
+            "llm_first_sentence": 3,
+            "synthesis_time": 3,
+            "vad_chunk_ms": 3,
+            "callback_to_queue_ms": 3,
+            "end_of_speech_delay": 3
         }
 
         results = {
@@ -45,8 +58,8 @@ class PerformanceTest(ABC):
 
         for metric_name, values in self.metrics.items():
             if metric_name != "ram_usages" and values:
-                if metric_name == "rtf_values":
-                    base_name = "rtf"
+                if metric_name.endswith("_values"):
+                    base_name = metric_name[:-len("_values")]
                 elif metric_name == "eval_rates":
                     base_name = "eval_rate"
                 else:
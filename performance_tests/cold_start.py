@@ -0,0 +1,160 @@
+"""Cold-start benchmark.
+
+Each measurement runs this file as a script in a fresh interpreter, which reports on stdout how long
+each phase took: interpreter startup, imports, model load, first inference and steady-state inference
+with the same loaded model. Run as a script, it does not import the performance_tests package, so
+imports are measured from a clean interpreter. The import phase covers the package of the component's
+model only, since importing the core package also imports the packages of the other components.
+"""
+import time
+
+CHILD_START_TIME = time.time()
+
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPONENTS = ["transcription", "synthesis", "llm"]
+
+PHASES = ["interpreter", "import", "model_load", "first_inference", "steady_inference", "boot_to_ready"]
+
+# Package imported in the import phase of each component
+MODEL_PACKAGES = {"transcription": "moonshine_onnx", "synthesis": "piper.voice", "llm": "ollama"}
+
+def _timed(function):
+    start_time = time.time()
+    result = function()
+    return result, time.time() - start_time
+
+def measure_transcription(steady_runs):
+    """Measure moonshine phases on the first evaluation recording"""
+    from core.transcriber import Transcriber, get_stats
+
+    wav_file = os.path.join(REPO_DIR, "wav_performance_tests", "text_1.wav")
+    transcriber, load_time = _timed(lambda: Transcriber(return_stats=True))
+    _, first_time = _timed(lambda: get_stats(wav_file, transcriber))
+    steady_times = [_timed(lambda: get_stats(wav_file, transcriber))[1] for _ in range(steady_runs)]
+    return load_time, first_time, steady_times
+
+def measure_synthesis(steady_runs):
+    """Measure piper phases on the first evaluation text, without the phrase cache"""
+    from core.config import Config
+    from core.synthesizer import Synthesizer
+    from performance_tests.evaluation_texts import texts
+
+    synthesizer = Synthesizer(Config.SYNTHESIS.PIPER_MODEL_PATH)
+    loaded, load_time = _timed(synthesizer.load)
+    if not loaded:
+        raise RuntimeError("Failed to load the Piper voice")
+    _, first_time = _timed(lambda: synthesizer.synthesize_pcm(texts[0]))
+    steady_times = [_timed(lambda: synthesizer.synthesize_pcm(texts[0]))[1] for _ in range(steady_runs)]
+    return load_time, first_time, steady_times
+
+def measure_llm(steady_runs):
+    """
+    Measure ollama phases. The model is unloaded from the ollama service first, so that model load
+    covers reading it from disk, as after a reboot.
+    """
+    import logging
+    import ollama
+    from core.config import Config
+    from pipeline_components.llm_handler import LLMHandler
+    from performance_tests.evaluation_texts import llm_prompts
+    from performance_tests.ollama_test_utils import run_ollama_chat
+
+    model_name = Config.LLM.MODEL
+    ollama.generate(model=model_name, keep_alive=0)
+    # A request without prompt only loads the model
+    _, load_time = _timed(lambda: ollama.generate(model=model_name))
+
+    prompt = llm_prompts[1]
+    messages = LLMHandler(logging.getLogger(__name__)).build_messages(prompt["text"], prompt["use_case"])
+    _, first_time = _timed(lambda: run_ollama_chat(messages, model_name))
+    steady_times = [_timed(lambda: run_ollama_chat(messages, model_name))[1] for _ in range(steady_runs)]
+    return load_time, first_time, steady_times
+
+def run_child(component, steady_runs, parent_start_time, overrides=()):
+    """
+    Measure all phases of one component in this fresh interpreter and print them as JSON.
+    The configuration overrides are applied after the import phase, as performance_test.py does with --set.
+    """
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(REPO_DIR)
+    measure = {"transcription": measure_transcription, "synthesis": measure_synthesis, "llm": measure_llm}[component]
+    _, import_time = _timed(lambda: __import__(MODEL_PACKAGES[component]))
+
+    from core.config_utils import apply_override
+    from core.onnx_threads import install_session_defaults
+    for assignment in overrides:
+        apply_override(assignment)
+    install_session_defaults()
+    load_time, first_time, steady_times = measure(steady_runs)
+
+    interpreter_time = CHILD_START_TIME - parent_start_time
+    print(json.dumps({
+        "interpreter": interpreter_time,
+        "import": import_time,
+        "model_load": load_time,
+        "first_inference": first_time,
+        "steady_inference": sum(steady_times) / len(steady_times) if steady_times else None,
+        "boot_to_ready": interpreter_time + import_time + load_time + first_time
+    }))
+
+def run_cold_start(components=None, runs=3, steady_runs=3, timeout=None, overrides=()):
+    """
+    Measure cold-start phases of each component in fresh subprocesses.
+
+    Args:
+        components (list, optional): Components among "transcription", "synthesis", "llm". Defaults to all.
+        runs (int, optional): Number of fresh subprocesses per component.
+        steady_runs (int, optional): Inferences after the first one, reusing the loaded model.
+        timeout (float, optional): Maximum duration of one subprocess in seconds.
+        overrides (list, optional): "SECTION.PARAM=VALUE" configuration overrides applied in every subprocess.
+
+    Returns:
+        dict: Statistics of every phase, in seconds, per component.
+    """
+    from .utils import calculate_stats
+
+    results = {}
+    for component in components or COMPONENTS:
+        samples = {phase: [] for phase in PHASES}
+        errors = []
+        for _ in range(runs):
+            parent_start_time = time.time()
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), component, str(steady_runs), repr(parent_start_time),
+                 *overrides],
+                capture_output=True, text=True, timeout=timeout, cwd=REPO_DIR
+            )
+            output = completed.stdout.strip().splitlines()
+            if completed.returncode != 0 or not output:
+                errors.append(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                              else f"Exit status {completed.returncode}")
+                continue
+            for phase, value in json.loads(output[-1]).items():
+                if value is not None:
+                    samples[phase].append(value)
+        results[component] = {phase: calculate_stats(values, 3) for phase, values in samples.items()}
+        results[component]["errors"] = errors
+    return results
+
+def format_cold_start_results(results):
+    """Format cold-start results as one table per component, with average and p90 of every phase"""
+    lines = ["Cold Start Results:"]
+    for component, phases in results.items():
+        lines.append("")
+        lines.append(f"{component.capitalize()}:")
+        lines.append(f"  {'Phase':<20}{'Average (s)':>12}{'p90 (s)':>10}{'Samples':>9}")
+        for phase in PHASES:
+            stats = phases[phase]
+            lines.append(f"  {phase.replace('_', ' ').capitalize():<20}{stats['avg']:>12}{stats['p90']:>10}{stats['samples']:>9}")
+        for error in phases["errors"]:
+            lines.append(f"  Failed run: {error}")
+    return "\n".join(lines) + "\n"
+
+if __name__ == "__main__":
+    run_child(sys.argv[1], int(sys.argv[2]), float(sys.argv[3]), sys.argv[4:])
@@ -0,0 +1,120 @@
+import logging
+import time
+
+import psutil
+
+from .base_test import PerformanceTest
+from .audio_path_test import end_of_speech_delay
+
+def load_pipeline_handlers():
+    """
+    Load the audio, transcription, LLM and synthesis handlers once, to be shared by all end-to-end tests.
+    The synthesis handler is built without the phrase cache, so that every run measures Piper.
+    """
+    from core.config import Config
+    from pipeline_components.audio_handler import AudioHandler
+    from pipeline_components.transcriber_handler import TranscriberHandler
+    from pipeline_components.llm_handler import LLMHandler
+    from pipeline_components.synthesis_handler import SynthesisHandler
+
+    logger = logging.getLogger(__name__)
+    cache_enabled, Config.SYNTHESIS.CACHE_ENABLED = Config.SYNTHESIS.CACHE_ENABLED, False
+    try:
+        synthesis = SynthesisHandler(logger)
+    finally:
+        Config.SYNTHESIS.CACHE_ENABLED = cache_enabled
+    return {
+        "audio": AudioHandler(logger),
+        "transcriber": TranscriberHandler(logger),
+        "llm": LLMHandler(logger),
+        "synthesis": synthesis
+    }
+
+class EndToEndTest(PerformanceTest):
+    """
+    Measures the latency users perceive: from the end of their speech to the first synthesized audio buffer.
+
+    A recording is replayed chunk by chunk through the VAD by the fake input device, then the
+    captured utterance goes through transcription, streamed LLM generation and synthesis of the first
+    complete sentence, as in the staged pipeline. Generation stops as soon as the first audio buffer is ready.
+    End of speech detection is measured in audio time, since live audio arrives in real time; all other
+    stages are measured in wall time.
+    """
+
+    def __init__(self, use_case, handlers):
+        super().__init__(f"end_to_end_{use_case}", f"End-to-end voice to first audio ({use_case})")
+        self.use_case = use_case
+        self.handlers = handlers
+        self.vad = None
+        for metric_name in ("total_latency_values", "vad_end_delay_values", "transcription_time_values",
+                            "llm_ttft_values", "llm_first_sentence_values", "synthesis_time_values"):
+            self.metrics[metric_name] = []
+
+    def run_test(self, wav_file, collect_metrics=True):
+        from core.config import Config
+        from core.audio_devices import ReplayInputDevice, set_input_device
+        from pipeline_components.staged_pipeline import SentenceSegmenter
+        from .audio_path_test import TimedQueue
+
+        audio_handler = self.handlers["audio"]
+
+        if self.vad is None:
+            self.vad = audio_handler.create_vad()
+        self.vad.reset_states()
+
+        device = ReplayInputDevice(wav_file, realtime=False)
+        previous_device = set_input_device(device)
+        q = TimedQueue()
+        try:
+            with audio_handler.open_input_stream(q):
+                speech_segment = audio_handler.capture_utterance(q, self.vad)
+        finally:
+            set_input_device(previous_device)
+        if speech_segment is None:
+            return {"error": f"No speech detected in {wav_file}"}
+        vad_end_delay = end_of_speech_delay(device.last_stream, len(q.wait_times))
+
+        start_time = time.time()
+        transcription = self.handlers["transcriber"].transcribe(speech_segment)
+        transcription_time = time.time() - start_time
+        if not transcription:
+            return {"error": f"Empty transcription for {wav_file}"}
+
+        llm = self.handlers["llm"]
+        segmenter = SentenceSegmenter(self.use_case, logging.getLogger(__name__))
+        first_sentence = None
+        ttft = None
+        start_time = time.time()
+        for token in llm.chat_stream(Config.LLM.MODEL, llm.build_messages(transcription, self.use_case)):
+            if ttft is None:
+                ttft = time.time() - start_time
+            first_sentence = next(iter(segmenter.feed(token)), None)
+            if first_sentence:
+                break
+        if first_sentence is None:
+            first_sentence = next(iter(segmenter.flush()), None)
+        first_sentence_time = time.time() - start_time
+        if not first_sentence:
+            return {"error": "No sentence to synthesize in the LLM output"}
+
+        start_time = time.time()
+        first_audio = self.handlers["synthesis"].synthesize_pcm(first_sentence)
+        synthesis_time = time.time() - start_time
+        if first_audio is None or len(first_audio) == 0:
+            return {"error": "Synthesis of the first sentence failed"}
+
+        total_latency = vad_end_delay + transcription_time + first_sentence_time + synthesis_time
+
+        self.add_metric("ram_usages", psutil.Process().memory_info().rss / (1024 * 1024), collect_metrics)
+        self.add_metric("total_latency_values", total_latency, collect_metrics)
+        self.add_metric("vad_end_delay_values", vad_end_delay, collect_metrics)
+        self.add_metric("transcription_time_values", transcription_time, collect_metrics)
+        self.add_metric("llm_ttft_values", ttft, collect_metrics)
+        self.add_metric("llm_first_sentence_values", first_sentence_time, collect_metrics)
+        self.add_metric("synthesis_time_values", synthesis_time, collect_metrics)
+
+        return {
+            "transcription": transcription,
+            "first_sentence": first_sentence,
+            "total_latency": total_latency
+        }
@@ -5,3 +5,16 @@ texts = [
     "Online education has transformed the way we learn. With digital platforms, students can access lectures, tutorials, and interactive content from anywhere in the world. This flexibility allows personalized learning experiences and opens up opportunities for people who might otherwise be excluded from traditional education systems.",
     "Artificial intelligence is changing every aspect of modern life. From smart assistants and recommendation systems to medical diagnostics and autonomous vehicles, AI technologies are becoming more powerful and widespread. Ethical considerations and regulation are key to ensuring that these systems benefit society as a whole."
 ]
+
+# LLM prompts of increasing length, sent with the system prompt of their use case as in the pipeline
+llm_prompts = [
+    {"name": "greeting", "use_case": "general", "text": "Hi!"},
+    {"name": "question", "use_case": "general",
+     "text": "A farmer has 17 sheep, and all but 9 run away. How many sheep does the farmer have left?"},
+    {"name": "thermostat_request", "use_case": "thermostat",
+     "text": "Set the bedroom temperature to 22 degrees Celsius for tonight."},
+    {"name": "thermostat_schedule", "use_case": "thermostat",
+     "text": "I'm leaving for vacation for a week. Can you set up an energy-saving schedule?"},
+    {"name": "summary", "use_case": "general", "text": f"Summarize this text in one sentence: {texts[0]}"},
+    {"name": "long_summary", "use_case": "general", "text": f"Summarize these texts in one sentence: {' '.join(texts)}"}
+]
@@ -1,3 +1,4 @@
+import logging
 from .base_test import PerformanceTest
 from .ollama_test_utils import get_stats as get_ollama_stats
 
@@ -6,9 +7,31 @@ class LLMInferenceTest(PerformanceTest):
         super().__init__("llm_inference", f"LLM inference ({model_name})")
         self.model_name = model_name
         self.metrics["eval_rates"] = []
+        self.metrics["ttft_values"] = []
+        self.metrics["prompt_eval_rate_values"] = []
+        self.metrics["load_duration_values"] = []
+        self.prompt_results = []
+
+    def run_test(self, prompt=None, collect_metrics=True):
+        """
+        Run one prompt through the model.
+        :param prompt: Dict with "name", "use_case" and "text". The messages are built with the system
+                       prompt of the use case, as in the pipeline. Defaults to a short greeting.
+        """
+        from pipeline_components.llm_handler import LLMHandler
+
+        prompt = prompt or {"name": "greeting", "use_case": "general", "text": "Hi!"}
+        messages = LLMHandler(logging.getLogger(__name__)).build_messages(
+            prompt["text"], prompt["use_case"], self.model_name)
+        result = get_ollama_stats(self.model_name, messages=messages)
+        if "error" in result:
+            return result
 
-    def run_test(self, collect_metrics=True):
-        result = get_ollama_stats(self.model_name)
         self.add_metric("ram_usages", result["ram_usage_mb"], collect_metrics)
-        self.add_metric("eval_rates", result.get("eval_rate", 0), collect_metrics)
+        self.add_metric("eval_rates", result["eval_rate"], collect_metrics)
+        self.add_metric("ttft_values", result["ttft"], collect_metrics)
+        self.add_metric("prompt_eval_rate_values", result["prompt_eval_rate"], collect_metrics)
+        self.add_metric("load_duration_values", result["load_duration"], collect_metrics)
+        if collect_metrics:
+            self.prompt_results.append(dict(result, prompt=prompt["name"]))
         return result
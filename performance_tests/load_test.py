@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .evaluation_texts import texts, llm_prompts
+from .utils import calculate_stats
+
+DEFAULT_CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+
+# Latency p90 growth over the lowest concurrency level past which latency is considered to explode
+KNEE_LATENCY_FACTOR = 2.0
+
+def make_transcription_request(wav_file):
+    """Build a request function transcribing a recording with one shared, resident moonshine model"""
+    import logging
+    from core.config import Config
+    from pipeline_components.transcriber_handler import TranscriberHandler
+    from core.audio_devices import read_wav_float
+
+    transcriber = TranscriberHandler(logging.getLogger(__name__))
+    audio = read_wav_float(wav_file, Config.AUDIO.SAMPLING_RATE)
+
+    def request():
+        if not transcriber.transcribe(audio):
+            raise RuntimeError("Empty transcription")
+    return request
+
+def make_synthesis_request(text):
+    """
+    Build a request function synthesizing a text, without the phrase cache.
+    With SYNTHESIS.PARALLEL_WORKERS > 1, requests are spread over the worker processes. Otherwise they are
+    serialized on the single in-process voice, which is not thread-safe, as in server mode.
+    """
+    from core.config import Config
+    from core.synthesizer import Synthesizer
+
+    synthesizer = Synthesizer(Config.SYNTHESIS.PIPER_MODEL_PATH, workers=Config.SYNTHESIS.PARALLEL_WORKERS)
+    lock = threading.Lock() if Config.SYNTHESIS.PARALLEL_WORKERS <= 1 else None
+
+    def request():
+        if lock is not None:
+            with lock:
+                audio, _ = synthesizer.synthesize_pcm(text)
+        else:
+            audio, _ = synthesizer.synthesize_pcm(text)
+        if audio is None or len(audio) == 0:
+            raise RuntimeError("Synthesis failed")
+    request.close = synthesizer.close
+    return request
+
+def make_llm_request(prompt):
+    """Build a request function sending a prompt to ollama. Parallelism is bounded by OLLAMA_NUM_PARALLEL."""
+    import logging
+    from core.config import Config
+    from pipeline_components.llm_handler import LLMHandler
+    from .ollama_test_utils import run_ollama_chat
+
+    messages = LLMHandler(logging.getLogger(__name__)).build_messages(prompt["text"], prompt["use_case"])
+
+    def request():
+        result = run_ollama_chat(messages, Config.LLM.MODEL)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+    return request
+
+def run_concurrency_level(request, concurrency, requests_per_client):
+    """
+    Drive a request function with closed-loop clients, each sending its next request as soon as
+    the previous one completes.
+
+    Returns:
+        dict: Throughput in requests per second, latency statistics in seconds and the error count.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests_per_client):
+            start_time = time.time()
+            try:
+                request()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.time() - start_time)
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client) for _ in range(concurrency)]:
+            future.result()
+    wall_time = time.time() - start_time
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "wall_time": round(wall_time, 3),
+        "throughput": round(len(latencies) / wall_time, 3) if wall_time > 0 else 0.0,
+        "latency": calculate_stats(latencies, 3)
+    }
+
+def find_knee(levels):
+    """
+    Return the highest concurrency level whose p90 latency stays within KNEE_LATENCY_FACTOR of the
+    lowest level's, or None if no level completed requests.
+    """
+    completed = [level for level in levels if level["requests"]]
+    if not completed:
+        return None
+    baseline_p90 = completed[0]["latency"]["p90"]
+    knee = completed[0]["concurrency"]
+    for level in completed[1:]:
+        if level["latency"]["p90"] > baseline_p90 * KNEE_LATENCY_FACTOR:
+            break
+        knee = level["concurrency"]
+    return knee
+
+def run_load_test(component, concurrency_levels=None, requests_per_client=3):
+    """
+    Step the number of concurrent clients of a component upward and measure throughput and latency.
+    Stepping stops at the first level past the knee, since latency only grows from there.
+
+    Args:
+        component (str): One of "transcription", "synthesis", "llm".
+        concurrency_levels (list, optional): Numbers of concurrent clients to test, in increasing order.
+        requests_per_client (int, optional): Requests sent by each client at every level.
+
+    Returns:
+        dict: Results per concurrency level and the knee.
+    """
+    concurrency_levels = concurrency_levels or DEFAULT_CONCURRENCY_LEVELS
+    if component == "transcription":
+        request = make_transcription_request("./wav_performance_tests/text_1.wav")
+    elif component == "synthesis":
+        request = make_synthesis_request(texts[0])
+    elif component == "llm":
+        request = make_llm_request(llm_prompts[1])
+    else:
+        raise ValueError(f"Unknown component '{component}'")
+
+    # Load models and caches before the first measured level
+    request()
+
+    levels = []
+    try:
+        for concurrency in concurrency_levels:
+            print(f"  {component}: {concurrency} concurrent clients...")
+            levels.append(run_concurrency_level(request, concurrency, requests_per_client))
+            if find_knee(levels) != levels[-1]["concurrency"]:
+                break
+    finally:
+        if hasattr(request, "close"):
+            request.close()
+
+    return {
+        "component": component,
+        "requests_per_client": requests_per_client,
+        "levels": levels,
+        "knee": find_knee(levels)
+    }
+
+def save_load_results(load_results):
+    """Save load test results as JSON with the host fingerprint in the performance logs of this machine"""
+    from .results import save_benchmark_json
+    return save_benchmark_json("load", "load_results", load_results)
+
+def format_load_results(load_results):
+    """Format load test results as one table per component"""
+    lines = ["Load Test Results:"]
+    for result in load_results:
+        lines.append("")
+        lines.append(f"{result['component'].capitalize()}:")
+        lines.append(f"  {'Clients':>8}{'Req/s':>10}{'p50 (s)':>10}{'p90 (s)':>10}{'p99 (s)':>10}{'Errors':>8}")
+        for level in result["levels"]:
+            latency = level["latency"]
+            lines.append(f"  {level['concurrency']:>8}{level['throughput']:>10}{latency['p50']:>10}"
+                         f"{latency['p90']:>10}{latency['p99']:>10}{level['errors']:>8}")
+        if result["knee"] is None:
+            lines.append("  No request completed.")
+        else:
+            lines.append(f"  Knee: {result['knee']} concurrent clients "
+                         f"(p90 latency within {KNEE_LATENCY_FACTOR}x of the lowest level)")
+    return "\n".join(lines) + "\n"
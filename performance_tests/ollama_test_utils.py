@@ -1,102 +1,117 @@
-import re
-import subprocess
 import psutil
 import threading
 import time
 import json
+import ollama
 
-def parse_ollama_output(stderr_output):
-    """
-    Parses the stderr output from the 'ollama run' command to extract metrics.
-
-    Args:
-        stderr_output (str): The stderr output string.
+# Maximum number of generated tokens per benchmark prompt, to keep test duration bounded
+DEFAULT_MAX_TOKENS = 128
 
-    Returns:
-        dict: A dictionary containing the extracted metrics.
+def run_ollama_chat(messages, model_name, max_tokens=DEFAULT_MAX_TOKENS):
     """
-    metrics = {}
-    pattern = r"([\w\s]+):\s+([\d.]+)([a-zA-Z]*)"
-    for line in stderr_output.splitlines():
-        match = re.match(pattern, line)
-        if match:
-            key = match.group(1).strip().replace(" ", "_").lower()
-            value = float(match.group(2))
-            unit = match.group(3)
-            metrics[key] = f"{value}{unit}" if unit else value
-    return metrics
-
-def run_ollama_command(model_input, model_name):
-    """
-    Runs LLM inference with ollama on specified model with given input.
+    Runs streamed LLM inference with the ollama API and collects timing metrics.
 
     Args:
-        model_input (str): The text to pass to the model.
+        messages (list): The chat messages to send to the model.
         model_name (str): The name of the model to use.
+        max_tokens (int, optional): Maximum number of tokens to generate.
 
     Returns:
-        dict: A dictionary containing the parsed metrics or an error message.
+        dict: A dictionary containing the metrics or an error message. Durations are in seconds,
+              rates in tokens per second.
     """
-    command = ["ollama", "run", model_name, "--verbose", model_input]
+    start_time = time.time()
+    first_token_time = None
+    final_chunk = None
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        stats = parse_ollama_output(result.stderr.strip())
-        return stats
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {e}")
-        return {"error": e.stderr.strip()}
-
-def get_ram_usage():
+        for chunk in ollama.chat(model=model_name, messages=messages, stream=True,
+                                 options={"num_predict": max_tokens}):
+            if first_token_time is None and chunk['message']['content']:
+                first_token_time = time.time()
+            if chunk.get('done'):
+                final_chunk = chunk
+    except Exception as e:
+        print(f"Error running ollama chat: {e}")
+        return {"error": str(e)}
+    end_time = time.time()
+
+    if final_chunk is None:
+        return {"error": "Stream ended without final statistics"}
+
+    def seconds(key):
+        return (final_chunk.get(key) or 0) / 1e9
+
+    def rate(count_key, duration_key):
+        duration = seconds(duration_key)
+        return round((final_chunk.get(count_key) or 0) / duration, 2) if duration > 0 else 0.0
+
+    return {
+        "ttft": round((first_token_time or end_time) - start_time, 3),
+        "total_duration": round(end_time - start_time, 3),
+        "load_duration": round(seconds('load_duration'), 3),
+        "prompt_eval_count": final_chunk.get('prompt_eval_count') or 0,
+        "prompt_eval_duration": round(seconds('prompt_eval_duration'), 3),
+        "prompt_eval_rate": rate('prompt_eval_count', 'prompt_eval_duration'),
+        "eval_count": final_chunk.get('eval_count') or 0,
+        "eval_duration": round(seconds('eval_duration'), 3),
+        "eval_rate": rate('eval_count', 'eval_duration')
+    }
+
+def monitor_ram_usage(stop_event, result, process_name="ollama", interval=1.0):
     """
-    Monitors the RAM usage of LLM inference with ollama.
+    Monitors the RAM usage of LLM inference with ollama until stop_event is set.
 
-    Returns:
-        float: The maximum RAM usage in MB during the process execution.
+    Args:
+        stop_event (threading.Event): Event that ends the monitoring.
+        result (dict): Dictionary in which the maximum RAM usage in MB is stored under "ram_usage_mb".
     """
-    process_name = "ollama"
     max_ram_usage = 0
-    while not chat_completed:
+    while True:
+        ram_usage = 0
         for proc in psutil.process_iter(['name', 'cmdline', 'pid']):
-            ram_usage = 0
             if proc.info['name'] != process_name:
                 continue
             try:
-                cmd = proc.info['cmdline']
-                if proc.info['name'].lower() == "ollama" and ("serve" in cmd or "runner" in cmd):
-                    p = psutil.Process(proc.info['pid'])
-                    mem_rss = p.memory_info().rss / (1024 ** 2)
-                    ram_usage += mem_rss
+                cmd = proc.info['cmdline'] or []
+                if "serve" in cmd or "runner" in cmd:
+                    ram_usage += psutil.Process(proc.info['pid']).memory_info().rss / (1024 ** 2)
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
-            if ram_usage > max_ram_usage:
-                max_ram_usage = ram_usage
-        time.sleep(1)
-    return round(max_ram_usage, 2)
+        max_ram_usage = max(max_ram_usage, ram_usage)
+        result["ram_usage_mb"] = round(max_ram_usage, 2)
+        if stop_event.wait(interval):
+            break
 
-def get_stats(model_name, model_input="Hi!"):
+def get_stats(model_name, model_input="Hi!", system_prompt=None, messages=None, max_tokens=DEFAULT_MAX_TOKENS):
     """
     Retrieves statistics for a given model during inference with ollama.
 
     Args:
         model_name (str): The name of the model to run.
         model_input (str, optional): The input text for the model. Defaults to "Hi!".
+        system_prompt (str, optional): System prompt sent before the input text.
+        messages (list, optional): Complete chat messages, overriding model_input and system_prompt.
+        max_tokens (int, optional): Maximum number of tokens to generate.
 
     Returns:
         dict: A dictionary containing the model's statistics, including RAM usage.
     """
-    global chat_completed, ram_usage
-    chat_completed = False
-    ram_usage = 0
-
-    thread = threading.Thread(target=lambda: globals().__setitem__('ram_usage', get_ram_usage()))
+    if messages is None:
+        messages = [{"role": "user", "content": model_input}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+
+    ram_result = {"ram_usage_mb": 0}
+    stop_event = threading.Event()
+    thread = threading.Thread(target=monitor_ram_usage, args=(stop_event, ram_result), daemon=True)
     thread.start()
 
-    ollama_stats = run_ollama_command(model_input, model_name)
+    ollama_stats = run_ollama_chat(messages, model_name, max_tokens)
 
-    chat_completed = True
+    stop_event.set()
     thread.join()
 
-    ollama_stats["ram_usage_mb"] = ram_usage
+    ollama_stats["ram_usage_mb"] = ram_result["ram_usage_mb"]
 
     return ollama_stats
 
@@ -0,0 +1,283 @@
+import glob
+import hashlib
+import json
+import os
+import platform
+import re
+from datetime import datetime
+
+import psutil
+
+LOGS_DIR = "./performance_logs"
+
+# Metrics for which a lower value is a regression; for all others a higher value is
+HIGHER_IS_BETTER = {"eval_rate", "prompt_eval_rate"}
+
+DEFAULT_THRESHOLD_PCT = 5.0
+
+TEXT_METRIC_LABELS = {
+    "RAM Usage": "ram_usage",
+    "RAM Usage (MB)": "ram_usage",
+    "Real-Time Factor (RTF)": "rtf",
+    "Word Error Rate (WER)": "wer",
+    "Evaluation Rate": "eval_rate"
+}
+
+TEXT_STAT_LABELS = {
+    "Minimum": "min",
+    "Maximum": "max",
+    "Average": "avg",
+    "Median (p50)": "p50",
+    "p90": "p90",
+    "p99": "p99",
+    "Std deviation": "stdev"
+}
+
+def get_cpu_model():
+    """Read the CPU model name, falling back to the platform processor string"""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            cpuinfo = f.read()
+        # x86 reports "model name" per core, Raspberry Pi reports the board in "Model"
+        for key in ("model name", "Model", "Hardware"):
+            match = re.search(rf"^{key}\s*:\s*(.+)$", cpuinfo, re.MULTILINE)
+            if match:
+                return match.group(1).strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def describe_model_file(path):
+    """Return size and SHA-256 of a model file, so that runs with different model files are told apart"""
+    if not path or not os.path.isfile(path):
+        return {"path": path, "exists": False}
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return {"path": path, "exists": True, "size_bytes": os.path.getsize(path), "sha256": sha256.hexdigest()}
+
+def get_host_fingerprint():
+    """Describe the machine, model files and configuration a benchmark ran with"""
+    from core.config import Config
+    from core.config_utils import get_config_as_dict
+
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_model": get_cpu_model(),
+        "cpu_cores": psutil.cpu_count(logical=False),
+        "cpu_threads": psutil.cpu_count(logical=True),
+        "ram_mb": round(psutil.virtual_memory().total / (1024 * 1024)),
+        "models": {
+            "transcription": Config.TRANSCRIPTION.MOONSHINE_MODEL,
+            "synthesis": describe_model_file(Config.SYNTHESIS.PIPER_MODEL_PATH),
+            "llm": Config.LLM.MODEL
+        },
+        "config": get_config_as_dict()
+    }
+
+def build_results_document(results, disabled_components=None, settings=None, host=None):
+    """Wrap test results with their timestamp, host fingerprint and run settings"""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": host if host is not None else get_host_fingerprint(),
+        "settings": settings or {},
+        "disabled_components": disabled_components or [],
+        "results": results
+    }
+
+def save_results_json(document, log_folder_path, timestamp):
+    """Save a results document next to the text log and point the latest.json symlink at it"""
+    json_file_path = os.path.join(log_folder_path, f"results_{timestamp}.json")
+    with open(json_file_path, "w") as f:
+        json.dump(document, f, indent=2, default=str)
+
+    latest_link_path = os.path.join(log_folder_path, "latest.json")
+    if os.path.islink(latest_link_path) or os.path.exists(latest_link_path):
+        os.remove(latest_link_path)
+    os.symlink(os.path.basename(json_file_path), latest_link_path)
+    return json_file_path
+
+def save_benchmark_json(prefix, key, data):
+    """
+    Save the results of a standalone benchmark (load test, cold start, ...) with the host fingerprint
+    in the performance logs of this machine, as <prefix>_<timestamp>.json
+    """
+    log_folder_path = os.path.join(LOGS_DIR, platform.node())
+    os.makedirs(log_folder_path, exist_ok=True)
+    file_path = os.path.join(log_folder_path, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    document = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": get_host_fingerprint(),
+        key: data
+    }
+    with open(file_path, "w") as f:
+        json.dump(document, f, indent=2, default=str)
+    return file_path
+
+def _test_name_from_heading(heading):
+    heading = heading.lower()
+    if heading.startswith(("synthesis", "piper")):
+        return "synthesis"
+    if heading.startswith(("transcription", "moonshine")):
+        return "transcription"
+    if heading.startswith("llm inference"):
+        return "llm_inference"
+    return re.sub(r"\W+", "_", heading).strip("_")
+
+def parse_text_results(text):
+    """Parse a text log written by format_results back into a results dictionary"""
+    results = {}
+    test_name = None
+    metric_name = None
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("Performance Test Results"):
+            continue
+        indent = len(line) - len(line.lstrip())
+        label, _, value = line.strip().partition(":")
+        if indent == 0 and line.rstrip().endswith(":"):
+            # Headings may contain colons themselves, as in "LLM inference (granite3.2:2b):"
+            test_name = _test_name_from_heading(line.strip()[:-1])
+            results[test_name] = {}
+            metric_name = None
+        elif indent == 2 and test_name is not None:
+            metric_name = TEXT_METRIC_LABELS.get(label)
+            if metric_name:
+                results[test_name][metric_name] = {}
+        elif indent == 4 and test_name is not None and metric_name:
+            match = re.match(r"\s*(-?[\d.]+)", value)
+            if label in TEXT_STAT_LABELS and match:
+                results[test_name][metric_name][TEXT_STAT_LABELS[label]] = float(match.group(1))
+    return results
+
+def import_text_log(text_file_path, output_path=None):
+    """
+    Convert a text log into a results document usable as a baseline.
+    The host fingerprint only holds the hostname, taken from the log directory name.
+    """
+    with open(text_file_path, "r") as f:
+        results = parse_text_results(f.read())
+
+    hostname = os.path.basename(os.path.dirname(os.path.abspath(text_file_path)))
+    document = build_results_document(results, host={"hostname": hostname})
+    document["imported_from"] = text_file_path
+    match = re.search(r"results_(\d{8}_\d{6})", os.path.basename(text_file_path))
+    if match:
+        document["timestamp"] = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat()
+
+    if output_path is None:
+        output_path = os.path.splitext(text_file_path)[0] + ".json"
+    with open(output_path, "w") as f:
+        json.dump(document, f, indent=2)
+    return output_path
+
+def import_text_logs(directory):
+    """Convert every text log in a host directory. Returns the paths of the written JSON files."""
+    written = []
+    for text_file_path in sorted(glob.glob(os.path.join(directory, "results_*.txt"))):
+        json_file_path = os.path.splitext(text_file_path)[0] + ".json"
+        if not os.path.exists(json_file_path):
+            written.append(import_text_log(text_file_path, json_file_path))
+
+    # Mirror the latest text log so that the directory works as a JSON baseline
+    latest_text_path = os.path.join(directory, "latest")
+    latest_json_path = os.path.join(directory, "latest.json")
+    if os.path.exists(latest_text_path) and not os.path.lexists(latest_json_path):
+        target = os.path.splitext(os.path.basename(os.path.realpath(latest_text_path)))[0] + ".json"
+        if os.path.exists(os.path.join(directory, target)):
+            os.symlink(target, latest_json_path)
+    return written
+
+def load_results(reference):
+    """
+    Load a results document from a JSON file, a text log, a host log directory, or "latest"
+    for the most recent results of this machine.
+    """
+    if reference == "latest":
+        reference = os.path.join(LOGS_DIR, platform.node())
+    if os.path.isdir(reference):
+        for name in ("latest.json", "latest"):
+            candidate = os.path.join(reference, name)
+            if os.path.exists(candidate):
+                reference = candidate
+                break
+        else:
+            raise FileNotFoundError(f"No latest results in {reference}")
+    if not os.path.exists(reference):
+        raise FileNotFoundError(f"Results file {reference} not found")
+
+    if reference.endswith(".json") or os.path.realpath(reference).endswith(".json"):
+        with open(reference, "r") as f:
+            return json.load(f)
+    with open(reference, "r") as f:
+        results = parse_text_results(f.read())
+    document = build_results_document(results, host={})
+    document["imported_from"] = reference
+    return document
+
+def compare_results(current, baseline, thresholds=None, statistic="avg"):
+    """
+    Compare two results documents metric by metric.
+
+    Args:
+        current: Results document of the run under test.
+        baseline: Results document to compare against.
+        thresholds: Allowed change in percent per metric name (e.g. {"rtf": 3}); metrics not listed
+            use DEFAULT_THRESHOLD_PCT, or thresholds["default"] if given.
+        statistic: Statistic of each metric to compare.
+
+    Returns:
+        List of dicts with test, metric, baseline, current, change_pct, regression and throttled, set if
+        the telemetry of either run flagged the test as throttled.
+    """
+    from .telemetry import throttled_tests
+
+    throttled = throttled_tests(current.get("telemetry")) | throttled_tests(baseline.get("telemetry"))
+    thresholds = thresholds or {}
+    default_threshold = thresholds.get("default", DEFAULT_THRESHOLD_PCT)
+    comparisons = []
+    for test_name, metrics in current["results"].items():
+        baseline_metrics = baseline["results"].get(test_name, {})
+        for metric_name, stats in metrics.items():
+            baseline_stats = baseline_metrics.get(metric_name)
+            if not baseline_stats or statistic not in stats or statistic not in baseline_stats:
+                continue
+            old_value, new_value = baseline_stats[statistic], stats[statistic]
+            change_pct = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            worse_pct = -change_pct if metric_name in HIGHER_IS_BETTER else change_pct
+            threshold = thresholds.get(metric_name, default_threshold)
+            comparisons.append({
+                "test": test_name,
+                "metric": metric_name,
+                "baseline": old_value,
+                "current": new_value,
+                "change_pct": round(change_pct, 2),
+                "threshold_pct": threshold,
+                "regression": worse_pct > threshold,
+                "throttled": test_name in throttled
+            })
+    return comparisons
+
+def format_comparison(comparisons, statistic="avg"):
+    """Format a comparison as a table, marking regressions and throttled tests"""
+    if not comparisons:
+        return "No common metrics to compare.\n"
+    lines = [f"Comparison of {statistic} values against baseline:", ""]
+    header = f"  {'Test':<16}{'Metric':<12}{'Baseline':>12}{'Current':>12}{'Change':>10}"
+    lines.append(header)
+    for c in comparisons:
+        flag = "  REGRESSION" if c["regression"] else ""
+        if c.get("throttled"):
+            flag += "  (throttled)"
+        lines.append(f"  {c['test']:<16}{c['metric']:<12}{c['baseline']:>12}{c['current']:>12}"
+                     f"{c['change_pct']:>9}%{flag}")
+    regressions = sum(c["regression"] for c in comparisons)
+    throttled_regressions = sum(c["regression"] and bool(c.get("throttled")) for c in comparisons)
+    lines.append("")
+    lines.append(f"{regressions} regression(s) past threshold." if regressions else "No regressions past threshold.")
+    if throttled_regressions:
+        lines.append(f"{throttled_regressions} of them in tests run with dropped CPU clocks, "
+                     f"which may be throttling rather than code changes.")
+    return "\n".join(lines) + "\n"
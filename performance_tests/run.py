@@ -1,13 +1,45 @@
 import os
+import resource
 from tqdm import tqdm
-from .evaluation_texts import texts
+from .evaluation_texts import texts, llm_prompts
 from .transcription_test import TranscriptionTest
 from .synthesis_test import SynthesisTest
 from .llm_inference_test import LLMInferenceTest
+from .end_to_end_test import EndToEndTest, load_pipeline_handlers
+from .audio_path_test import AudioPathTest
+from .telemetry import TelemetryMonitor, format_telemetry, throttled_tests
 from .utils import format_results, save_results
-
-def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=True, should_save_results=False):
-    """Main function to run all performance tests"""
+from .results import build_results_document, load_results, compare_results, format_comparison
+
+def _per_component(value, component, default=1):
+    """Resolve a count given either as one integer for all components or as a dict per component"""
+    if value is None:
+        return default
+    if isinstance(value, dict):
+        return value.get(component, default)
+    return value
+
+def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=True, should_save_results=False,
+                          repetitions=None, warmups=None, compare_to=None, thresholds=None,
+                          end_to_end_use_cases=None, audio_path_replay=None):
+    """
+    Main function to run all performance tests
+
+    Args:
+        repetitions: Number of measured runs per text, either as an integer for all components or as a
+            dict keyed by test name ("synthesis", "transcription", "llm_inference", "end_to_end"). Defaults to 1.
+        warmups: Number of unmeasured warm-up runs before the measurements, in the same format. Defaults to 1.
+        compare_to: Baseline to compare the results against: a results file, a host log directory or "latest".
+        thresholds: Allowed change in percent per metric before a difference is flagged as a regression.
+        end_to_end_use_cases: Use cases whose input recording is run through the end-to-end voice to
+            first audio benchmark. None or an empty list skips it.
+        audio_path_replay: "realtime" or "fast" to measure the audio input path on the evaluation recordings,
+            replayed by the fake input device at that pace. None skips it.
+
+    Returns:
+        The results document, with host fingerprint and settings, or None if no test ran.
+        If compare_to is given, the comparison is stored under "comparison".
+    """
     from core.config import Config
 
     test_runners = []
@@ -18,6 +50,12 @@ def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=Tr
         test_runners.append(TranscriptionTest())
     if run_llm:
         test_runners.append(LLMInferenceTest(Config.LLM.MODEL))
+    if end_to_end_use_cases:
+        handlers = load_pipeline_handlers()
+        for use_case in end_to_end_use_cases:
+            test_runners.append(EndToEndTest(use_case, handlers))
+    if audio_path_replay:
+        test_runners.append(AudioPathTest(realtime=audio_path_replay == "realtime"))
 
     disabled_components = []
     if not run_transcription:
@@ -34,6 +72,16 @@ def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=Tr
         print("All components disabled. No tests to run.")
         return
 
+    component_names = {test.name: "end_to_end" if isinstance(test, EndToEndTest) else test.name for test in test_runners}
+    repeat_counts = {test.name: _per_component(repetitions, component_names[test.name]) for test in test_runners}
+    warmup_counts = {test.name: _per_component(warmups, component_names[test.name]) for test in test_runners}
+
+    # Load the baseline before this run's results possibly replace "latest"
+    baseline = load_results(compare_to) if compare_to else None
+
+    monitor = TelemetryMonitor()
+    monitor.start()
+
     print("Warming up the system...")
 
     dry_run_file = f"{output_dir}/dry_run.wav"
@@ -41,9 +89,10 @@ def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=Tr
     if run_synthesis:
         synthesis_test = next((t for t in test_runners if t.name == "synthesis"), None)
         if synthesis_test:
-            result = synthesis_test.run_test("Dry run text", dry_run_file, collect_metrics=False)
-            if "error" in result:
-                print(f"Warning: Dry run synthesis failed: {result['error']}")
+            for _ in range(warmup_counts["synthesis"]):
+                result = synthesis_test.run_test("Dry run text", dry_run_file, collect_metrics=False)
+                if "error" in result:
+                    print(f"Warning: Dry run synthesis failed: {result['error']}")
 
     if not run_synthesis and run_transcription:
         if not os.path.exists(dry_run_file):
@@ -52,18 +101,20 @@ def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=Tr
     if run_transcription:
         transcription_test = next((t for t in test_runners if t.name == "transcription"), None)
         if transcription_test:
-            try:
-                transcription_test.run_test(dry_run_file, collect_metrics=False)
-            except Exception as e:
-                print(f"Warning: Transcription dry run failed: {e}")
+            for _ in range(warmup_counts["transcription"]):
+                try:
+                    transcription_test.run_test(dry_run_file, collect_metrics=False)
+                except Exception as e:
+                    print(f"Warning: Transcription dry run failed: {e}")
 
     if run_llm:
         llm_test = next((t for t in test_runners if t.name == "llm_inference"), None)
         if llm_test:
-            try:
-                llm_test.run_test(collect_metrics=False)
-            except Exception as e:
-                print(f"Warning: LLM inference dry run failed: {e}")
+            for _ in range(warmup_counts["llm_inference"]):
+                try:
+                    llm_test.run_test(collect_metrics=False)
+                except Exception as e:
+                    print(f"Warning: LLM inference dry run failed: {e}")
 
     print("Starting performance test...")
 
@@ -73,12 +124,14 @@ def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=Tr
         if run_synthesis:
             synthesis_test = next((t for t in test_runners if t.name == "synthesis"), None)
             if synthesis_test:
-                try:
-                    result = synthesis_test.run_test(text, output_file)
-                    if "error" in result:
-                        print(f"Warning: Synthesis failed for text {idx + 1}: {result['error']}")
-                except Exception as e:
-                    print(f"Error in synthesis test for text {idx + 1}: {e}")
+                with monitor.section("synthesis"):
+                    for _ in range(repeat_counts["synthesis"]):
+                        try:
+                            result = synthesis_test.run_test(text, output_file)
+                            if "error" in result:
+                                print(f"Warning: Synthesis failed for text {idx + 1}: {result['error']}")
+                        except Exception as e:
+                            print(f"Error in synthesis test for text {idx + 1}: {e}")
 
         if run_transcription:
             if not run_synthesis and not os.path.exists(output_file):
@@ -87,24 +140,89 @@ def run_performance_tests(run_transcription=True, run_synthesis=True, run_llm=Tr
 
             transcription_test = next((t for t in test_runners if t.name == "transcription"), None)
             if transcription_test:
-                try:
-                    transcription_test.run_test(output_file)
-                except Exception as e:
-                    print(f"Error in transcription test for text {idx + 1}: {e}")
+                with monitor.section("transcription"):
+                    for _ in range(repeat_counts["transcription"]):
+                        try:
+                            transcription_test.run_test(output_file, reference_text=text)
+                        except Exception as e:
+                            print(f"Error in transcription test for text {idx + 1}: {e}")
+
+        audio_path_test = next((t for t in test_runners if t.name == "audio_path"), None)
+        if audio_path_test:
+            if not os.path.exists(output_file):
+                print(f"Warning: File {output_file} not found. Skipping audio path test for this file.")
+                continue
+            runs = [False] * (warmup_counts["audio_path"] if idx == 0 else 0) + [True] * repeat_counts["audio_path"]
+            with monitor.section("audio_path"):
+                for collect_metrics in runs:
+                    try:
+                        result = audio_path_test.run_test(output_file, collect_metrics)
+                        if "error" in result:
+                            print(f"Warning: Audio path test failed for text {idx + 1}: {result['error']}")
+                    except Exception as e:
+                        print(f"Error in audio path test for text {idx + 1}: {e}")
 
-        if run_llm:
-            llm_test = next((t for t in test_runners if t.name == "llm_inference"), None)
-            if llm_test:
+    if run_llm:
+        llm_test = next((t for t in test_runners if t.name == "llm_inference"), None)
+        for prompt in tqdm(llm_prompts, desc="Processing LLM prompts"):
+            with monitor.section("llm_inference"):
+                for _ in range(repeat_counts["llm_inference"]):
+                    try:
+                        result = llm_test.run_test(prompt)
+                        if "error" in result:
+                            print(f"Warning: LLM inference failed for prompt {prompt['name']}: {result['error']}")
+                    except Exception as e:
+                        print(f"Error in LLM inference test for prompt {prompt['name']}: {e}")
+
+    end_to_end_tests = [t for t in test_runners if isinstance(t, EndToEndTest)]
+    if end_to_end_tests:
+        from use_cases.use_case_manager import UseCaseManager
+        use_case_manager = UseCaseManager()
+
+    for end_to_end_test in tqdm(end_to_end_tests, desc="End-to-end use cases"):
+        wav_file = use_case_manager.get_input_wav_path(end_to_end_test.use_case)
+        runs = [False] * warmup_counts[end_to_end_test.name] + [True] * repeat_counts[end_to_end_test.name]
+        with monitor.section(end_to_end_test.name):
+            for collect_metrics in runs:
                 try:
-                    llm_test.run_test()
+                    result = end_to_end_test.run_test(wav_file, collect_metrics)
+                    if "error" in result:
+                        print(f"Warning: End-to-end test for {end_to_end_test.use_case} failed: {result['error']}")
                 except Exception as e:
-                    print(f"Error in LLM inference test for text {idx + 1}: {e}")
+                    print(f"Error in end-to-end test for {end_to_end_test.use_case}: {e}")
+
+    monitor.stop()
+    telemetry = monitor.summary()
 
     results = {test.name: test.get_results() for test in test_runners}
-    results_string = format_results(results, test_runners, disabled_components)
+    results_string = format_results(results, test_runners, disabled_components) + "\n" + format_telemetry(telemetry)
 
     print(results_string)
 
+    for test_name, result in results.items():
+        for metric_name, stats in result.items():
+            if stats["outliers"]:
+                print(f"Warning: {stats['outliers']} outliers in {metric_name} of {test_name}. "
+                      f"Consider more repetitions or checking for background load.")
+
+    for test_name in sorted(throttled_tests(telemetry)):
+        print(f"Warning: CPU clocks dropped during {test_name}. Its results reflect throttling, not only the code.")
+
+    document = build_results_document(
+        results, disabled_components, {"repetitions": repeat_counts, "warmups": warmup_counts})
+    document["telemetry"] = telemetry
+    # Peak memory of the whole run, comparable across runs unlike the per-test RAM metrics
+    document["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+    if run_llm:
+        document["llm_prompt_results"] = llm_test.prompt_results
+
+    if baseline is not None:
+        document["comparison"] = compare_results(document, baseline, thresholds)
+        print(format_comparison(document["comparison"]))
+
     if should_save_results:
-        saved_path = save_results(results_string)
+        saved_path = save_results(results_string, document)
         print(f"Results saved to: {saved_path}")
+
+    return document
@@ -0,0 +1,183 @@
+import csv
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from .results import LOGS_DIR, get_host_fingerprint
+
+PERFORMANCE_TEST_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "performance_test.py")
+
+# RAM measure of the Pareto summary: the peak RSS of the test process. The ram_usage metrics of the tests
+# are deltas for some tests and whole-process RSS for others, so their sum has no consistent meaning.
+RAM_KEY = "peak_rss_mb"
+
+# Latency metrics used for the Pareto summary when none is given, in order of preference
+DEFAULT_LATENCY_METRICS = [
+    "end_to_end_general.total_latency",
+    "transcription.rtf",
+    "synthesis.rtf",
+    "llm_inference.ttft"
+]
+
+def parse_grid_option(value):
+    """Parse a "SECTION.PARAM=V1,V2,..." option into a parameter name and its list of values"""
+    name, separator, values = value.partition("=")
+    if not separator or not values:
+        raise ValueError(f"Invalid grid option '{value}', expected SECTION.PARAM=V1,V2,...")
+    return name.strip(), [v.strip() for v in values.split(",")]
+
+def load_grid(grid_file=None, grid_options=None):
+    """
+    Build the grid from a JSON file mapping "SECTION.PARAM" to a list of values, and from
+    "SECTION.PARAM=V1,V2,..." options, which take precedence.
+    """
+    grid = {}
+    if grid_file:
+        with open(grid_file, "r") as f:
+            grid.update({name: [str(v) for v in values] for name, values in json.load(f).items()})
+    for option in grid_options or []:
+        name, values = parse_grid_option(option)
+        grid[name] = values
+    if not grid:
+        raise ValueError("Empty parameter grid")
+    return grid
+
+def expand_grid(grid):
+    """Return every combination of the grid values as a list of {param: value} dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def run_point(overrides, suite_args, timeout=None):
+    """
+    Run the performance suite for one grid point in a fresh interpreter, so that models, thread pools
+    and memory usage of one point cannot affect the next.
+
+    Returns:
+        dict: The results document of the run, or {"error": ...} if it failed.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        results_path = f.name
+    command = [sys.executable, PERFORMANCE_TEST_SCRIPT, *suite_args, "--results-json", results_path]
+    for name, value in overrides.items():
+        command += ["--set", f"{name}={value}"]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        if completed.returncode not in (0, 1) or not os.path.getsize(results_path):
+            return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                    else f"Exit status {completed.returncode}"}
+        with open(results_path, "r") as f:
+            return json.load(f)
+    except subprocess.TimeoutExpired:
+        return {"error": f"Timed out after {timeout}s"}
+    finally:
+        os.remove(results_path)
+
+def flatten_results(results):
+    """Flatten {test: {metric: stats}} to {"test.metric.stat": value} for the results matrix"""
+    row = {}
+    for test_name, metrics in results.items():
+        for metric_name, stats in metrics.items():
+            for stat_name in ("avg", "p50", "p90", "max"):
+                if stat_name in stats:
+                    row[f"{test_name}.{metric_name}.{stat_name}"] = stats[stat_name]
+    return row
+
+def pareto_front(points, latency_key, ram_key):
+    """Return the points for which no other point has both lower or equal latency and RAM, one of them lower"""
+    candidates = [p for p in points if p.get(latency_key) is not None and p.get(ram_key) is not None]
+    front = []
+    for point in candidates:
+        dominated = any(
+            other[latency_key] <= point[latency_key] and other[ram_key] <= point[ram_key]
+            and (other[latency_key] < point[latency_key] or other[ram_key] < point[ram_key])
+            for other in candidates
+        )
+        if not dominated:
+            front.append(point)
+    return sorted(front, key=lambda p: p[latency_key])
+
+def run_sweep(grid, suite_args=None, latency_metric=None, output_dir=None, timeout=None):
+    """
+    Run the performance suite for every point of a grid of config overrides.
+
+    Args:
+        grid (dict): Maps "SECTION.PARAM" to the list of values to try.
+        suite_args (list, optional): Extra performance_test.py arguments used for every point.
+        latency_metric (str, optional): "test.metric" whose average is the latency of the Pareto summary.
+        output_dir (str, optional): Where the matrix and summary are written.
+        timeout (float, optional): Maximum duration of one point in seconds.
+
+    Returns:
+        dict: The matrix rows, the Pareto front and the paths of the written files.
+    """
+    suite_args = suite_args or []
+    points = expand_grid(grid)
+    if output_dir is None:
+        output_dir = os.path.join(LOGS_DIR, platform.node(), f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    rows = []
+    for idx, overrides in enumerate(points, start=1):
+        print(f"[{idx}/{len(points)}] {', '.join(f'{k}={v}' for k, v in overrides.items())}")
+        document = run_point(overrides, suite_args, timeout)
+        row = dict(overrides)
+        if "error" in document:
+            print(f"  Failed: {document['error']}")
+            row["error"] = document["error"]
+        else:
+            row.update(flatten_results(document["results"]))
+            row[RAM_KEY] = document.get(RAM_KEY)
+            row["throttled"] = document.get("telemetry", {}).get("run", {}).get("throttled", False)
+        rows.append(row)
+
+    if latency_metric is None:
+        latency_metric = next((m for m in DEFAULT_LATENCY_METRICS if any(f"{m}.avg" in row for row in rows)),
+                              DEFAULT_LATENCY_METRICS[0])
+    latency_key = f"{latency_metric}.avg"
+    front = pareto_front(rows, latency_key, RAM_KEY)
+
+    columns = list(grid)
+    for row in rows:
+        columns += [key for key in row if key not in columns]
+    csv_path = os.path.join(output_dir, "matrix.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    summary = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": get_host_fingerprint(),
+        "grid": grid,
+        "suite_args": suite_args,
+        "latency_metric": latency_key,
+        "ram_metric": RAM_KEY,
+        "matrix": rows,
+        "pareto_front": front
+    }
+    json_path = os.path.join(output_dir, "matrix.json")
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+
+    summary["files"] = {"csv": csv_path, "json": json_path}
+    return summary
+
+def format_pareto_summary(summary):
+    """Format the Pareto front of a sweep: the grid points worth choosing between"""
+    latency_key = summary["latency_metric"]
+    lines = [f"Pareto front of {latency_key} against the peak RSS of the test process (MB):", ""]
+    if not summary["pareto_front"]:
+        lines.append("  No point completed with both metrics.")
+    for point in summary["pareto_front"]:
+        overrides = ", ".join(f"{name}={point[name]}" for name in summary["grid"])
+        flag = "  (throttled)" if point.get("throttled") else ""
+        lines.append(f"  latency {point[latency_key]:>10}  RAM {point[RAM_KEY]:>10}  {overrides}{flag}")
+    failed = sum(1 for row in summary["matrix"] if "error" in row)
+    lines.append("")
+    lines.append(f"{len(summary['matrix'])} points, {failed} failed. Matrix saved to {summary['files']['csv']}")
+    return "\n".join(lines) + "\n"
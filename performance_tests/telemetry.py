@@ -0,0 +1,248 @@
+"""Thermal, clock frequency and throttling telemetry sampled during performance runs.
+
+Readings come from Linux sysfs (/sys/class/thermal, cpufreq and the x86 thermal_throttle counters) and,
+on Raspberry Pi, from "vcgencmd get_throttled". Sources that are missing are skipped, so the monitor
+also works on machines without any of them.
+"""
+import glob
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+DEFAULT_INTERVAL_SECS = 0.5
+
+# A core this busy runs at its maximum frequency under every cpufreq governor unless it is throttled
+BUSY_CORE_PCT = 80.0
+
+# Frequency drop of a busy core below its reference frequency, in percent, past which its clock counts as dropped
+CLOCK_DROP_PCT = 10.0
+
+# Bits of "vcgencmd get_throttled": under-voltage, ARM frequency capped, throttled, soft temperature limit.
+# The low bits report the current state, the same bits shifted by 16 whether it occurred since boot.
+VCGENCMD_THROTTLED_FLAGS = {
+    0x1: "under-voltage",
+    0x2: "frequency capped",
+    0x4: "throttled",
+    0x8: "soft temperature limit"
+}
+
+def _read_int(path):
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def read_temperatures():
+    """Return {thermal zone type: temperature in °C} from /sys/class/thermal"""
+    temperatures = {}
+    for zone in sorted(glob.glob("/sys/class/thermal/thermal_zone*")):
+        millidegrees = _read_int(os.path.join(zone, "temp"))
+        if millidegrees is None:
+            continue
+        try:
+            with open(os.path.join(zone, "type"), "r") as f:
+                name = f.read().strip()
+        except OSError:
+            name = os.path.basename(zone)
+        temperatures[name if name not in temperatures else os.path.basename(zone)] = millidegrees / 1000
+    return temperatures
+
+def _cpu_dirs():
+    return sorted(glob.glob("/sys/devices/system/cpu/cpu[0-9]*"), key=lambda d: int(d.rsplit("cpu", 1)[1]))
+
+def read_frequencies():
+    """Return the current frequency of each core in MHz from cpufreq, None for cores without cpufreq"""
+    frequencies = []
+    for cpu_dir in _cpu_dirs():
+        khz = _read_int(os.path.join(cpu_dir, "cpufreq", "scaling_cur_freq"))
+        frequencies.append(khz / 1000 if khz is not None else None)
+    return frequencies
+
+def read_reference_frequencies():
+    """
+    Return the frequency in MHz below which a busy core counts as slowed down, None for cores without one.
+    This is the base frequency where cpufreq reports it (intel_pstate), since x86 cores only reach their
+    maximum turbo frequency when thermal and power headroom allow. Other x86 cores have no reference and
+    rely on the thermal_throttle counters. Elsewhere, as on Raspberry Pi, the maximum scaling frequency is used.
+    """
+    has_throttle_counters = read_throttle_count() is not None
+    frequencies = []
+    for cpu_dir in _cpu_dirs():
+        cpufreq_dir = os.path.join(cpu_dir, "cpufreq")
+        khz = _read_int(os.path.join(cpufreq_dir, "base_frequency"))
+        if khz is None and not has_throttle_counters:
+            khz = _read_int(os.path.join(cpufreq_dir, "scaling_max_freq"))
+            if khz is None:
+                khz = _read_int(os.path.join(cpufreq_dir, "cpuinfo_max_freq"))
+        frequencies.append(khz / 1000 if khz is not None else None)
+    return frequencies
+
+def read_throttle_count():
+    """Return the sum of the x86 core and package thermal throttling event counters, or None if absent"""
+    counts = [_read_int(path) for path in glob.glob("/sys/devices/system/cpu/cpu[0-9]*/thermal_throttle/*_throttle_count")]
+    counts = [count for count in counts if count is not None]
+    return sum(counts) if counts else None
+
+def read_vcgencmd_throttled():
+    """Return the "vcgencmd get_throttled" bit field, or None if vcgencmd is not available"""
+    if shutil.which("vcgencmd") is None:
+        return None
+    try:
+        output = subprocess.run(["vcgencmd", "get_throttled"], capture_output=True, text=True, timeout=2).stdout
+        return int(output.strip().split("=", 1)[1], 16)
+    except (OSError, subprocess.SubprocessError, IndexError, ValueError):
+        return None
+
+def describe_throttled_flags(value):
+    """List the conditions set in a "vcgencmd get_throttled" bit field, currently or since boot"""
+    conditions = [name for bit, name in VCGENCMD_THROTTLED_FLAGS.items() if value & bit]
+    conditions += [f"{name} since boot" for bit, name in VCGENCMD_THROTTLED_FLAGS.items() if value & (bit << 16)]
+    return conditions
+
+class TelemetryMonitor:
+    """
+    Samples temperatures, core frequencies and core usage in a background thread. Samples are tagged with
+    the current section, set with section(), so that they can be summarized per test.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL_SECS):
+        self.interval = interval
+        self.samples = []
+        self.reference_frequencies = read_reference_frequencies()
+        self._section = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_throttle_count = None
+        self._start_throttled = None
+        self._end_throttle_count = None
+        self._end_throttled = None
+
+    def _sample(self):
+        vcgencmd_throttled = read_vcgencmd_throttled()
+        self.samples.append({
+            "time": time.time(),
+            "section": self._section,
+            "temperatures": read_temperatures(),
+            "frequencies": read_frequencies(),
+            "core_usage": psutil.cpu_percent(percpu=True),
+            "throttled": vcgencmd_throttled & 0xF if vcgencmd_throttled is not None else None
+        })
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._start_throttle_count = read_throttle_count()
+        self._start_throttled = read_vcgencmd_throttled()
+        # The first call only sets the reference of later core usage readings
+        psutil.cpu_percent(percpu=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._end_throttle_count = read_throttle_count()
+        self._end_throttled = read_vcgencmd_throttled()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def section(self, name):
+        """Tag the samples taken within this block with the given name"""
+        previous_section, self._section = self._section, name
+        try:
+            yield
+        finally:
+            self._section = previous_section
+
+    def _is_clock_dropped(self, sample):
+        for usage, frequency, reference in zip(sample["core_usage"], sample["frequencies"], self.reference_frequencies):
+            if usage >= BUSY_CORE_PCT and frequency and reference \
+                    and frequency < reference * (1 - CLOCK_DROP_PCT / 100):
+                return True
+        return False
+
+    def _summarize(self, samples):
+        temperatures = [max(s["temperatures"].values()) for s in samples if s["temperatures"]]
+        frequencies = [f for s in samples for f in s["frequencies"] if f is not None]
+        dropped_samples = sum(self._is_clock_dropped(s) for s in samples)
+        throttled_samples = sum(1 for s in samples if s["throttled"])
+        return {
+            "samples": len(samples),
+            "max_temperature": round(max(temperatures), 1) if temperatures else None,
+            "avg_temperature": round(sum(temperatures) / len(temperatures), 1) if temperatures else None,
+            "min_frequency": round(min(frequencies)) if frequencies else None,
+            "avg_frequency": round(sum(frequencies) / len(frequencies)) if frequencies else None,
+            "clock_dropped_samples": dropped_samples,
+            "throttled_samples": throttled_samples,
+            "throttled": bool(dropped_samples or throttled_samples)
+        }
+
+    def summary(self):
+        """
+        Summarize the samples of each section and of the whole run.
+        A section is flagged as throttled if a busy core ran more than CLOCK_DROP_PCT below its reference
+        frequency, or vcgencmd reported throttling, while it ran. The whole run is also flagged if the
+        throttling event counters grew or vcgencmd reported new throttling since boot.
+        """
+        sections = {}
+        for sample in self.samples:
+            if sample["section"] is not None:
+                sections.setdefault(sample["section"], []).append(sample)
+        run_summary = self._summarize(self.samples)
+
+        throttle_events = None
+        if self._start_throttle_count is not None and self._end_throttle_count is not None:
+            throttle_events = self._end_throttle_count - self._start_throttle_count
+        new_conditions = []
+        if self._start_throttled is not None and self._end_throttled is not None:
+            new_conditions = describe_throttled_flags(self._end_throttled & ~self._start_throttled & 0xF0000)
+
+        run_summary["throttle_events"] = throttle_events
+        run_summary["vcgencmd_conditions"] = new_conditions
+        run_summary["throttled"] = run_summary["throttled"] or bool(throttle_events) or bool(new_conditions)
+        run_summary["reference_frequencies"] = self.reference_frequencies
+        return {
+            "interval": self.interval,
+            "run": run_summary,
+            "sections": {name: self._summarize(samples) for name, samples in sections.items()}
+        }
+
+def throttled_tests(telemetry):
+    """Return the names of the tests flagged as throttled in a telemetry summary"""
+    if not telemetry:
+        return set()
+    return {name for name, section in telemetry["sections"].items() if section["throttled"]}
+
+def format_telemetry(telemetry):
+    """Format a telemetry summary with one line per test and warnings for throttled runs"""
+    run_summary = telemetry["run"]
+    if not run_summary["samples"]:
+        return "Telemetry:\n  No samples collected.\n"
+    lines = ["Telemetry:"]
+    for name, section in [("whole run", run_summary)] + list(telemetry["sections"].items()):
+        temperature = f"{section['max_temperature']} °C max" if section["max_temperature"] is not None else "no temperature"
+        frequency = (f"{section['min_frequency']}-{section['avg_frequency']} MHz min-avg"
+                     if section["min_frequency"] is not None else "no cpufreq")
+        flag = "  THROTTLED" if section["throttled"] else ""
+        lines.append(f"  {name}: {temperature}, {frequency}{flag}")
+    if run_summary["throttle_events"]:
+        lines.append(f"  {run_summary['throttle_events']} thermal throttling events during the run")
+    for condition in run_summary["vcgencmd_conditions"]:
+        lines.append(f"  vcgencmd reported {condition}")
+    return "\n".join(lines) + "\n"
@@ -1,13 +1,18 @@
 from .base_test import PerformanceTest
+from .utils import word_error_rate
 from core.transcriber import get_stats as get_trans_stats
 
 class TranscriptionTest(PerformanceTest):
     def __init__(self):
         super().__init__("transcription", "Transcription (moonshine)")
         self.metrics["rtf_values"] = []
+        self.metrics["wer_values"] = []
 
-    def run_test(self, audio_file, collect_metrics=True):
+    def run_test(self, audio_file, collect_metrics=True, reference_text=None):
         result = get_trans_stats(audio_file)
         self.add_metric("ram_usages", result["ram_usage_mb"], collect_metrics)
         self.add_metric("rtf_values", result["real_time_factor"], collect_metrics)
+        if reference_text is not None:
+            result["wer"] = word_error_rate(reference_text, result["transcription"])
+            self.add_metric("wer_values", result["wer"], collect_metrics)
         return result
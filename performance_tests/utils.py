@@ -1,16 +1,85 @@
+import math
 import os
 import platform
+import re
+import statistics
 from datetime import datetime
 
+# Two-sided 95% critical values of Student's t distribution for 1 to 30 degrees of freedom
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+]
+
+def percentile(values, pct):
+    """Calculate a percentile with linear interpolation between the closest ranks"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def find_outliers(values):
+    """Return the values outside the Tukey fences (1.5 interquartile ranges beyond the quartiles)"""
+    if len(values) < 4:
+        return []
+    q1, q3 = percentile(values, 25), percentile(values, 75)
+    iqr = q3 - q1
+    return [v for v in values if v < q1 - 1.5 * iqr or v > q3 + 1.5 * iqr]
+
+def normalize_words(text):
+    """Lowercase a text and split it into words, ignoring punctuation"""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """
+    Calculate the word error rate of a transcription: the number of substituted, deleted and inserted
+    words needed to turn it into the reference, divided by the number of reference words
+    """
+    ref_words = normalize_words(reference)
+    hyp_words = normalize_words(hypothesis)
+    if not ref_words:
+        return 0.0 if not hyp_words else 1.0
+
+    # Word-level Levenshtein distance, keeping only the previous row
+    previous = list(range(len(hyp_words) + 1))
+    for i, ref_word in enumerate(ref_words, start=1):
+        current = [i] + [0] * len(hyp_words)
+        for j, hyp_word in enumerate(hyp_words, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref_words)
+
 def calculate_stats(values, precision=2):
-    """Calculate min, max, and average from a list of values"""
+    """Calculate min, max, average, percentiles, standard deviation, 95% confidence interval
+    of the mean and the number of outliers from a list of values"""
     if not values:
-        return {"min": 0, "max": 0, "avg": 0}
+        return {"min": 0, "max": 0, "avg": 0, "p50": 0, "p90": 0, "p99": 0,
+                "stdev": 0, "ci95": [0, 0], "samples": 0, "outliers": 0}
+
+    avg = sum(values) / len(values)
+    stdev = statistics.stdev(values) if len(values) > 1 else 0.0
+    if len(values) > 1:
+        degrees_of_freedom = len(values) - 1
+        t_critical = T_CRITICAL_95[degrees_of_freedom - 1] if degrees_of_freedom <= len(T_CRITICAL_95) else 1.96
+        margin = t_critical * stdev / math.sqrt(len(values))
+    else:
+        margin = 0.0
 
     return {
         "min": round(min(values), precision),
         "max": round(max(values), precision),
-        "avg": round(sum(values) / len(values), precision)
+        "avg": round(avg, precision),
+        "p50": round(percentile(values, 50), precision),
+        "p90": round(percentile(values, 90), precision),
+        "p99": round(percentile(values, 99), precision),
+        "stdev": round(stdev, precision),
+        "ci95": [round(avg - margin, precision), round(avg + margin, precision)],
+        "samples": len(values),
+        "outliers": len(find_outliers(values))
     }
 
 def format_results(test_results, test_runners, disabled_components=None):
@@ -26,7 +95,20 @@ def format_results(test_results, test_runners, disabled_components=None):
         metric_info = {
             "ram_usage": ("RAM Usage", "MB"),
             "rtf": ("Real-Time Factor (RTF)", ""),
-            "eval_rate": ("Evaluation Rate", "token/s")
+            "wer": ("Word Error Rate (WER)", ""),
+            "eval_rate": ("Evaluation Rate", "token/s"),
+            "ttft": ("Time to First Token", "s"),
+            "prompt_eval_rate": ("Prompt Evaluation Rate", "token/s"),
+            "load_duration": ("Model Load Duration", "s"),
+            "total_latency": ("Voice to first audio", "s"),
+            "vad_end_delay": ("End of speech detection", "s"),
+            "transcription_time": ("Transcription", "s"),
+            "llm_ttft": ("LLM time to first token", "s"),
+            "llm_first_sentence": ("LLM time to first sentence", "s"),
+            "synthesis_time": ("First sentence synthesis", "s"),
+            "vad_chunk_ms": ("VAD time per chunk", "ms"),
+            "callback_to_queue_ms": ("Input callback to capture loop", "ms"),
+            "end_of_speech_delay": ("End of speech detection delay", "s")
         }
 
         if metric_name not in metric_info:
@@ -40,6 +122,15 @@ def format_results(test_results, test_runners, disabled_components=None):
         formatted += f"    Minimum: {stats['min']}{unit_suffix}\n"
         formatted += f"    Maximum: {stats['max']}{unit_suffix}\n"
         formatted += f"    Average: {stats['avg']}{unit_suffix}\n"
+        formatted += f"    Median (p50): {stats['p50']}{unit_suffix}\n"
+        formatted += f"    p90: {stats['p90']}{unit_suffix}\n"
+        formatted += f"    p99: {stats['p99']}{unit_suffix}\n"
+        formatted += f"    Std deviation: {stats['stdev']}{unit_suffix}\n"
+        formatted += f"    95% CI of average: {stats['ci95'][0]} - {stats['ci95'][1]}{unit_suffix}\n"
+        formatted += f"    Samples: {stats['samples']}"
+        if stats['outliers']:
+            formatted += f" ({stats['outliers']} outliers)"
+        formatted += "\n"
 
         return formatted
 
@@ -55,8 +146,9 @@ def format_results(test_results, test_runners, disabled_components=None):
 
     return results_string
 
-def save_results(results_string):
-    """Save results to a log file and create a symlink to the latest results"""
+def save_results(results_string, results_document=None):
+    """Save results to a log file and create a symlink to the latest results.
+    If a results document is given, it is saved as JSON next to the log file."""
     logs_dir = "./performance_logs"
     os.makedirs(logs_dir, exist_ok=True)
 
@@ -77,4 +169,8 @@ def save_results(results_string):
     relative_log_file_path = os.path.relpath(log_file_path, log_folder_path)
     os.symlink(relative_log_file_path, latest_link_path)
 
+    if results_document is not None:
+        from .results import save_results_json
+        save_results_json(results_document, log_folder_path, timestamp)
+
     return log_file_path
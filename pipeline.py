@@ -1,9 +1,30 @@
+import argparse
+from core.onnx_threads import install_session_defaults
 from pipeline_components.pipeline import Pipeline
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Voice transcription, LLM and speech synthesis pipeline.")
+    parser.add_argument("--session", action="store_true",
+                        help="Keep the models loaded and handle requests until the user quits")
+    parser.add_argument("--batch", type=str, default=None,
+                        help="Process a JSONL manifest of requests non-interactively")
+    parser.add_argument("--batch-output", type=str, default="batch_results.jsonl",
+                        help="JSONL file where batch results and per-stage timings are written")
+    parser.add_argument("--no-synthesis", action="store_true",
+                        help="Skip speech synthesis of batch responses")
+    return parser.parse_args()
+
 def main():
     """Entry point for the pipeline."""
+    args = parse_arguments()
+    install_session_defaults()
     pipeline = Pipeline()
-    pipeline.run()
+    if args.batch:
+        pipeline.run_batch(args.batch, args.batch_output, synthesize=not args.no_synthesis)
+    elif args.session:
+        pipeline.run_session()
+    else:
+        pipeline.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -11,6 +11,9 @@ This package contains modular components for the audio processing pipeline:
 - transcriber: Core transcription functionality
 - synthesizer: Core speech synthesis functionality
 - questions: Predefined questions for testing
+- staged_pipeline: Concurrent staged execution engine
+- batch_runner: Non-interactive processing of request manifests
+- server: HTTP/WebSocket server with resident models
 - pipeline: Main pipeline orchestration
 """
 
@@ -23,5 +26,8 @@ __all__ = [
     'transcriber',
     'synthesizer',
     'questions',
+    'staged_pipeline',
+    'batch_runner',
+    'server',
     'pipeline'
 ]
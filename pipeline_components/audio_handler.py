@@ -1,10 +1,12 @@
 import os
 import numpy as np
-import sounddevice as sd
-from queue import Queue
+import threading
+from queue import Queue, Empty
 from silero_vad import VADIterator, load_silero_vad
-from sounddevice import InputStream
 from core import Config
+from core.audio_devices import get_input_device, get_output_device
+from core.tracing import get_tracer
+from core.metrics import get_registry
 
 class AudioHandler:
     """Handles audio input operations (file loading and microphone recording)."""
@@ -38,75 +40,110 @@ class AudioHandler:
             self.logger.critical(f"Failed to read WAV file: {e}")
             return None
 
-    def record_from_microphone(self):
+    def create_vad(self, threshold=None):
+        """Load the Silero VAD model and wrap it in a streaming VAD iterator."""
+        vad_model = load_silero_vad(onnx=True)
+        if vad_model is None:
+            self.logger.critical("VAD model failed to load.")
+            return None
+
+        return VADIterator(
+            model=vad_model,
+            sampling_rate=Config.AUDIO.SAMPLING_RATE,
+            threshold=threshold if threshold is not None else Config.AUDIO.VAD_THRESHOLD,
+            min_silence_duration_ms=Config.AUDIO.VAD_MIN_SILENCE_MS
+        )
+
+    def open_input_stream(self, q):
+        """Open an input stream on the configured input device that pushes audio chunks into the given queue."""
+        return get_input_device().InputStream(
+            samplerate=Config.AUDIO.SAMPLING_RATE,
+            channels=1,
+            blocksize=Config.AUDIO.CHUNK_SIZE,
+            dtype=np.float32,
+            callback=self.create_input_callback(q),
+        )
+
+    def capture_utterance(self, q, vad, stop_event=None, on_speech_start=None, request_id=None):
+        """Consume audio chunks from the queue until VAD detects the end of an utterance.
+
+        Args:
+            q: Queue filled by an input stream callback.
+            vad: VAD iterator created with create_vad.
+            stop_event: Optional event that aborts the capture if set before speech starts.
+            on_speech_start: Optional callable invoked as soon as speech is detected.
+            request_id: Optional request ID attached to trace spans.
+
+        Returns:
+            The recorded speech segment, or None if no speech was captured.
+        """
+        with get_tracer().span("capture", request_id):
+            return self._capture_utterance(q, vad, stop_event, on_speech_start, request_id)
+
+    def _capture_utterance(self, q, vad, stop_event, on_speech_start, request_id):
+        tracer = get_tracer()
+        speech_buffer = np.empty(0, dtype=np.float32)
+        recording = False
+        start_idx = None
+        end_idx = None
+
+        self.logger.debug("Awaiting voice input.")
+        while True:
+            if stop_event is not None and stop_event.is_set() and not recording:
+                return None
+            try:
+                chunk = q.get(timeout=0.1)
+            except Empty:
+                continue
+            if chunk is None or len(chunk) == 0:
+                self.logger.error("Received empty audio chunk from queue.")
+                continue
+
+            with tracer.span("vad", request_id):
+                speech_dict = vad(chunk)
+            speech_buffer = np.concatenate((speech_buffer, chunk))
+
+            if speech_dict:
+                self.logger.debug(f"VAD result: {speech_dict}")
+
+                if "start" in speech_dict and not recording:
+                    recording = True
+                    start_idx = len(speech_buffer) - len(chunk)
+                    self.logger.debug("Voice detected. Recording started.")
+                    tracer.instant("speech_start", request_id)
+                    if on_speech_start is not None:
+                        on_speech_start()
+
+                elif "end" in speech_dict and recording:
+                    end_idx = len(speech_buffer)
+                    self.logger.debug("End of speech detected. Beginning transcription.")
+                    tracer.instant("speech_end", request_id)
+                    break
+
+            if recording and len(speech_buffer) / Config.AUDIO.SAMPLING_RATE > Config.AUDIO.MAX_SPEECH_SECS:
+                end_idx = len(speech_buffer)
+                self.logger.debug("Maximum recording duration reached. Beginning transcription.")
+                break
+
+        # Process the recorded audio
+        if start_idx is not None and end_idx is not None:
+            speech_segment = speech_buffer[int(start_idx * 0.9):int(end_idx * 1.1)]
+            self.logger.debug(f"Recorded audio duration: {len(speech_segment)/Config.AUDIO.SAMPLING_RATE:.2f} seconds")
+            get_registry().counter("pipeline_utterances_captured_total", "Utterances captured by voice activity detection.").inc()
+            return speech_segment
+        self.logger.warning("No speech was detected.")
+        return None
+
+    def record_from_microphone(self, request_id=None):
         """Record audio from the microphone using Voice Activity Detection."""
         try:
-            # Load VAD model
-            vad_model = load_silero_vad(onnx=True)
-            if vad_model is None:
-                self.logger.critical("VAD model failed to load.")
+            vad = self.create_vad()
+            if vad is None:
                 return None
 
-            vad = VADIterator(
-                model=vad_model,
-                sampling_rate=Config.AUDIO.SAMPLING_RATE,
-                threshold=Config.AUDIO.VAD_THRESHOLD,
-                min_silence_duration_ms=Config.AUDIO.VAD_MIN_SILENCE_MS
-            )
-
-            # Set up audio input stream
             q = Queue()
-            stream = InputStream(
-                samplerate=Config.AUDIO.SAMPLING_RATE,
-                channels=1,
-                blocksize=Config.AUDIO.CHUNK_SIZE,
-                dtype=np.float32,
-                callback=self.create_input_callback(q),
-            )
-
-            # Start recording
-            speech_buffer = np.empty(0, dtype=np.float32)
-            recording = False
-            start_idx = None
-            end_idx = None
-
-            with stream:
-                self.logger.debug("Awaiting voice input.")
-                while True:
-                    chunk = q.get()
-                    if chunk is None or len(chunk) == 0:
-                        self.logger.error("Received empty audio chunk from queue.")
-                        continue
-
-                    speech_dict = vad(chunk)
-                    speech_buffer = np.concatenate((speech_buffer, chunk))
-
-                    if speech_dict:
-                        self.logger.debug(f"VAD result: {speech_dict}")
-
-                        if "start" in speech_dict and not recording:
-                            recording = True
-                            start_idx = len(speech_buffer) - len(chunk)
-                            self.logger.debug("Voice detected. Recording started.")
-
-                        elif "end" in speech_dict and recording:
-                            end_idx = len(speech_buffer)
-                            self.logger.debug("End of speech detected. Beginning transcription.")
-                            break
-
-                    if recording and len(speech_buffer) / Config.AUDIO.SAMPLING_RATE > Config.AUDIO.MAX_SPEECH_SECS:
-                        end_idx = len(speech_buffer)
-                        self.logger.debug("Maximum recording duration reached. Beginning transcription.")
-                        break
-
-            # Process the recorded audio
-            if start_idx is not None and end_idx is not None:
-                speech_segment = speech_buffer[int(start_idx * 0.9):int(end_idx * 1.1)]
-                self.logger.debug(f"Recorded audio duration: {len(speech_segment)/Config.AUDIO.SAMPLING_RATE:.2f} seconds")
-                return speech_segment
-            else:
-                self.logger.warning("No speech was detected.")
-                return None
+            with self.open_input_stream(q):
+                return self.capture_utterance(q, vad, request_id=request_id)
 
         except Exception as e:
             self.logger.error(f"Error recording from microphone: {e}")
@@ -116,9 +153,61 @@ class AudioHandler:
         """Play audio data."""
         try:
             self.logger.debug("Playing back recorded audio.")
-            sd.play(audio_data, samplerate=Config.AUDIO.SAMPLING_RATE)
-            sd.wait()
+            output_device = get_output_device()
+            output_device.play(audio_data, samplerate=Config.AUDIO.SAMPLING_RATE)
+            output_device.wait()
             return True
         except Exception as e:
             self.logger.error(f"Error playing audio: {e}")
             return False
+
+
+class BargeInMonitor:
+    """Listens to the microphone while the pipeline speaks and captures an interrupting utterance."""
+
+    def __init__(self, audio_handler, on_speech_start):
+        """Initialize the monitor.
+
+        Args:
+            audio_handler: AudioHandler used to open the microphone and run VAD.
+            on_speech_start: Callable invoked as soon as user speech is detected.
+        """
+        self.audio = audio_handler
+        self.on_speech_start = on_speech_start
+        self.speech_detected = threading.Event()
+        self.stop_event = threading.Event()
+        self.utterance = None
+        self._thread = None
+
+    def _handle_speech_start(self):
+        self.speech_detected.set()
+        self.audio.logger.info("User speech detected during playback. Interrupting.")
+        self.on_speech_start()
+
+    def _run(self):
+        try:
+            vad = self.audio.create_vad(Config.AUDIO.BARGE_IN_VAD_THRESHOLD)
+            if vad is None:
+                return
+            q = Queue()
+            with self.audio.open_input_stream(q):
+                self.utterance = self.audio.capture_utterance(
+                    q, vad, self.stop_event, self._handle_speech_start
+                )
+        except Exception as e:
+            self.audio.logger.error(f"Barge-in monitor failed: {e}")
+
+    def start(self):
+        """Start listening in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="barge-in-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop listening and return the interrupting utterance, or None if there was none.
+
+        If the user started speaking before the monitor was stopped, wait until the utterance ends.
+        """
+        self.stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.utterance
@@ -0,0 +1,153 @@
+import json
+import os
+import time
+
+from core.config import Config
+from core.tracing import get_tracer
+from .llm_handler import record_llm_call
+
+
+class BatchRunner:
+    """Processes a manifest of requests end to end without user interaction.
+
+    Requests always run their stages one after the other, even with PIPELINE.STAGED_EXECUTION,
+    since nothing is played back and every stage is timed on its own.
+    """
+
+    def __init__(self, pipeline, synthesize=True, output_dir=None):
+        """Initialize the batch runner.
+
+        Args:
+            pipeline: Pipeline whose already loaded handlers are reused for every request.
+            synthesize: Whether to synthesize the LLM output of each request to a WAV file.
+            output_dir: Directory for synthesized WAV files without an explicit output_file.
+        """
+        self.pipeline = pipeline
+        self.logger = pipeline.logger
+        self.synthesize = synthesize
+        self.output_dir = output_dir or os.path.join(Config.SYNTHESIS.OUTPUT_DIR, "batch")
+        self.tracer = get_tracer()
+
+    def load_manifest(self, manifest_path):
+        """Load requests from a JSONL manifest.
+
+        Each line is an object with either "text" or "wav" (path to a WAV file), and optionally
+        "id", "use_case" (defaults to "general") and "output_file". Invalid lines are kept as requests
+        with a "manifest_error", so that they are reported as failed items instead of aborting the batch.
+        """
+        requests = []
+        with open(manifest_path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    request = {"manifest_error": f"Manifest line {line_number} is not valid JSON: {e}"}
+                if not isinstance(request, dict):
+                    request = {"manifest_error": f"Manifest line {line_number} is not a JSON object"}
+                elif "manifest_error" not in request and "text" not in request and "wav" not in request:
+                    request = {"manifest_error": f"Manifest line {line_number} has neither 'text' nor 'wav'"}
+                request.setdefault("id", str(len(requests) + 1))
+                request.setdefault("use_case", "general")
+                requests.append(request)
+        return requests
+
+    def process(self, request):
+        """Run one request through transcription, the LLM and synthesis, timing every stage."""
+        timings = {}
+        result = {
+            "id": request["id"],
+            "use_case": request["use_case"],
+            "transcription": None,
+            "llm_output": None,
+            "output_file": None,
+            "timings": timings,
+            "error": None
+        }
+        start_time = time.time()
+        request_id = request["id"]
+
+        try:
+            if "manifest_error" in request:
+                raise ValueError(request["manifest_error"])
+            if "text" in request:
+                text = request["text"]
+            else:
+                stage_start = time.time()
+                speech_segment = self.pipeline.audio.load_from_wav(request["wav"])
+                if speech_segment is None:
+                    raise ValueError(f"Could not load WAV file {request['wav']}")
+                timings["load"] = round(time.time() - stage_start, 3)
+                self.tracer.add_span("load_wav", stage_start, time.time(), request_id)
+
+                stage_start = time.time()
+                text = self.pipeline.transcriber.transcribe(speech_segment)
+                timings["transcription"] = round(time.time() - stage_start, 3)
+                self.tracer.add_span("transcription", stage_start, time.time(), request_id)
+                result["transcription"] = text
+            if not text:
+                raise ValueError("Empty input text")
+
+            stage_start = time.time()
+            messages = self.pipeline.llm.build_messages(text, request["use_case"])
+            response = self.pipeline.llm.chat(Config.LLM.MODEL, messages)
+            timings["llm"] = round(time.time() - stage_start, 3)
+            if not response or 'message' not in response:
+                raise ValueError("No valid output from LLM")
+            record_llm_call(self.tracer, request_id, stage_start, stage_start + timings["llm"], response)
+            llm_output = response['message']['content']
+            result["llm_output"] = llm_output
+            if response.get('eval_duration'):
+                result["llm_eval_count"] = response['eval_count']
+                result["llm_eval_rate"] = round(response['eval_count'] / (response['eval_duration'] / 1e9), 2)
+
+            if self.synthesize:
+                output_file = request.get("output_file") or os.path.join(self.output_dir, f"{request['id']}.wav")
+                synthesis_text = self.pipeline.get_synthesis_text(llm_output, request["use_case"])
+                stage_start = time.time()
+                if not self.pipeline.synthesis.save_output(synthesis_text, output_file):
+                    raise ValueError("Synthesis failed")
+                timings["synthesis"] = round(time.time() - stage_start, 3)
+                self.tracer.add_span("synthesis", stage_start, time.time(), request_id)
+                result["output_file"] = output_file
+        except Exception as e:
+            self.logger.error(f"Batch request {request['id']} failed: {e}")
+            result["error"] = str(e)
+
+        timings["total"] = round(time.time() - start_time, 3)
+        return result
+
+    def run(self, manifest_path, results_path):
+        """Process every request of a manifest and append one JSON result per line to results_path.
+
+        Returns:
+            Dictionary with the number of processed and failed requests and the wall time.
+        """
+        requests = self.load_manifest(manifest_path)
+        if Config.PIPELINE.STAGED_EXECUTION:
+            self.logger.info("Staged execution does not apply to batch runs. Stages run one after the other.")
+        results_dir = os.path.dirname(results_path)
+        if results_dir:
+            os.makedirs(results_dir, exist_ok=True)
+
+        failed = 0
+        start_time = time.time()
+        with open(results_path, "w") as results_file:
+            for idx, request in enumerate(requests, start=1):
+                result = self.process(request)
+                if result["error"]:
+                    failed += 1
+                results_file.write(json.dumps(result) + "\n")
+                results_file.flush()
+                print(f"[{idx}/{len(requests)}] {request['id']}: "
+                      f"{'failed' if result['error'] else 'ok'} in {result['timings']['total']}s")
+
+        summary = {
+            "processed": len(requests),
+            "failed": failed,
+            "wall_time": round(time.time() - start_time, 3)
+        }
+        self.logger.info(f"Batch run completed: {summary}")
+        return summary
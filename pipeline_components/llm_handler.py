@@ -1,6 +1,40 @@
 import os
 from ollama import chat, ResponseError, ListResponse
 import ollama
+from core.config import Config
+from core.metrics import get_registry, TOKEN_RATE_BUCKETS
+
+
+def record_llm_call(tracer, request_id, start, end, stats, first_token_time=None):
+    """Record spans and metrics for an LLM call, split into model load, prompt evaluation and generation.
+
+    Args:
+        tracer: Tracer to record the spans with.
+        request_id: ID of the request the call belongs to.
+        start: time.time() when the request was sent.
+        end: time.time() when the last token was received.
+        stats: Response metrics from ollama, with durations in nanoseconds.
+        first_token_time: time.time() of the first streamed token, if known.
+    """
+    load = (stats.get('load_duration') or 0) / 1e9
+    prompt_eval = (stats.get('prompt_eval_duration') or 0) / 1e9
+    generation = (stats.get('eval_duration') or 0) / 1e9
+    tracer.add_span("llm", start, end, request_id)
+    tracer.add_span("llm.load", start, start + load, request_id)
+    tracer.add_span("llm.prompt_eval", start + load, start + load + prompt_eval, request_id,
+                    tokens=stats.get('prompt_eval_count'))
+    tracer.add_span("llm.generation", first_token_time or end - generation, end, request_id,
+                    tokens=stats.get('eval_count'))
+
+    registry = get_registry()
+    registry.histogram("pipeline_llm_request_seconds", "Wall time of LLM requests.").observe(end - start)
+    # Without streaming, the first token is ready once the model is loaded and the prompt evaluated
+    ttft = (first_token_time - start) if first_token_time else load + prompt_eval
+    registry.histogram("pipeline_llm_time_to_first_token_seconds", "Time from LLM request to first token.").observe(ttft)
+    if stats.get('eval_count') and generation > 0:
+        registry.counter("pipeline_llm_generated_tokens_total", "Tokens generated by the LLM.").inc(stats['eval_count'])
+        registry.histogram("pipeline_llm_tokens_per_second", "LLM generation rate.",
+                           TOKEN_RATE_BUCKETS).observe(stats['eval_count'] / generation)
 
 class LLMHandler:
     """Handles interactions with Large Language Models."""
@@ -57,3 +91,44 @@ class LLMHandler:
         except Exception as e:
             self.logger.error(f"Unexpected error during LLM chat: {e}")
             return None
+
+    def chat_stream(self, model_name, messages, stats=None):
+        """Send messages to the LLM and yield the response content as it is generated.
+
+        If a stats dictionary is given, it is filled with ollama's timing metrics
+        (durations in nanoseconds) once generation completes. Errors are logged and re-raised,
+        so that callers can tell a failed generation from a complete one.
+        """
+        try:
+            for chunk in chat(model=model_name, messages=messages, stream=True):
+                content = chunk['message']['content']
+                if content:
+                    yield content
+                if chunk.get('done') and stats is not None:
+                    for key in ('total_duration', 'load_duration', 'prompt_eval_count',
+                                'prompt_eval_duration', 'eval_count', 'eval_duration'):
+                        stats[key] = chunk.get(key)
+        except ResponseError as e:
+            self.logger.error(f"LLM response error: {e}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Unexpected error during LLM chat: {e}")
+            raise
+
+    def build_messages(self, text, use_case, model_name=None):
+        """Build the chat messages for a user request, with the system prompt of the use case."""
+        model_name = model_name or Config.LLM.MODEL
+        if use_case == "thermostat":
+            system_prompt = Config.LLM.THERMOSTAT_SYSPROMPT
+            self.logger.info("Using smart thermostat system prompt.")
+        else:  # Default/agnostic case
+            system_prompt = Config.LLM.SYSPROMPT
+            self.logger.info("Using default system prompt.")
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text}
+        ]
+        if "granite3.2" in model_name:
+            messages.insert(0, {"role": "control", "content": "thinking"})
+        return messages
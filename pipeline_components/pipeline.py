@@ -1,14 +1,25 @@
+import statistics
 import sys
+import threading
+import time
 from datetime import datetime
 
 from core.config import Config
 from core.config_utils import log_config
 from core.log_utils import setup_logging
+from core.tracing import get_tracer
+from core.metrics import start_exporter, flush_textfile
 from .ui_manager import UIManager
-from .audio_handler import AudioHandler
+from .audio_handler import AudioHandler, BargeInMonitor
 from .transcriber_handler import TranscriberHandler
-from .llm_handler import LLMHandler
+from .llm_handler import LLMHandler, record_llm_call
 from .synthesis_handler import SynthesisHandler
+from .staged_pipeline import StagedPipeline, THERMOSTAT_RESPONSE_MARKER
+from .batch_runner import BatchRunner
+
+class TurnError(Exception):
+    """Raised when a single request of the pipeline cannot be completed."""
+
 
 class Pipeline:
     """Main Pipeline class that orchestrates the entire process flow."""
@@ -27,6 +38,9 @@ class Pipeline:
         self.llm = LLMHandler(self.logger)
         self.synthesis = SynthesisHandler(self.logger)
         self.use_case = None
+        self.tracer = get_tracer()
+        self.request_id = None
+        start_exporter(self.logger)
 
         print("Pipeline initialized. Logs will be saved to 'logs/latest.log'")
 
@@ -41,27 +55,193 @@ class Pipeline:
                 self.logger.critical("Ollama service is not running.")
                 sys.exit(1)
 
-            transcribed_text = self._handle_input()
-            if not transcribed_text:
-                self.logger.error("No valid input received.")
-                sys.exit(1)
-
-            llm_output = self._process_with_llm(transcribed_text)
-            if not llm_output:
-                self.logger.error("No valid output from LLM.")
-                sys.exit(1)
-
-            self._handle_output(llm_output)
+            self._run_turn()
 
+        except TurnError as e:
+            self.logger.error(str(e))
+            sys.exit(1)
         except KeyboardInterrupt:
             self.logger.info("Pipeline interrupted by user.")
             sys.exit(0)
         except Exception as e:
             self.logger.error(f"An unexpected error occurred: {e}")
             sys.exit(1)
+        finally:
+            self.synthesis.close()
+            self._save_trace()
+            flush_textfile()
+
+    def run_session(self):
+        """Serve turns until the user quits, keeping all models loaded between them.
+
+        Errors in a turn are logged and reported, and the session continues with the next turn.
+        Latency statistics for all turns are reported at shutdown.
+        """
+        turn_timings = []
+        failed_turns = 0
+        try:
+            self.use_case = self.ui.get_use_case()
+            self.logger.info(f"Selected use case: {self.use_case}")
+
+            while True:
+                try:
+                    if not self.llm.check_ollama_running():
+                        raise TurnError("Ollama service is not running.")
+                    turn_timings.append(self._run_turn())
+                except TurnError as e:
+                    failed_turns += 1
+                    self.logger.error(str(e))
+                    print(f"\nThis turn failed: {e}")
+                except Exception as e:
+                    failed_turns += 1
+                    self.logger.error(f"An unexpected error occurred in this turn: {e}")
+                    print(f"\nThis turn failed: {e}")
+
+                if not self.ui.should_continue_session():
+                    break
+
+        except (KeyboardInterrupt, EOFError):
+            self.logger.info("Session interrupted by user.")
+        finally:
+            self.synthesis.close()
+            self._save_trace()
+            flush_textfile()
+            self._report_session_stats(turn_timings, failed_turns)
+
+    def _run_turn(self):
+        """Handle one request from input to output.
+
+        Returns:
+            Dictionary with the duration in seconds of each stage of the turn. Time spent waiting
+            for the user, such as answering prompts or speaking, is not included.
+
+        Raises:
+            TurnError: If the turn could not be completed.
+        """
+        if not self.llm.ensure_model_available(Config.LLM.MODEL):
+            raise TurnError(f"Could not obtain model {Config.LLM.MODEL}.")
+
+        if Config.PIPELINE.STAGED_EXECUTION:
+            return self._run_staged()
+
+        self.request_id = self.tracer.new_request_id()
+        timings = {}
+        transcribed_text = self._handle_input(timings)
+        if not transcribed_text:
+            raise TurnError("No valid input received.")
+
+        output_choice = None
+        while True:
+            start_time = time.time()
+            llm_output = self._process_with_llm(transcribed_text)
+            if not llm_output:
+                raise TurnError("No valid output from LLM.")
+            timings["llm"] = time.time() - start_time
+
+            barge_in_audio = self._handle_output(llm_output, timings, output_choice)
+            if barge_in_audio is None:
+                return timings
+
+            # An interrupting utterance becomes the next request, whose response is only played
+            print("\n\nInterrupted. Processing your new request...")
+            self.request_id = self.tracer.new_request_id()
+            timings = {}
+            output_choice = '2'
+            transcribed_text = self._transcribe(barge_in_audio, timings)
+            if not transcribed_text:
+                raise TurnError("No valid input received.")
+
+    def _report_session_stats(self, turn_timings, failed_turns):
+        """Print and log latency statistics over all turns of a session."""
+        summary = f"\nSession summary: {len(turn_timings)} turns completed, {failed_turns} failed."
+        stages = sorted({stage for timings in turn_timings for stage in timings})
+        for stage in stages:
+            values = [timings[stage] for timings in turn_timings if stage in timings]
+            summary += (f"\n  {stage}: mean {statistics.mean(values):.3f}s, "
+                        f"median {statistics.median(values):.3f}s, max {max(values):.3f}s "
+                        f"over {len(values)} turns")
+        print(summary)
+        self.logger.info(summary.strip())
 
-    def _handle_input(self):
-        """Handle user input via text or audio and return transcribed text."""
+    def _save_trace(self):
+        """Write recorded trace spans to a file, if tracing is enabled."""
+        trace_file = self.tracer.save()
+        if trace_file:
+            self.logger.info(f"Trace saved to {trace_file}")
+
+    def run_batch(self, manifest_path, results_path, synthesize=True):
+        """Process a JSONL manifest of requests without user interaction."""
+        try:
+            if not self.llm.check_ollama_running():
+                self.logger.critical("Ollama service is not running.")
+                sys.exit(1)
+            if not self.llm.ensure_model_available(Config.LLM.MODEL):
+                self.logger.critical(f"Could not obtain model {Config.LLM.MODEL}.")
+                sys.exit(1)
+
+            summary = BatchRunner(self, synthesize=synthesize).run(manifest_path, results_path)
+            print(f"\nProcessed {summary['processed']} requests ({summary['failed']} failed) "
+                  f"in {summary['wall_time']}s. Results saved to {results_path}")
+        except KeyboardInterrupt:
+            self.logger.info("Batch run interrupted by user.")
+            sys.exit(0)
+        finally:
+            self.synthesis.close()
+            self._save_trace()
+            flush_textfile()
+
+    def _run_staged(self):
+        """Run one request through the staged pipeline, playing the response while it is generated.
+
+        Returns:
+            Dictionary with the duration in seconds of each stage of the last request.
+        """
+        request = self._get_staged_request()
+        staged = StagedPipeline(self.audio, self.transcriber, self.llm, self.synthesis, self.logger)
+        while True:
+            result = staged.run(request, self.use_case)
+            if result["errors"]:
+                raise TurnError(f"Staged pipeline errors: {result['errors']}")
+
+            # An interrupting utterance becomes the next request
+            if result["barge_in_audio"] is not None:
+                print("\n\nInterrupted. Processing your new request...")
+                request = {"audio": result["barge_in_audio"]}
+                continue
+
+            if not result["llm_output"]:
+                raise TurnError("No valid output from LLM.")
+            return self._staged_durations(result["timings"])
+
+    @staticmethod
+    def _staged_durations(marks):
+        """Convert the cumulative marks of a staged request into the stage durations of non-staged turns.
+
+        Synthesis and playback overlap generation in staged execution, so "output" is only the part
+        of them left after the last token.
+        """
+        durations = {}
+        for stage, start, end in (("transcription", "capture_end", "transcription_end"),
+                                  ("llm", "transcription_end", "last_token"),
+                                  ("output", "last_token", "playback_end")):
+            if start in marks and end in marks:
+                durations[stage] = marks[end] - marks[start]
+        return durations
+
+    def _get_staged_request(self):
+        """Ask for the input source and describe it as a staged pipeline request."""
+        use_audio = self.ui.get_interaction_mode()
+        if not use_audio:
+            return {"text": self.ui.get_text_input()}
+        if self.ui.get_audio_source():
+            return {"wav": self.ui.get_wav_file_path()}
+        return {"microphone": True}
+
+    def _handle_input(self, timings=None):
+        """Handle user input via text or audio and return transcribed text.
+
+        If a timings dictionary is given, the transcription latency is stored in it.
+        """
         use_audio = self.ui.get_interaction_mode()
         if not use_audio:
             return self.ui.get_text_input()
@@ -69,43 +249,38 @@ class Pipeline:
             listen_from_wav = self.ui.get_audio_source()
             if listen_from_wav:
                 wav_file_path = self.ui.get_wav_file_path()
-                speech_segment = self.audio.load_from_wav(wav_file_path)
+                with self.tracer.span("load_wav", self.request_id):
+                    speech_segment = self.audio.load_from_wav(wav_file_path)
             else:
-                speech_segment = self.audio.record_from_microphone()
+                speech_segment = self.audio.record_from_microphone(self.request_id)
             if speech_segment is None:
                 return None
+            return self._transcribe(speech_segment, timings)
+
+    def _transcribe(self, speech_segment, timings=None):
+        """Transcribe a speech segment, storing the transcription latency in timings if given."""
+        start_time = time.time()
+        with self.tracer.span("transcription", self.request_id):
             transcribed = self.transcriber.transcribe(speech_segment)
-            self.logger.info(f"Transcription: {transcribed}")
-            print(f"\nTranscription:\n{transcribed}")
-            return transcribed
+        if timings is not None:
+            timings["transcription"] = time.time() - start_time
+        self.logger.info(f"Transcription: {transcribed}")
+        print(f"\nTranscription:\n{transcribed}")
+        return transcribed
 
     def _process_with_llm(self, transcribed_text):
         """Process the transcribed text with LLM."""
-        if not self.llm.ensure_model_available(Config.LLM.MODEL):
-            self.logger.critical(f"Could not obtain model {Config.LLM.MODEL}.")
-            sys.exit(1)
-
         # Use the already selected use case
-        if self.use_case == "thermostat":
-            system_prompt = Config.LLM.THERMOSTAT_SYSPROMPT
-            self.logger.info("Using smart thermostat system prompt.")
-        else:  # Default/agnostic case
-            system_prompt = Config.LLM.SYSPROMPT
-            self.logger.info("Using default system prompt.")
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": transcribed_text}
-        ]
-        if "granite3.2" in Config.LLM.MODEL:
-            messages.insert(0, {"role": "control", "content": "thinking"})
+        messages = self.llm.build_messages(transcribed_text, self.use_case)
 
         print("\nProcessing your request, please wait...")
 
         self.logger.info("Sending input to LLM.")
+        llm_start = time.time()
         response = self.llm.chat(Config.LLM.MODEL, messages)
 
         if response and 'message' in response and 'content' in response['message']:
+            record_llm_call(self.tracer, self.request_id, llm_start, time.time(), response)
             llm_output = response['message']['content']
             self.logger.info(f"LLM output: \n{llm_output}")
             print(f"\nResponse:\n{llm_output}")
@@ -113,27 +288,40 @@ class Pipeline:
 
         return None
 
-    def _handle_output(self, llm_output):
-        """Handle the output from LLM (save/play synthesized speech)."""
-        output_choice = self.ui.get_output_mode()
-
+    def get_synthesis_text(self, llm_output, use_case):
+        """Return the part of the LLM output that should be spoken for the given use case."""
         # For thermostat use case, extract only the user response part
         synthesis_text = llm_output
-        if self.use_case == "thermostat":
+        if use_case == "thermostat":
             try:
                 # Look for the user response section
-                if "PART 2 - USER RESPONSE:" in llm_output:
-                    # Extract everything after "PART 2 - USER RESPONSE:"
-                    parts = llm_output.split("PART 2 - USER RESPONSE:")
+                if THERMOSTAT_RESPONSE_MARKER in llm_output:
+                    # Extract everything after the marker
+                    parts = llm_output.split(THERMOSTAT_RESPONSE_MARKER)
                     if len(parts) > 1:
                         synthesis_text = parts[1].strip()
                         self.logger.info("Extracted user response part for synthesis")
                 else:
-                    self.logger.warning("Expected 'PART 2 - USER RESPONSE:' not found in LLM output")
+                    self.logger.warning(f"Expected '{THERMOSTAT_RESPONSE_MARKER}' not found in LLM output")
             except Exception as e:
                 self.logger.error(f"Error extracting user response: {e}")
                 # Fallback to using the full text
                 synthesis_text = llm_output
+        return synthesis_text
+
+    def _handle_output(self, llm_output, timings=None, output_choice=None):
+        """Handle the output from LLM (save/play synthesized speech).
+
+        If a timings dictionary is given, the synthesis and playback time is stored in it,
+        without the time spent answering the output prompts. The user is asked for the output
+        mode unless output_choice is given.
+
+        Returns:
+            With Config.AUDIO.BARGE_IN, the utterance that interrupted playback, otherwise None.
+        """
+        output_choice = output_choice or self.ui.get_output_mode()
+
+        synthesis_text = self.get_synthesis_text(llm_output, self.use_case)
 
         filename = None
         if output_choice in ['1', '3']:  # Save or Save and play
@@ -141,12 +329,37 @@ class Pipeline:
             default_filename = f"{Config.SYNTHESIS.OUTPUT_DIR}/output_{timestamp}.wav"
             filename = self.ui.get_output_filename(default_filename)
 
-            self.synthesis.save_output(synthesis_text, filename)
+        start_time = time.time()
+        if filename is not None:
+            with self.tracer.span("synthesis", self.request_id):
+                self.synthesis.save_output(synthesis_text, filename)
             self.logger.info(f"Audio saved to {filename}")
 
-        if output_choice == '2':  # Play only
-            self.synthesis.play_raw_output(synthesis_text)
-            self.logger.info("Audio playback completed.")
-        elif output_choice == '3':  # Save and play
-            self.synthesis.play_output(filename)
-            self.logger.info("Audio playback completed.")
+        barge_in_audio = None
+        if output_choice in ['2', '3']:
+            # Listen during playback, so that the user can interrupt it by speaking
+            cancel_event = threading.Event()
+            monitor = BargeInMonitor(self.audio, cancel_event.set) if Config.AUDIO.BARGE_IN else None
+            if monitor is not None:
+                monitor.start()
+            try:
+                if output_choice == '2':  # Play only
+                    with self.tracer.span("synthesis_and_playback", self.request_id):
+                        self.synthesis.play_raw_output(synthesis_text, cancel_event=cancel_event)
+                else:  # Save and play
+                    with self.tracer.span("playback", self.request_id):
+                        self.synthesis.play_output(filename, cancel_event)
+            finally:
+                if monitor is not None:
+                    barge_in_audio = monitor.stop()
+            self.logger.info("Audio playback interrupted." if cancel_event.is_set() else "Audio playback completed.")
+        if timings is not None:
+            timings["output"] = time.time() - start_time
+
+        cache_stats = self.synthesis.get_cache_stats()
+        if cache_stats:
+            self.logger.info(f"Phrase cache stats: {cache_stats}")
+        voice_stats = self.synthesis.get_voice_stats()
+        if voice_stats:
+            self.logger.debug(f"Voice pool stats: {voice_stats}")
+        return barge_in_audio
@@ -0,0 +1,325 @@
+import asyncio
+import io
+import json
+import os
+import queue
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+from core.config import Config
+from core.metrics import get_registry, start_exporter, flush_textfile
+from .audio_handler import AudioHandler
+from .transcriber_handler import TranscriberHandler
+from .llm_handler import LLMHandler
+from .synthesis_handler import SynthesisHandler
+from .staged_pipeline import SentenceSegmenter
+
+_STREAM_END = object()
+
+
+class ServerBusy(Exception):
+    """Raised when the request queue is full."""
+
+
+class PipelineServer:
+    """Serves transcription, chat and synthesis over HTTP and WebSocket with resident models."""
+
+    def __init__(self, logger):
+        """Load all models once and set up the per-stage worker pools."""
+        self.logger = logger
+        self.audio = AudioHandler(logger)
+        self.transcriber = TranscriberHandler(logger)
+        self.llm = LLMHandler(logger)
+        self.synthesis = SynthesisHandler(logger)
+
+        self.transcription_pool = ThreadPoolExecutor(Config.SERVER.TRANSCRIPTION_WORKERS, "transcription")
+        self.llm_pool = ThreadPoolExecutor(Config.SERVER.LLM_WORKERS, "llm")
+        self.synthesis_pool = ThreadPoolExecutor(Config.SERVER.SYNTHESIS_WORKERS, "synthesis")
+        self.vad_executor = ThreadPoolExecutor(Config.SERVER.VAD_POOL_SIZE, "vad")
+
+        self.vad_pool = queue.Queue()
+        for _ in range(Config.SERVER.VAD_POOL_SIZE):
+            vad = self.audio.create_vad()
+            if vad is not None:
+                self.vad_pool.put(vad)
+
+        self.pending_requests = 0
+        get_registry().gauge("pipeline_server_pending_requests", "Requests being processed or waiting.").set_function(
+            lambda: self.pending_requests)
+        start_exporter(logger)
+
+    def _acquire_slot(self):
+        if self.pending_requests >= Config.SERVER.MAX_PENDING_REQUESTS:
+            raise ServerBusy()
+        self.pending_requests += 1
+
+    def _release_slot(self):
+        self.pending_requests -= 1
+
+    async def _run(self, pool, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+    @staticmethod
+    def _decode_wav(data):
+        """Decode 16-bit mono WAV bytes into float32 samples at the configured sampling rate."""
+        try:
+            with wave.open(io.BytesIO(data), "rb") as wav_file:
+                if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+                    raise ValueError("Audio must be 16-bit mono WAV")
+                if wav_file.getframerate() != Config.AUDIO.SAMPLING_RATE:
+                    raise ValueError(f"Audio must be sampled at {Config.AUDIO.SAMPLING_RATE} Hz")
+                frames = wav_file.readframes(wav_file.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"Invalid WAV file: {e}")
+        return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+    @staticmethod
+    def _resolve_voice(voice):
+        """Return the model path of a voice given by name, only accepting models next to the default one."""
+        if voice is None:
+            return None
+        voices_dir = os.path.dirname(Config.SYNTHESIS.PIPER_MODEL_PATH)
+        name = voice if isinstance(voice, str) and voice.endswith(".onnx") else f"{voice}.onnx"
+        model_path = os.path.join(voices_dir, name)
+        if not isinstance(voice, str) or os.path.basename(name) != name or not os.path.isfile(model_path):
+            raise ValueError(f"Unknown voice '{voice}'")
+        return model_path
+
+    def _encode_wav(self, audio, sample_rate):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(np.asarray(audio, dtype=np.int16).tobytes())
+        return buffer.getvalue()
+
+    def _chat(self, text, use_case):
+        response = self.llm.chat(Config.LLM.MODEL, self.llm.build_messages(text, use_case))
+        if not response or 'message' not in response:
+            raise RuntimeError("No valid output from LLM")
+        return response['message']['content']
+
+    @web.middleware
+    async def queue_middleware(self, request, handler):
+        """Reject requests with HTTP 503 when the request queue is full."""
+        # Streaming connections take a slot per utterance rather than for their whole lifetime
+        if request.path in ("/health", "/stream"):
+            return await handler(request)
+        try:
+            self._acquire_slot()
+        except ServerBusy:
+            return web.json_response({"error": "Server busy"}, status=503)
+        try:
+            return await handler(request)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        except Exception as e:
+            self.logger.error(f"Request to {request.path} failed: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+        finally:
+            self._release_slot()
+
+    async def handle_health(self, request):
+        """GET /health: report server status and queue occupancy."""
+        return web.json_response({
+            "status": "ok",
+            "pending_requests": self.pending_requests,
+            "max_pending_requests": Config.SERVER.MAX_PENDING_REQUESTS
+        })
+
+    async def handle_transcribe(self, request):
+        """POST /transcribe: body is a 16-bit mono WAV file. Returns the transcription."""
+        audio = self._decode_wav(await request.read())
+        text = await self._run(self.transcription_pool, self.transcriber.transcribe, audio)
+        return web.json_response({"text": text})
+
+    async def handle_chat(self, request):
+        """POST /chat: body is {"text": ..., "use_case": ...}. Returns the LLM response."""
+        body = await request.json()
+        if not body.get("text"):
+            raise ValueError("Missing 'text'")
+        response = await self._run(self.llm_pool, self._chat, body["text"], body.get("use_case", "general"))
+        return web.json_response({"response": response})
+
+    async def handle_synthesize(self, request):
+        """POST /synthesize: body is {"text": ..., "voice": ...}. Returns a WAV file."""
+        body = await request.json()
+        if not body.get("text"):
+            raise ValueError("Missing 'text'")
+        voice = self._resolve_voice(body.get("voice"))
+        audio = await self._run(self.synthesis_pool, self.synthesis.synthesize_pcm, body["text"], voice)
+        if audio is None:
+            raise RuntimeError("Synthesis failed")
+        wav_data = self._encode_wav(audio, self.synthesis.get_sample_rate(voice))
+        return web.Response(body=wav_data, content_type="audio/wav")
+
+    async def _stream_response(self, ws, text, use_case):
+        """Stream LLM tokens to the client and send each completed sentence as PCM audio."""
+        loop = asyncio.get_running_loop()
+        tokens = asyncio.Queue()
+        # Set when the client goes away, so that generation stops and frees its LLM worker
+        cancelled = threading.Event()
+
+        def generate():
+            stream = self.llm.chat_stream(Config.LLM.MODEL, self.llm.build_messages(text, use_case))
+            try:
+                for token in stream:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(tokens.put_nowait, token)
+            finally:
+                stream.close()
+                loop.call_soon_threadsafe(tokens.put_nowait, _STREAM_END)
+
+        generation = loop.run_in_executor(self.llm_pool, generate)
+        segmenter = SentenceSegmenter(use_case, self.logger)
+
+        async def speak(sentences):
+            for sentence in sentences:
+                audio = await self._run(self.synthesis_pool, self.synthesis.synthesize_pcm, sentence)
+                if audio is not None and len(audio) > 0:
+                    await ws.send_bytes(np.asarray(audio, dtype=np.int16).tobytes())
+
+        try:
+            while True:
+                token = await tokens.get()
+                if token is _STREAM_END:
+                    break
+                if ws.closed:
+                    return
+                await ws.send_json({"type": "token", "text": token})
+                await speak(segmenter.feed(token))
+            await speak(segmenter.flush())
+            await generation
+            await ws.send_json({"type": "done"})
+        finally:
+            cancelled.set()
+
+    @staticmethod
+    def _detect_speech(vad, pending_audio, speech_buffer, recording):
+        """Run the VAD over the complete chunks of pending audio until the end of an utterance.
+
+        Returns:
+            The remaining pending audio, the speech buffer, whether speech is being recorded and
+            whether the utterance ended.
+        """
+        # The VAD model only accepts fixed-size chunks
+        chunk_size = Config.AUDIO.CHUNK_SIZE
+        end_of_speech = False
+        while len(pending_audio) >= chunk_size and not end_of_speech:
+            chunk, pending_audio = pending_audio[:chunk_size], pending_audio[chunk_size:]
+            speech_dict = vad(chunk)
+            if recording or (speech_dict and "start" in speech_dict):
+                recording = True
+                speech_buffer = np.concatenate((speech_buffer, chunk))
+            max_reached = len(speech_buffer) / Config.AUDIO.SAMPLING_RATE > Config.AUDIO.MAX_SPEECH_SECS
+            end_of_speech = recording and (max_reached or bool(speech_dict and "end" in speech_dict))
+        return pending_audio, speech_buffer, recording, end_of_speech
+
+    async def handle_stream(self, request):
+        """GET /stream: WebSocket for streaming audio in and out.
+
+        The client sends float32 mono PCM at the configured sampling rate as binary messages, and
+        may send {"type": "config", "use_case": ...} as a text message. After each utterance, the
+        server sends a "transcription" message, "token" messages as the response is generated,
+        int16 PCM audio as binary messages, and a final "done" message.
+        """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        # Like the HTTP routes, reject the client instead of waiting when every VAD model is in use
+        try:
+            vad = self.vad_pool.get_nowait()
+        except queue.Empty:
+            await ws.send_json({"type": "error", "error": "Server busy"})
+            await ws.close()
+            return ws
+
+        use_case = "general"
+        pending_audio = np.empty(0, dtype=np.float32)
+        speech_buffer = np.empty(0, dtype=np.float32)
+        recording = False
+        await ws.send_json({"type": "audio_format", "sample_rate": self.synthesis.get_sample_rate()})
+
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    try:
+                        message = json.loads(msg.data)
+                    except json.JSONDecodeError as e:
+                        await ws.send_json({"type": "error", "error": f"Invalid JSON message: {e}"})
+                        continue
+                    if isinstance(message, dict) and message.get("type") == "config":
+                        use_case = message.get("use_case", use_case)
+                    continue
+                if msg.type != WSMsgType.BINARY:
+                    continue
+
+                try:
+                    samples = np.frombuffer(msg.data, dtype=np.float32)
+                except ValueError:
+                    await ws.send_json({"type": "error", "error": "Audio must be float32 samples"})
+                    continue
+                pending_audio = np.concatenate((pending_audio, samples))
+                # VAD inference runs off the event loop, so that it does not stall other requests
+                pending_audio, speech_buffer, recording, end_of_speech = await self._run(
+                    self.vad_executor, self._detect_speech, vad, pending_audio, speech_buffer, recording)
+                if not end_of_speech:
+                    continue
+
+                segment = speech_buffer
+                speech_buffer, recording = np.empty(0, dtype=np.float32), False
+                vad.reset_states()
+                try:
+                    self._acquire_slot()
+                except ServerBusy:
+                    await ws.send_json({"type": "error", "error": "Server busy"})
+                    continue
+                try:
+                    text = await self._run(self.transcription_pool, self.transcriber.transcribe, segment)
+                    await ws.send_json({"type": "transcription", "text": text})
+                    if text:
+                        await self._stream_response(ws, text, use_case)
+                except Exception as e:
+                    if ws.closed:
+                        raise
+                    self.logger.error(f"Streaming request failed: {e}")
+                    await ws.send_json({"type": "error", "error": str(e)})
+                finally:
+                    self._release_slot()
+        finally:
+            vad.reset_states()
+            self.vad_pool.put(vad)
+        return ws
+
+    def create_app(self):
+        """Build the aiohttp application with all routes."""
+        app = web.Application(middlewares=[self.queue_middleware], client_max_size=64 * 1024 * 1024)
+        app.add_routes([
+            web.get("/health", self.handle_health),
+            web.post("/transcribe", self.handle_transcribe),
+            web.post("/chat", self.handle_chat),
+            web.post("/synthesize", self.handle_synthesize),
+            web.get("/stream", self.handle_stream),
+        ])
+        return app
+
+    def serve(self, host=None, port=None):
+        """Run the server until interrupted."""
+        host = host or Config.SERVER.HOST
+        port = port or Config.SERVER.PORT
+        self.logger.info(f"Serving pipeline on http://{host}:{port}")
+        try:
+            web.run_app(self.create_app(), host=host, port=port)
+        finally:
+            self.transcription_pool.shutdown()
+            self.llm_pool.shutdown()
+            self.synthesis_pool.shutdown()
+            self.vad_executor.shutdown()
+            self.synthesis.close()
+            flush_textfile()
@@ -0,0 +1,294 @@
+import queue
+import threading
+import time
+
+from core.config import Config
+from core.audio_devices import get_output_device
+from core.synthesis_workers import SENTENCE_END
+from core.synthesizer import write_cancellable
+from core.tracing import get_tracer
+from core.metrics import get_registry
+from .audio_handler import BargeInMonitor
+from .llm_handler import record_llm_call
+
+THERMOSTAT_RESPONSE_MARKER = "PART 2 - USER RESPONSE:"
+
+_END = object()
+
+
+class Stage(threading.Thread):
+    """Worker thread that consumes items from one queue and pushes its outputs to the next."""
+
+    def __init__(self, name, process, in_queue, out_queue, cancel_event, logger, flush=None):
+        """Initialize the stage.
+
+        Args:
+            name: Name of the stage, used in logs and timings.
+            process: Callable taking one input item and returning an iterable of output items.
+            in_queue: Queue the stage reads from.
+            out_queue: Queue the stage writes to, or None for the last stage.
+            cancel_event: Event that stops all stages when set.
+            logger: Logger instance.
+            flush: Optional callable returning the remaining output items once the input ends.
+        """
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.process = process
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.cancel_event = cancel_event
+        self.logger = logger
+        self.flush = flush
+        self.busy_time = 0.0
+        self.error = None
+
+    def _emit(self, outputs):
+        for output in outputs:
+            if self.cancel_event.is_set():
+                break
+            if self.out_queue is not None:
+                self.out_queue.put(output)
+
+    def run(self):
+        """Process items until the end marker arrives, then forward it downstream."""
+        try:
+            while True:
+                item = self.in_queue.get()
+                if item is _END:
+                    break
+                # Keep draining after a cancellation so upstream stages never block on a full queue
+                if self.cancel_event.is_set() or self.error is not None:
+                    continue
+                start_time = time.time()
+                try:
+                    self._emit(self.process(item))
+                except Exception as e:
+                    self.error = e
+                    self.logger.error(f"Stage '{self.stage_name}' failed: {e}")
+                    self.cancel_event.set()
+                self.busy_time += time.time() - start_time
+
+            if self.flush is not None and self.error is None and not self.cancel_event.is_set():
+                start_time = time.time()
+                self._emit(self.flush())
+                self.busy_time += time.time() - start_time
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"Stage '{self.stage_name}' failed: {e}")
+            self.cancel_event.set()
+        finally:
+            if self.out_queue is not None:
+                self.out_queue.put(_END)
+
+
+class SentenceSegmenter:
+    """Groups streamed LLM tokens into complete sentences for synthesis."""
+
+    def __init__(self, use_case, logger=None):
+        """Initialize the segmenter.
+
+        For the thermostat use case, only the text after the user response marker is spoken.
+        If the marker never appears, the whole output is spoken when the segmenter is flushed.
+        """
+        self.buffer = ""
+        self.speaking = use_case != "thermostat"
+        self.logger = logger
+
+    def feed(self, token):
+        """Add a token and yield any sentences it completes."""
+        self.buffer += token
+        if not self.speaking:
+            marker_idx = self.buffer.find(THERMOSTAT_RESPONSE_MARKER)
+            if marker_idx < 0:
+                return
+            self.buffer = self.buffer[marker_idx + len(THERMOSTAT_RESPONSE_MARKER):]
+            self.speaking = True
+
+        parts = SENTENCE_END.split(self.buffer)
+        self.buffer = parts[-1]
+        for sentence in parts[:-1]:
+            if sentence.strip():
+                yield sentence.strip()
+
+    def flush(self):
+        """Yield the last, possibly unterminated, sentence, or the whole output if the marker never appeared."""
+        if not self.speaking and self.logger is not None:
+            self.logger.warning(f"Expected '{THERMOSTAT_RESPONSE_MARKER}' not found in LLM output")
+        if self.buffer.strip():
+            yield self.buffer.strip()
+        self.buffer = ""
+
+
+class StagedPipeline:
+    """Runs capture, transcription, LLM generation, synthesis and playback as concurrent stages."""
+
+    def __init__(self, audio, transcriber, llm, synthesis, logger, queue_size=None):
+        """Initialize the staged pipeline with already loaded pipeline handlers."""
+        self.audio = audio
+        self.transcriber = transcriber
+        self.llm = llm
+        self.synthesis = synthesis
+        self.logger = logger
+        self.queue_size = queue_size or Config.PIPELINE.STAGE_QUEUE_SIZE
+        self.cancel_event = threading.Event()
+
+    def run(self, request, use_case, print_output=True, barge_in=None):
+        """Process one request through all stages.
+
+        Args:
+            request: Dictionary with either "text", "wav" (path to a WAV file), "audio" (recorded
+                speech samples) or "microphone".
+            use_case: Name of the selected use case.
+            print_output: Whether to print the transcription and the streamed response.
+            barge_in: Whether to listen for user speech during playback and interrupt it.
+                Defaults to Config.AUDIO.BARGE_IN.
+
+        Returns:
+            Dictionary with the transcription, the LLM output, stage timings and any errors.
+            If the user interrupted playback, "barge_in_audio" holds the interrupting utterance.
+        """
+        self.cancel_event.clear()
+        start_time = time.time()
+        result = {"transcription": None, "llm_output": "", "timings": {}, "errors": {}, "barge_in_audio": None}
+        marks = result["timings"]
+        segmenter = SentenceSegmenter(use_case, self.logger)
+        sample_rate = self.synthesis.get_sample_rate()
+        output_stream = []
+        barge_in = Config.AUDIO.BARGE_IN if barge_in is None else barge_in
+        tracer = get_tracer()
+        request_id = request.get("id") or tracer.new_request_id()
+        result["request_id"] = request_id
+
+        def mark(name):
+            if name not in marks:
+                marks[name] = round(time.time() - start_time, 3)
+
+        def interrupt():
+            mark("barge_in")
+            tracer.instant("barge_in", request_id)
+            self.cancel()
+
+        monitor = BargeInMonitor(self.audio, interrupt) if barge_in else None
+
+        def capture(item):
+            if "text" in item:
+                yield item["text"]
+                return
+            if "audio" in item:
+                speech_segment = item["audio"]
+            elif "wav" in item:
+                with tracer.span("load_wav", request_id):
+                    speech_segment = self.audio.load_from_wav(item["wav"])
+            else:
+                speech_segment = self.audio.record_from_microphone(request_id)
+            mark("capture_end")
+            if speech_segment is not None:
+                yield speech_segment
+
+        def transcribe(item):
+            if isinstance(item, str):
+                text = item
+            else:
+                with tracer.span("transcription", request_id):
+                    text = self.transcriber.transcribe(item)
+            mark("transcription_end")
+            result["transcription"] = text
+            self.logger.info(f"Transcription: {text}")
+            if print_output:
+                print(f"\nTranscription:\n{text}\n\nResponse:")
+            if text:
+                yield text
+
+        def generate(text):
+            messages = self.llm.build_messages(text, use_case)
+            self.logger.info("Sending input to LLM.")
+            llm_stats = {}
+            llm_start = time.time()
+            first_token_time = None
+            for token in self.llm.chat_stream(Config.LLM.MODEL, messages, llm_stats):
+                if self.cancel_event.is_set():
+                    break
+                if first_token_time is None:
+                    first_token_time = time.time()
+                    tracer.instant("llm.first_token", request_id)
+                mark("first_token")
+                result["llm_output"] += token
+                if print_output:
+                    print(token, end="", flush=True)
+                yield token
+            mark("last_token")
+            record_llm_call(tracer, request_id, llm_start, time.time(), llm_stats, first_token_time)
+
+        def synthesize(sentence):
+            with tracer.span("synthesis", request_id, characters=len(sentence)):
+                audio = self.synthesis.synthesize_pcm(sentence)
+            mark("first_sentence_synthesized")
+            if audio is not None and len(audio) > 0:
+                yield audio
+
+        def play(audio):
+            if not output_stream:
+                stream = get_output_device().OutputStream(samplerate=sample_rate, channels=1, dtype="int16")
+                stream.start()
+                output_stream.append(stream)
+                if monitor is not None:
+                    monitor.start()
+            mark("first_audio")
+            with tracer.span("playback", request_id, samples=len(audio)):
+                write_cancellable(output_stream[0], audio, self.cancel_event)
+            return ()
+
+        def close_output():
+            if output_stream:
+                output_stream[0].stop()
+                output_stream[0].close()
+            mark("playback_end")
+            return ()
+
+        stage_specs = [
+            ("capture", capture, None),
+            ("transcription", transcribe, None),
+            ("llm", generate, None),
+            ("segmentation", segmenter.feed, segmenter.flush),
+            ("synthesis", synthesize, None),
+            ("playback", play, close_output),
+        ]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stage_specs]
+        stages = [
+            Stage(name, process, queues[idx],
+                  queues[idx + 1] if idx + 1 < len(queues) else None,
+                  self.cancel_event, self.logger, flush)
+            for idx, (name, process, flush) in enumerate(stage_specs)
+        ]
+
+        queue_depth = get_registry().gauge("pipeline_stage_queue_depth", "Items waiting in front of each pipeline stage.")
+        for stage in stages:
+            queue_depth.set_function(stage.in_queue.qsize, stage=stage.stage_name)
+            stage.start()
+        queues[0].put(request)
+        queues[0].put(_END)
+        for stage in stages:
+            stage.join()
+            queue_depth.remove_function(stage=stage.stage_name)
+
+        # Make sure the output device is released even if playback was cancelled
+        if output_stream and not output_stream[0].closed:
+            output_stream[0].abort()
+            output_stream[0].close()
+
+        if monitor is not None and output_stream:
+            result["barge_in_audio"] = monitor.stop()
+
+        if print_output and result["llm_output"]:
+            print()
+        self.logger.info(f"LLM output: \n{result['llm_output']}")
+
+        marks["total"] = round(time.time() - start_time, 3)
+        result["stage_busy_time"] = {stage.stage_name: round(stage.busy_time, 3) for stage in stages}
+        result["errors"] = {stage.stage_name: str(stage.error) for stage in stages if stage.error}
+        self.logger.info(f"Staged pipeline timings: {marks}")
+        return result
+
+    def cancel(self):
+        """Stop all stages of the running request."""
+        self.cancel_event.set()
@@ -1,5 +1,6 @@
 import os
 from core.config import Config
+from core.metrics import get_registry
 
 class SynthesisHandler:
     """Handles speech synthesis operations."""
@@ -8,14 +9,32 @@ class SynthesisHandler:
         """Initialize the synthesis handler."""
         self.logger = logger
         from core.synthesizer import Synthesizer
-        self.synthesizer = Synthesizer(Config.SYNTHESIS.PIPER_MODEL_PATH)
+        from core.phrase_cache import PhraseCache
+        from core.voice_pool import VoicePool
+        voice_pool = None
+        if Config.SYNTHESIS.VOICE_POOL_MAX_MB > 0:
+            voice_pool = VoicePool(Config.SYNTHESIS.VOICE_POOL_MAX_MB, logger)
+        cache = None
+        if Config.SYNTHESIS.CACHE_ENABLED:
+            cache = PhraseCache(Config.SYNTHESIS.CACHE_DIR, Config.SYNTHESIS.CACHE_MAX_MB, logger)
+        self.synthesizer = Synthesizer(
+            Config.SYNTHESIS.PIPER_MODEL_PATH,
+            cache=cache,
+            workers=Config.SYNTHESIS.PARALLEL_WORKERS,
+            voice_pool=voice_pool
+        )
         self.synthesizer.logger = logger
+        if cache is not None:
+            get_registry().gauge("pipeline_synthesis_cache_hit_ratio", "Hit rate of the phrase cache.").set_function(
+                lambda: cache.get_stats()["hit_rate"])
 
-    def save_output(self, text, filename):
-        """Save synthesized speech to a WAV file."""
+    def save_output(self, text, filename, voice=None):
+        """Save synthesized speech to a WAV file, optionally with a voice other than the default."""
         try:
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            result = self.synthesizer.save_output(text, filename)
+            output_dir = os.path.dirname(filename)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            result = self.synthesizer.save_output(text, filename, voice)
             if isinstance(result, dict) and "error" in result:
                 self.logger.error(f"Synthesis error: {result['error']}")
                 return False
@@ -24,19 +43,44 @@ class SynthesisHandler:
             self.logger.error(f"Failed to save synthesized speech: {e}")
             return False
 
-    def play_output(self, filename):
-        """Play synthesized speech from a WAV file."""
+    def play_output(self, filename, cancel_event=None):
+        """Play synthesized speech from a WAV file. Playback stops early if cancel_event is set."""
         try:
-            self.synthesizer.play_output(filename)
+            self.synthesizer.play_output(filename, cancel_event)
             return True
         except Exception as e:
             self.logger.error(f"Failed to play synthesized speech file: {e}")
             return False
 
-    def play_raw_output(self, text):
-        """Synthesize speech and play it without saving."""
+    def play_raw_output(self, text, voice=None, cancel_event=None):
+        """Synthesize speech and play it without saving. Playback stops early if cancel_event is set."""
         try:
-            return self.synthesizer.play_raw_output(text)
+            return self.synthesizer.play_raw_output(text, voice, cancel_event)
         except Exception as e:
             self.logger.error(f"Failed to play raw synthesized speech: {e}")
             return False
+
+    def synthesize_pcm(self, text, voice=None):
+        """Synthesize speech to an int16 PCM array without playing or saving it."""
+        try:
+            audio, _ = self.synthesizer.synthesize_pcm(text, voice)
+            return audio
+        except Exception as e:
+            self.logger.error(f"Failed to synthesize speech: {e}")
+            return None
+
+    def get_sample_rate(self, voice=None):
+        """Return the output sample rate of a voice."""
+        return self.synthesizer.get_sample_rate(voice)
+
+    def get_cache_stats(self):
+        """Return phrase cache hit statistics."""
+        return self.synthesizer.get_cache_stats()
+
+    def get_voice_stats(self):
+        """Return per-voice load and hit counters from the voice pool."""
+        return self.synthesizer.get_voice_stats()
+
+    def close(self):
+        """Release synthesis resources such as worker processes."""
+        self.synthesizer.close()
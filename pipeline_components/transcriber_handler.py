@@ -1,3 +1,6 @@
+import time
+from core.config import Config
+from core.metrics import get_registry, RTF_BUCKETS
 from core.transcriber import Transcriber
 
 class TranscriberHandler:
@@ -15,7 +18,13 @@ class TranscriberHandler:
             return ""
 
         try:
+            start_time = time.time()
             transcribed = self.transcriber(audio_data.flatten())
+            elapsed = time.time() - start_time
+            registry = get_registry()
+            registry.histogram("pipeline_transcription_seconds", "Time spent transcribing utterances.").observe(elapsed)
+            registry.histogram("pipeline_transcription_rtf", "Real time factor of transcription.",
+                               RTF_BUCKETS).observe(elapsed / (len(audio_data) / Config.AUDIO.SAMPLING_RATE))
             return transcribed if transcribed else ""
         except Exception as e:
             self.logger.error(f"Transcription failed: {e}")
@@ -170,3 +170,13 @@ class UIManager:
             f"Enter the relative filename to save the output (default: {default_filename}): "
         ).strip()
         return filename if filename else default_filename
+
+    def should_continue_session(self):
+        """Ask whether to handle another request in the current session."""
+        choice = input(
+            "\n==============================\n"
+            "SESSION\n"
+            "==============================\n"
+            "Press Enter for a new request, or type 'q' to quit: "
+        ).strip().lower()
+        return choice not in ['q', 'quit', 'exit']
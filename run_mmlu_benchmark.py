@@ -2,19 +2,43 @@ import os
 import json
 import time
 import re
+import hashlib
+import functools
+import itertools
+import threading
 import numpy as np
-from datasets import load_dataset
 from tqdm import tqdm
 import ollama
 from core.config import LLMConfig
 import argparse
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Define constants
 MMLU_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks/mmlu")
 
+# Compact index of the test split of every subject, with prompts already formatted, built by --build-index.
+# It is kept outside the dataset submodule, so that building it does not modify the submodule
+MMLU_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks/mmlu_index")
+
+# Number of questions sent to ollama at the same time. The server answers up to OLLAMA_NUM_PARALLEL
+# of them in parallel and queues the others, so the model is never left idle between questions.
+DEFAULT_CONCURRENCY = 4
+
+# Answer-only mode: generation is constrained by a JSON schema to one of the four letters, as a JSON
+# string such as "B". A few tokens cover the quotes and the end of the output.
+ANSWER_SCHEMA = {"type": "string", "enum": ["A", "B", "C", "D"]}
+ANSWER_MAX_TOKENS = 8
+
+@functools.lru_cache(maxsize=None)
 def get_available_subjects():
-    """Get all available MMLU subjects from the dataset_infos.json file"""
+    """Get all available MMLU subjects from the question index, or from the dataset_infos.json file without it"""
+    index_subjects_path = os.path.join(MMLU_INDEX_DIR, "subjects.json")
+    if os.path.exists(index_subjects_path):
+        with open(index_subjects_path, 'r') as f:
+            return list(json.load(f))
+
     dataset_info_path = os.path.join(MMLU_DIR, "dataset_infos.json")
     with open(dataset_info_path, 'r') as f:
         dataset_info = json.load(f)
@@ -22,6 +46,50 @@ def get_available_subjects():
     subjects = list(dataset_info.keys())
     return subjects
 
+def load_subject_from_dataset(subject):
+    """Load the test split of a subject with the datasets library, as a list of questions with formatted prompts"""
+    from datasets import load_dataset
+
+    dataset = load_dataset(os.path.join(MMLU_DIR, subject))
+    return [
+        {
+            "question": example["question"],
+            "choices": list(example["choices"]),
+            "answer": example["answer"],
+            "prompt": format_prompt(example["question"], example["choices"])
+        }
+        for example in dataset["test"]
+    ]
+
+def build_index():
+    """
+    Convert the test split of every subject to a compact JSON file in MMLU_INDEX_DIR, once, so that
+    benchmark runs load questions without importing the datasets library.
+    """
+    os.makedirs(MMLU_INDEX_DIR, exist_ok=True)
+    get_available_subjects.cache_clear()
+    subjects = [s for s in get_available_subjects() if s not in ['all', 'auxiliary_train']]
+    counts = {}
+    for subject in tqdm(subjects, desc="Indexing subjects"):
+        questions = load_subject_from_dataset(subject)
+        with open(os.path.join(MMLU_INDEX_DIR, f"{subject}.json"), 'w') as f:
+            json.dump(questions, f, ensure_ascii=False, separators=(",", ":"))
+        counts[subject] = len(questions)
+    # Written last, so that an interrupted build is not mistaken for a complete index
+    with open(os.path.join(MMLU_INDEX_DIR, "subjects.json"), 'w') as f:
+        json.dump(counts, f, indent=2)
+    get_available_subjects.cache_clear()
+    print(f"Indexed {sum(counts.values())} questions of {len(counts)} subjects in {MMLU_INDEX_DIR}")
+
+def load_subject_questions(subject):
+    """Load the test questions of a subject from the index, falling back to the datasets library without it"""
+    index_path = os.path.join(MMLU_INDEX_DIR, f"{subject}.json")
+    if os.path.exists(os.path.join(MMLU_INDEX_DIR, "subjects.json")) and os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    print("No question index found, loading the dataset. Run with --build-index once to speed this up.")
+    return load_subject_from_dataset(subject)
+
 def format_prompt(question, choices):
     """Format the prompt for the MMLU benchmark"""
     prompt = f"""Answer the following multiple-choice question by selecting the correct option (A, B, C, or D).
@@ -42,6 +110,11 @@ def extract_answer(response):
     """Extract the answer (A, B, C, or D) from the LLM response"""
     response = response.strip()
 
+    # Case 0: The whole response is the letter, possibly as a JSON string as in answer-only mode
+    exact_match = re.match(r'^"?([A-D])"?$', response)
+    if exact_match:
+        return exact_match.group(1)
+
     # Case 1: Look for patterns indicating a structured response with thinking
     if "Here is my response:" in response:
         # Split by the marker and take the part after it
@@ -82,9 +155,122 @@ def extract_answer(response):
     # No clear answer found
     return None
 
-def evaluate_subject(subject, model_name, num_examples=None, log_file=None):
-    """Evaluate the LLM on a specific MMLU subject"""
-    print(f"Loading dataset for subject: {subject}")
+def question_hash(example):
+    """Identify a question by its text and options, independently of its position in the dataset"""
+    content = json.dumps([example["question"], list(example["choices"])], ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+class ResponseStore:
+    """
+    Append-only JSONL store of model responses, keyed by model, subject and question hash.
+    Each response is written by the thread that received it, as soon as it is received, so an
+    interrupted run loses nothing, even the responses of questions later than one still in flight.
+    When a question was answered several times, the latest response wins. Responses of the free and
+    answer-only modes are kept apart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.responses = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be incomplete if a run was killed while writing it
+                        continue
+                    key = (record["model"], record.get("mode", "free"), record["subject"], record["question_hash"])
+                    self.responses[key] = record
+        self.file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def get(self, model_name, mode, subject, example):
+        return self.responses.get((model_name, mode, subject, question_hash(example)))
+
+    def append(self, model_name, mode, subject, example, full_response, tokens):
+        record = {
+            "model": model_name,
+            "mode": mode,
+            "subject": subject,
+            "question_hash": question_hash(example),
+            "full_response": full_response,
+            "tokens": tokens,
+            "timestamp": time.strftime("%Y%m%d-%H%M%S")
+        }
+        with self._lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self.responses[(model_name, mode, subject, record["question_hash"])] = record
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def query_model(client, model_name, example, answer_only=False):
+    """
+    Ask the model one MMLU question and return its full response, extracted answer and generated token count.
+    With answer_only, the output is constrained to the answer letter and reasoning is not enabled.
+    """
+    messages = []
+
+    # Add system message to enable reasoning for granite3.2 models
+    if model_name.startswith("granite3.2") and not answer_only:
+        messages.append({
+            'role': 'control',
+            'content': 'thinking'
+        })
+
+    # Add the user prompt
+    messages.append({
+        'role': 'user',
+        'content': example["prompt"]
+    })
+
+    try:
+        if answer_only:
+            response = client.chat(model=model_name, messages=messages, format=ANSWER_SCHEMA,
+                                   options={"num_predict": ANSWER_MAX_TOKENS, "temperature": 0})
+        else:
+            response = client.chat(model=model_name, messages=messages)
+    except Exception as e:
+        return {"error": str(e)}
+
+    full_response = response['message']['content'].strip()
+    return {
+        "full_response": full_response,
+        "model_answer": extract_answer(full_response),
+        "tokens": response.get('eval_count') or 0
+    }
+
+def map_in_order(executor, func, items, window):
+    """
+    Like executor.map, but only `window` items are submitted ahead of the consumer, so that an
+    interrupted run does not leave the rest of the items queued.
+    """
+    items = iter(items)
+    pending = deque(executor.submit(func, item) for item in itertools.islice(items, window))
+    while pending:
+        result = pending.popleft().result()
+        for item in itertools.islice(items, 1):
+            pending.append(executor.submit(func, item))
+        yield result
+
+def evaluate_subject(subject, model_name, num_examples=None, log_file=None, concurrency=DEFAULT_CONCURRENCY,
+                     store=None, resume=False, rescore=False, answer_only=False):
+    """
+    Evaluate the LLM on a specific MMLU subject.
+    Up to `concurrency` questions are in flight at the same time; results are logged in question order.
+    Every response is appended to the store. With resume, questions already in the store are not asked
+    again. With rescore, only stored responses are scored, with the current extract_answer, and questions
+    without a stored response are skipped. With answer_only, the model may only generate the answer letter.
+    """
+    print(f"Loading questions for subject: {subject}")
 
     # Log subject header
     if log_file:
@@ -92,14 +278,12 @@ def evaluate_subject(subject, model_name, num_examples=None, log_file=None):
         log_file.write(f"SUBJECT: {subject}\n")
         log_file.write(f"{'='*40}\n\n")
 
-    dataset = load_dataset(os.path.join(MMLU_DIR, subject))
-
-    # Use the test split
-    test_data = dataset["test"]
+    # Test split of the subject
+    test_data = load_subject_questions(subject)
 
     # Limit the number of examples if specified
     if num_examples is not None and num_examples > 0:
-        test_data = test_data.select(range(min(num_examples, len(test_data))))
+        test_data = test_data[:num_examples]
 
     print(f"Running evaluation on {len(test_data)} examples")
 
@@ -108,38 +292,47 @@ def evaluate_subject(subject, model_name, num_examples=None, log_file=None):
 
     correct = 0
     total = 0
-
-    # Process each example
-    for i, example in enumerate(tqdm(test_data)):
-        question = example["question"]
-        choices = example["choices"]
-        correct_answer_idx = example["answer"]
-        correct_answer = "ABCD"[correct_answer_idx]
-
-        # Format the prompt
-        prompt = format_prompt(question, choices)
-
-        # Query the model - use system prompt for reasoning if it's a granite3.2 model
-        try:
-            messages = []
-
-            # Add system message to enable reasoning for granite3.2 models
-            if model_name.startswith("granite3.2"):
-                messages.append({
-                    'role': 'control',
-                    'content': 'thinking'
-                })
-
-            # Add the user prompt
-            messages.append({
-                'role': 'user',
-                'content': prompt
-            })
-
-            # Send the request to Ollama
-            response = client.chat(model=model_name, messages=messages)
-            model_answer = extract_answer(response['message']['content'])
-            full_response = response['message']['content'].strip()
+    queried = 0
+    missing = 0
+    tokens = 0
+    mode = "answer_only" if answer_only else "free"
+    start_time = time.time()
+
+    def answer(example):
+        stored = store.get(model_name, mode, subject, example) if store is not None and (resume or rescore) else None
+        if stored is not None:
+            return {"full_response": stored["full_response"], "stored": True}
+        if rescore:
+            return {"missing": True}
+        response = query_model(client, model_name, example, answer_only)
+        if store is not None and "error" not in response:
+            store.append(model_name, mode, subject, example, response["full_response"], response["tokens"])
+        return response
+
+    # Results come back in question order, so the log is the same whatever the concurrency
+    executor = ThreadPoolExecutor(max_workers=max(concurrency, 1))
+    try:
+        responses = map_in_order(executor, answer, test_data, max(concurrency, 1))
+        for i, (example, response) in enumerate(tqdm(zip(test_data, responses), total=len(test_data))):
+            question = example["question"]
+            choices = example["choices"]
+            correct_answer = "ABCD"[example["answer"]]
+
+            if "error" in response:
+                print(f"Error querying model: {response['error']}")
+                if log_file:
+                    log_file.write(f"Error processing question: {response['error']}\n\n")
+                continue
+            if "missing" in response:
+                missing += 1
+                continue
+
+            if response.get("stored"):
+                model_answer = extract_answer(response["full_response"])
+            else:
+                model_answer = response["model_answer"]
+                queried += 1
+                tokens += response["tokens"]
 
             is_correct = model_answer == correct_answer
             if is_correct:
@@ -152,34 +345,45 @@ def evaluate_subject(subject, model_name, num_examples=None, log_file=None):
                 log_file.write("Options:\n")
                 for j, choice in enumerate(choices):
                     log_file.write(f"{chr(65+j)}. {choice}\n")
-                log_file.write(f"\nModel's full response: {full_response}\n")
+                source = " (stored)" if response.get("stored") else ""
+                log_file.write(f"\nModel's full response{source}: {response['full_response']}\n")
+                if not response.get("stored"):
+                    log_file.write(f"Tokens generated: {response['tokens']}\n")
                 log_file.write(f"Model's answer: {model_answer}\n")
                 log_file.write(f"Correct answer: {correct_answer}\n")
                 log_file.write(f"Result: {'✓ Correct' if is_correct else '✗ Incorrect'}\n")
                 log_file.write(f"\n{'-'*40}\n\n")
+    finally:
+        executor.shutdown(cancel_futures=True)
 
-            # Add a small delay to avoid rate limiting
-            time.sleep(0.1)
+    duration = time.time() - start_time
 
-        except Exception as e:
-            print(f"Error querying model: {e}")
-            if log_file:
-                log_file.write(f"Error processing question: {e}\n\n")
-            continue
-
-    # Calculate accuracy
+    # Calculate accuracy and throughput. Stored responses do not count towards the throughput
     accuracy = correct / total if total > 0 else 0
+    questions_per_second = queried / duration if duration > 0 and queried else 0
+    tokens_per_question = tokens / queried if queried else 0
+
+    if missing:
+        print(f"Skipped {missing} questions without a stored response")
 
     # Log summary for this subject
     if log_file:
         log_file.write(f"Subject Summary: {subject}\n")
-        log_file.write(f"Accuracy: {accuracy:.4f} ({correct}/{total})\n\n")
+        log_file.write(f"Accuracy: {accuracy:.4f} ({correct}/{total})\n")
+        log_file.write(f"Throughput: {questions_per_second:.2f} questions/s ({duration:.1f}s), "
+                       f"{tokens_per_question:.1f} tokens/question\n\n")
 
     return {
         "subject": subject,
         "accuracy": accuracy,
         "correct": correct,
-        "total": total
+        "total": total,
+        "queried": queried,
+        "missing": missing,
+        "duration": round(duration, 2),
+        "questions_per_second": round(questions_per_second, 3),
+        "tokens": tokens,
+        "tokens_per_question": round(tokens_per_question, 2)
     }
 
 def get_user_input():
@@ -267,6 +471,27 @@ def parse_args():
     parser.add_argument('-e', '--examples', type=int, default=20,
                        help='Number of examples per subject (0 for all examples)')
     
+    # Number of questions in flight
+    parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                       help='Number of questions sent to ollama at the same time. Set OLLAMA_NUM_PARALLEL '
+                            f'on the ollama server to at least this value (default: {DEFAULT_CONCURRENCY})')
+
+    # One-time preprocessing of the dataset
+    parser.add_argument('--build-index', action='store_true',
+                       help='Build the compact question index of all subjects from the dataset and exit')
+
+    # Resuming and re-scoring from the response store
+    parser.add_argument('--resume', action='store_true',
+                       help='Reuse the stored responses of previous runs and only ask the remaining questions')
+    parser.add_argument('--rescore', action='store_true',
+                       help='Score the stored responses again without querying the model, '
+                            'e.g. after changing the answer extraction')
+
+    # Constrained scoring mode
+    parser.add_argument('--answer-only', action='store_true',
+                       help='Constrain generation to the answer letter, without reasoning, for fast and '
+                            'unambiguous scoring')
+
     # Non-interactive mode flag
     parser.add_argument('-y', '--non-interactive', action='store_true',
                        help='Run in non-interactive mode (requires -a or -s)')
@@ -322,11 +547,14 @@ def run_benchmark(options):
     log_filename = os.path.join(logs_dir, f"{timestamp}.txt")
     result_file = os.path.join(result_dir, f"{timestamp}.json")
 
-    with open(log_filename, 'w') as log_file:
+    # Responses of every run of this model, kept across runs
+    with ResponseStore(os.path.join(result_dir, "responses.jsonl")) as store, open(log_filename, 'w') as log_file:
         # Write log header
         log_file.write("="*50 + "\n")
         log_file.write(f"MMLU BENCHMARK LOG - {timestamp}\n")
         log_file.write(f"Model: {model_name}\n")
+        if options.get("answer_only", False):
+            log_file.write("Mode: answer only\n")
         log_file.write("="*50 + "\n\n")
 
         if options["subject"] == "all":
@@ -346,23 +574,36 @@ def run_benchmark(options):
                 subject,
                 model_name,
                 options["num_examples"],
-                log_file
+                log_file,
+                options.get("concurrency", DEFAULT_CONCURRENCY),
+                store,
+                options.get("resume", False),
+                options.get("rescore", False),
+                options.get("answer_only", False)
             )
             results.append(subject_result)
-            print(f"Subject: {subject}, Accuracy: {subject_result['accuracy']:.4f} ({subject_result['correct']}/{subject_result['total']})")
+            print(f"Subject: {subject}, Accuracy: {subject_result['accuracy']:.4f} ({subject_result['correct']}/{subject_result['total']}), "
+                  f"{subject_result['questions_per_second']:.2f} questions/s, {subject_result['tokens_per_question']:.1f} tokens/question")
 
         # Calculate overall accuracy if multiple subjects
         overall_accuracy = 0
+        total_duration = sum(r["duration"] for r in results)
+        total_queried = sum(r["queried"] for r in results)
+        overall_questions_per_second = total_queried / total_duration if total_duration > 0 else 0
+        overall_tokens_per_question = sum(r["tokens"] for r in results) / total_queried if total_queried else 0
         if len(results) > 1:
             total_correct = sum(r["correct"] for r in results)
             total_examples = sum(r["total"] for r in results)
             overall_accuracy = total_correct / total_examples if total_examples > 0 else 0
             print(f"\nOverall Accuracy: {overall_accuracy:.4f} ({total_correct}/{total_examples})")
+            print(f"Overall Throughput: {overall_questions_per_second:.2f} questions/s, {overall_tokens_per_question:.1f} tokens/question")
 
             # Write overall summary to log
             log_file.write("\n" + "="*50 + "\n")
             log_file.write("OVERALL SUMMARY\n")
             log_file.write(f"Total Accuracy: {overall_accuracy:.4f} ({total_correct}/{total_examples})\n")
+            log_file.write(f"Throughput: {overall_questions_per_second:.2f} questions/s, "
+                           f"{overall_tokens_per_question:.1f} tokens/question\n")
             log_file.write("="*50 + "\n\n")
             log_file.write("Subject Breakdown:\n")
             for result in results:
@@ -376,6 +617,12 @@ def run_benchmark(options):
                 "model_name": model_name,
                 "subjects": results,
                 "overall_accuracy": overall_accuracy,
+                "questions_per_second": round(overall_questions_per_second, 3),
+                "tokens_per_question": round(overall_tokens_per_question, 2),
+                "answer_only": options.get("answer_only", False),
+                "concurrency": options.get("concurrency", DEFAULT_CONCURRENCY),
+                "resumed": options.get("resume", False),
+                "rescored": options.get("rescore", False),
                 "timestamp": timestamp,
                 "log_file": os.path.relpath(log_filename, base_dir)  # Store relative path in the JSON
             }, f, indent=2)
@@ -395,15 +642,21 @@ if __name__ == "__main__":
     # Parse command line arguments
     args = parse_args()
     
+    if args.build_index:
+        build_index()
     # Simple option to run all tests
-    if args.run_all:
+    elif args.run_all:
         model_name = LLMConfig.MODEL
         print(f"\nRunning all tests for all categories with model: {model_name}")
         
         options = {
             "model_name": model_name,
             "subject": "all",
-            "num_examples": 0  # Run all examples for each subject
+            "num_examples": 0,  # Run all examples for each subject
+            "concurrency": args.concurrency,
+            "resume": args.resume,
+            "rescore": args.rescore,
+            "answer_only": args.answer_only
         }
         run_benchmark(options)
     # Determine if we should use command line arguments or interactive mode
@@ -421,12 +674,17 @@ if __name__ == "__main__":
         print(f"- Model: {model_name}")
         print(f"- Subject: {subject}")
         print(f"- Examples per subject: {args.examples if args.examples > 0 else 'all'}")
+        print(f"- Concurrent requests: {args.concurrency}")
         
         # Run benchmark with command line options
         options = {
             "model_name": model_name,
             "subject": subject,
-            "num_examples": args.examples
+            "num_examples": args.examples,
+            "concurrency": args.concurrency,
+            "resume": args.resume,
+            "rescore": args.rescore,
+            "answer_only": args.answer_only
         }
         run_benchmark(options)
     else:
@@ -437,4 +695,6 @@ if __name__ == "__main__":
             
         # Interactive mode
         options = get_user_input()
+        options.update(concurrency=args.concurrency, resume=args.resume, rescore=args.rescore,
+                       answer_only=args.answer_only)
         run_benchmark(options)
@@ -0,0 +1,25 @@
+import argparse
+from core.config_utils import log_config
+from core.log_utils import setup_logging
+from core.onnx_threads import install_session_defaults
+from pipeline_components.server import PipelineServer
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Serve the pipeline over HTTP and WebSocket.")
+    parser.add_argument("--host", type=str, default=None,
+                        help="Address to listen on (default: Config.SERVER.HOST)")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Port to listen on (default: Config.SERVER.PORT)")
+    return parser.parse_args()
+
+def main():
+    """Entry point for the pipeline server."""
+    args = parse_arguments()
+    logger = setup_logging(log_to_console=True).getChild("server")
+    log_config(logger)
+    install_session_defaults()
+    server = PipelineServer(logger)
+    server.serve(args.host, args.port)
+
+if __name__ == "__main__":
+    main()